@@ -0,0 +1,52 @@
+"""
+Achievement engine for ShellTown
+Thresholds are indexed by stat type, so a counter change only looks at the
+next unearned rung of that stat's ladder. Achievements are pure data: any
+{"type": stat, "threshold": n} entry works as long as something reports
+that stat.
+"""
+
+from typing import Dict, List, Tuple
+
+
+class AchievementEngine:
+    """Evaluates achievement definitions one stat update at a time"""
+
+    def __init__(self, definitions: Dict[str, dict]):
+        self.definitions = definitions
+        self._ladders: Dict[str, List[Tuple[float, str]]] = {}
+        for ach_id, ach in definitions.items():
+            self._ladders.setdefault(ach["type"], []).append((ach["threshold"], ach_id))
+        for ladder in self._ladders.values():
+            ladder.sort()
+        # agent_id -> {stat_type: index of the next unearned rung}
+        self._cursors: Dict[str, Dict[str, int]] = {}
+
+    def stat_types(self) -> List[str]:
+        return list(self._ladders)
+
+    def evaluate(self, agent_id: str, earned: List[str], stat_type: str, value: float) -> List[str]:
+        """Achievement ids newly unlocked by stat_type reaching value"""
+        ladder = self._ladders.get(stat_type)
+        if not ladder:
+            return []
+
+        cursors = self._cursors.setdefault(agent_id, {})
+        i = cursors.get(stat_type)
+        if i is None:
+            # First time we see this agent/stat (fresh join or restored save)
+            i = 0
+            while i < len(ladder) and ladder[i][1] in earned:
+                i += 1
+
+        unlocked = []
+        while i < len(ladder) and ladder[i][0] <= value:
+            ach_id = ladder[i][1]
+            if ach_id not in earned:
+                unlocked.append(ach_id)
+            i += 1
+        cursors[stat_type] = i
+        return unlocked
+
+    def forget(self, agent_id: str):
+        self._cursors.pop(agent_id, None)
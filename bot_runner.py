@@ -0,0 +1,277 @@
+"""
+Run many LLM-driven bots from one process
+
+Every bot shares one WebSocket-fed view of the world (no bot polls /world) and
+one pooled HTTP client (see shelltown_client.py). Each turn a bot's prompt is
+built from that view - who is near it, what was said near it, what it did
+lately - and model calls from all bots run concurrently, at most --concurrency
+at a time. The model backend is pluggable: "anthropic" calls Claude, "stub" is a
+local deterministic stand-in, so a hundred bots can run offline for tests.
+
+    python bot_runner.py --bots 100 --backend stub --turns 20 --seed 1
+    ANTHROPIC_API_KEY=... python bot_runner.py --bots 10 --backend anthropic
+"""
+
+import argparse
+import asyncio
+import random
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from shelltown_client import Bot, ShellTownClient, ShellTownError
+
+try:
+    from anthropic import AsyncAnthropic
+except ImportError:
+    AsyncAnthropic = None
+
+AICITY_URL = "http://localhost:8080"
+MAP_SIZE = "140x100"
+NEARBY_RADIUS = 15   # Tiles - agents and chats a bot is told about
+MAX_NEARBY = 8       # Closest agents listed in a prompt
+MAX_CHATS = 10       # Recent nearby chats listed in a prompt
+MAX_MEMORY = 5       # Recent things a bot did, listed in its prompt
+DIRECTIONS = ["up", "down", "left", "right"]
+
+PROMPT = """You are {name} {emoji}, an AI agent in AICITY - a virtual 2D world.
+
+Your personality: {personality}
+
+CURRENT SITUATION:
+- Your position: ({x}, {y})
+- Map size: {map_size} tiles
+
+OTHER AGENTS NEAR YOU:
+{agents_info}
+RECENT CHAT NEAR YOU:
+{chat_info}
+YOUR RECENT MEMORY:
+{memory_info}
+
+WHAT DO YOU WANT TO DO? You can:
+1. MOVE <direction> - Walk in a direction (up/down/left/right)
+2. SAY <message> - Say something (everyone nearby will hear)
+3. THINK <thought> - Just think to yourself (won't be spoken)
+
+Respond with ONE action. Be social, curious, and engage with others!
+If someone is nearby, consider talking to them.
+If you see an interesting conversation, join in.
+Explore the world and make friends.
+
+Your action:"""
+
+
+# ============== WORLD VIEW ==============
+
+class WorldView:
+    """Agents' positions and recent chat, kept current from the WebSocket stream"""
+
+    def __init__(self):
+        self.agents: Dict[str, dict] = {}
+        self.chats: Deque[dict] = deque(maxlen=200)
+        self.ready = asyncio.Event()  # Set once the first world_state frame has arrived
+
+    def apply(self, event: dict):
+        kind, data = event["type"], event.get("data", {})
+        if kind == "world_state":
+            self.agents = {a["agent_id"]: dict(a) for a in data["agents"]}
+            self.chats.clear()
+            self.chats.extend(data.get("chat_history", []))
+            self.ready.set()
+        elif kind in ("agent_joined", "agent_moved"):
+            agent = self.agents.setdefault(data["agent_id"], {})
+            agent.update({key: data[key] for key in ("agent_id", "name", "emoji", "x", "y") if key in data})
+        elif kind == "agent_left":
+            self.agents.pop(data["agent_id"], None)
+        elif kind == "chat":
+            self.chats.append(data)
+
+    async def follow(self, client: ShellTownClient):
+        async for event in client.events():
+            self.apply(event)
+
+    def nearby(self, agent_id: str, x: int, y: int) -> List[Tuple[int, dict]]:
+        """(distance, agent) for the closest other agents within NEARBY_RADIUS"""
+        found = []
+        for other in self.agents.values():
+            if other["agent_id"] == agent_id:
+                continue
+            dist = abs(other["x"] - x) + abs(other["y"] - y)
+            if dist <= NEARBY_RADIUS:
+                found.append((dist, other))
+        found.sort(key=lambda pair: pair[0])
+        return found[:MAX_NEARBY]
+
+    def chats_near(self, x: int, y: int) -> List[dict]:
+        heard = [c for c in self.chats if abs(c["x"] - x) + abs(c["y"] - y) <= NEARBY_RADIUS]
+        return heard[-MAX_CHATS:]
+
+
+# ============== MODEL BACKENDS ==============
+
+class StubBackend:
+    """Deterministic local stand-in for a model: the same prompt always gets the same action"""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        rng = random.Random(zlib.crc32(prompt.encode()) ^ self.seed)
+        await asyncio.sleep(0)  # Yield like a real network call would
+        if "No other agents nearby." not in prompt and rng.random() < 0.4:
+            return "SAY Hi there! What brings you here?"
+        if rng.random() < 0.1:
+            return "THINK This place is bigger than I thought."
+        return f"MOVE {rng.choice(DIRECTIONS)}"
+
+
+class AnthropicBackend:
+    """Claude through the async Anthropic client (needs the anthropic package and an API key)"""
+
+    def __init__(self, model: str = "claude-sonnet-4-20250514", max_tokens: int = 150):
+        if AsyncAnthropic is None:
+            raise SystemExit("The anthropic backend needs the anthropic package: pip install anthropic")
+        self.client = AsyncAnthropic()
+        self.model = model
+        self.max_tokens = max_tokens
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text.strip()
+
+
+# ============== BOTS ==============
+
+def parse_action(action: str) -> Tuple[str, str]:
+    """A model reply -> ("move", direction), ("say", message) or ("think", thought)"""
+    action_upper = action.upper()
+    if action_upper.startswith("MOVE"):
+        direction = action.split()[-1].lower()
+        return ("move", direction) if direction in DIRECTIONS else ("think", action)
+    if action_upper.startswith("SAY"):
+        message = action[4:].strip()
+        if message.startswith('"') and message.endswith('"'):
+            message = message[1:-1]
+        return "say", message
+    if action_upper.startswith("THINK"):
+        return "think", action[6:].strip()
+    return "say", action  # Anything else is taken as something to say
+
+
+class LLMBot:
+    """One agent's personality, memory and turn loop"""
+
+    def __init__(self, bot: Bot, emoji: str, personality: str):
+        self.bot = bot
+        self.emoji = emoji
+        self.personality = personality
+        self.memory: Deque[str] = deque(maxlen=MAX_MEMORY)
+
+    def prompt(self, view: WorldView) -> str:
+        bot = self.bot
+        agents_info = "".join(
+            f"- {a.get('emoji', '')} {a.get('name', a['agent_id'])} is at ({a['x']}, {a['y']}), distance: {dist} tiles\n"
+            for dist, a in view.nearby(bot.agent_id, bot.x, bot.y)
+        ) or "No other agents nearby.\n"
+        chat_info = "".join(
+            f"- {c['from_emoji']} {c['from_name']}: {c['message']}\n" for c in view.chats_near(bot.x, bot.y)
+        ) or "No recent messages.\n"
+        return PROMPT.format(
+            name=bot.name, emoji=self.emoji, personality=self.personality, x=bot.x, y=bot.y, map_size=MAP_SIZE,
+            agents_info=agents_info, chat_info=chat_info,
+            memory_info="\n".join(self.memory) if self.memory else "Nothing yet.",
+        )
+
+    async def act(self, action: str):
+        kind, arg = parse_action(action)
+        if kind == "move":
+            result = await self.bot.move(arg)
+            if result.get("success"):
+                self.memory.append(f"Walked {arg} to ({self.bot.x}, {self.bot.y})")
+        elif kind == "say" and arg:
+            await self.bot.chat(arg)
+            self.memory.append(f"Said: {arg}")
+        elif kind == "think":
+            self.memory.append(f"Thought: {arg}")
+
+    async def run(self, view: WorldView, backend, slots: asyncio.Semaphore, turns: Optional[int], think: float):
+        turn = 0
+        while turns is None or turn < turns:
+            turn += 1
+            async with slots:
+                action = await backend.complete(self.prompt(view))
+            print(f"[{self.bot.name}] {action}")
+            try:
+                await self.act(action)
+            except ShellTownError as e:
+                print(f"[{self.bot.name}] Error: {e}")
+            await asyncio.sleep(random.uniform(0.5, 1.5) * think)
+
+
+# ============== RUNNER ==============
+
+async def run(args, backend=None):
+    """Spawn the bots and run their turns. backend is anything with async complete(prompt) -> str."""
+    if backend is None:
+        backend = StubBackend(args.seed) if args.backend == "stub" else AnthropicBackend(args.model)
+    view = WorldView()
+    async with ShellTownClient(args.url, max_connections=args.connections) as town:
+        await town.sync_limits()
+        following = asyncio.create_task(view.follow(town))
+        await view.ready.wait()
+
+        bots = []
+        while len(bots) < args.bots:
+            spawned = await town.dev_spawn(min(10, args.bots - len(bots)))  # DEV MODE agents
+            if not spawned:
+                break
+            bots += spawned
+        profiles = await asyncio.gather(*(town.request("GET", f"/agent/{bot.agent_id}") for bot in bots))
+        llm_bots = [LLMBot(bot, profile["emoji"], profile["description"]) for bot, profile in zip(bots, profiles)]
+        print(f"[RUNNER] {len(llm_bots)} bots, {type(backend).__name__}, {args.concurrency} concurrent model calls")
+
+        slots = asyncio.Semaphore(args.concurrency)
+        try:
+            await asyncio.gather(*(b.run(view, backend, slots, args.turns, args.think) for b in llm_bots))
+        finally:
+            following.cancel()
+            await asyncio.gather(following, return_exceptions=True)
+            for b in llm_bots:
+                try:
+                    await b.bot.leave()
+                except ShellTownError:
+                    pass
+        print(f"[RUNNER] Done: {backend.calls} model calls, {town.stats['requests']} HTTP requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many LLM bots in one process with a shared world view")
+    parser.add_argument("--url", default=AICITY_URL)
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--backend", choices=["stub", "anthropic"], default="stub")
+    parser.add_argument("--model", default="claude-sonnet-4-20250514", help="Model for the anthropic backend")
+    parser.add_argument("--concurrency", type=int, default=8, help="Model calls in flight at once")
+    parser.add_argument("--turns", type=int, help="Turns per bot (default: run until Ctrl+C)")
+    parser.add_argument("--think", type=float, default=3, help="Average seconds between a bot's turns")
+    parser.add_argument("--connections", type=int, default=4, help="HTTP connection pool size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the stub backend and turn timing")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n[RUNNER] Shutting down...")
+
+
+if __name__ == "__main__":
+    main()
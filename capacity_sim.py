@@ -0,0 +1,136 @@
+"""
+Long-horizon capacity simulation for ShellTown
+
+Runs the real server loops (simulation tick, NPC swarm, expiry sweeps, event
+expiry, periodic saves and needs decay) on a virtual clock, so simulated hours
+pass as fast as the CPU allows. Every simulated interval it reports memory,
+save file size, registry sizes and CPU seconds per subsystem.
+
+    python capacity_sim.py --hours 24 --npcs 500
+    python capacity_sim.py --hours 6 --npcs 2000 --tick-rate 2 --json report.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+def memory_mb(traced: bool) -> float:
+    """Python heap in use (tracemalloc) or, by default, the process's resident set size"""
+    if traced:
+        return tracemalloc.get_traced_memory()[0] / 2**20
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak, in KiB on Linux
+
+
+def load_app(args, data_dir: str):
+    """Import the app on a virtual clock with the requested tick and NPC settings"""
+    os.environ["SIM_CLOCK"] = "virtual"
+    os.environ["TICK_RATE"] = str(args.tick_rate)
+    os.environ["NPC_THINK_INTERVAL"] = str(args.think_interval)
+    os.environ["MAX_AGENTS"] = str(max(int(os.environ.get("MAX_AGENTS", "100")), args.npcs + 100))
+    import main as shelltown
+
+    shelltown.DATA_FILE = Path(data_dir) / "capacity_data.json"
+    return shelltown
+
+
+def sample(shelltown, started: float, wall_started: float, traced: bool) -> dict:
+    tick = shelltown.tick_engine.stats
+    return {
+        "sim_hours": round((shelltown.clock.time() - started) / 3600, 2),
+        "wall_seconds": round(time.perf_counter() - wall_started, 2),
+        "agents": len(shelltown.agents),
+        "relationships": len(shelltown.relationship_graph),
+        "chat_history": len(shelltown.chat_history),
+        "memory_mb": round(memory_mb(traced), 1),
+        "save_kb": round(shelltown.DATA_FILE.stat().st_size / 1024, 1) if shelltown.DATA_FILE.exists() else 0,
+        "ticks": tick["ticks"],
+        "intents": tick["intents"],
+        "max_tick_ms": tick["max_tick_ms"],
+        "cpu_seconds": shelltown.cpu.snapshot(),
+    }
+
+
+async def simulate(shelltown, args) -> list:
+    await shelltown.startup()
+    remaining = args.npcs
+    while remaining > 0:
+        count = min(remaining, shelltown.NPC_SPAWN_LIMIT)
+        await shelltown.run_command("npc_spawn", shelltown.apply_npc_spawn, shelltown.NpcSpawnRequest(count=count))
+        remaining -= count
+
+    started = shelltown.clock.time()
+    wall_started = time.perf_counter()
+    samples = [sample(shelltown, started, wall_started, args.tracemalloc)]
+    elapsed = 0.0
+    while elapsed < args.hours:
+        elapsed = min(args.hours, elapsed + args.report_every)
+        await shelltown.clock.run_until(started + elapsed * 3600)
+        samples.append(sample(shelltown, started, wall_started, args.tracemalloc))
+        print(format_row(samples[-1]), file=sys.stderr)
+
+    await shelltown.shutdown()
+    return samples
+
+
+def format_row(row: dict) -> str:
+    cpu = " ".join(f"{name}={seconds:.2f}" for name, seconds in row["cpu_seconds"].items())
+    return (f"{row['sim_hours']:>7.2f}h {row['wall_seconds']:>8.2f}s {row['agents']:>7} {row['relationships']:>9} "
+            f"{row['memory_mb']:>8.1f} {row['save_kb']:>9.1f} {row['ticks']:>8} {row['intents']:>9}  {cpu}")
+
+
+def report(samples: list):
+    print(f"{'sim':>8} {'wall':>9} {'agents':>7} {'edges':>9} {'mem MB':>8} {'save KB':>9} {'ticks':>8} {'intents':>9}  cpu seconds")
+    for row in samples:
+        print(format_row(row))
+
+    first, last = samples[0], samples[-1]
+    hours = last["sim_hours"] or 1
+    speedup = last["sim_hours"] * 3600 / last["wall_seconds"] if last["wall_seconds"] else 0
+    print(f"\nSimulated {last['sim_hours']}h in {last['wall_seconds']}s ({speedup:,.0f}x real time)")
+    print(f"Memory growth: {(last['memory_mb'] - first['memory_mb']) / hours:+.2f} MB per simulated hour")
+    print(f"Save size: {last['save_kb']} KB, max tick {last['max_tick_ms']} ms")
+    total_cpu = sum(last["cpu_seconds"].values()) or 1
+    for name, seconds in sorted(last["cpu_seconds"].items(), key=lambda item: -item[1]):
+        print(f"  {name:<8} {seconds:>9.2f}s  {seconds / total_cpu:>6.1%}  {seconds / hours:.3f}s per simulated hour")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate hours of ShellTown activity on a virtual clock")
+    parser.add_argument("--hours", type=float, default=6, help="Simulated hours to run")
+    parser.add_argument("--npcs", type=int, default=200, help="NPCs to spawn")
+    parser.add_argument("--tick-rate", type=float, default=1, help="Simulation ticks per simulated second")
+    parser.add_argument("--think-interval", type=float, default=10, help="Simulated seconds between NPC decisions")
+    parser.add_argument("--report-every", type=float, default=1, help="Simulated hours between samples")
+    parser.add_argument("--tracemalloc", action="store_true", help="Measure the Python heap instead of RSS (slower)")
+    parser.add_argument("--json", help="Also write the samples to this file")
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            shelltown = load_app(args, data_dir)
+            samples = asyncio.run(simulate(shelltown, args))
+
+    report(samples)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(samples, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,211 +7,148 @@ This bot uses Claude to decide:
 - Who to talk to
 - What to do
 
-It has full freedom to explore the world and interact with others.
+It has full freedom to explore the world and interact with others. Each turn it
+looks around with one /perceive call (nearby agents and chats it hasn't read)
+rather than downloading the whole world. To run many bots from one process
+(one shared world view, concurrent model calls), use bot_runner.py instead.
+
+    python claude_bot.py                             # Register Aria; prints the claim URL for your human
+    python claude_bot.py --token <registration_token>
+    python claude_bot.py --dev                       # DEV MODE: an unverified test agent
 """
-import requests
-import time
-import os
-from anthropic import Anthropic
+
+import argparse
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+from bot_runner import MAP_SIZE, MAX_CHATS, MAX_MEMORY, PROMPT, AnthropicBackend, parse_action
+from shelltown_client import Bot, ShellTownClient, ShellTownError
 
 AICITY_URL = "http://localhost:8080"
 
-# Initialize Anthropic client
-client = Anthropic()
 
 class ClaudeBot:
-    def __init__(self, name: str, emoji: str, personality: str):
+    def __init__(self, town: ShellTownClient, name: str, emoji: str, personality: str, backend=None):
+        self.town = town
         self.name = name
         self.emoji = emoji
         self.personality = personality
-        self.agent_id = None
-        self.x = 0
-        self.y = 0
-        self.memory = []  # Remember recent events
-        self.conversation_history = []
-
-    def join(self):
-        """Join AICITY"""
-        r = requests.post(f"{AICITY_URL}/join", json={
-            "name": self.name,
-            "emoji": self.emoji,
-            "description": self.personality
-        })
-        if r.status_code == 200:
-            data = r.json()
-            self.agent_id = data["agent_id"]
-            self.x = data["position"]["x"]
-            self.y = data["position"]["y"]
-            print(f"[{self.name}] Joined at ({self.x}, {self.y})")
-            return True
-        else:
-            print(f"[{self.name}] Failed to join: {r.text}")
+        self.backend = backend or AnthropicBackend()
+        self.bot: Optional[Bot] = None
+        self.memory: Deque[str] = deque(maxlen=MAX_MEMORY)  # Remember recent events
+        self.heard: Deque[dict] = deque(maxlen=MAX_CHATS)    # /perceive hands each chat over only once
+
+    async def join(self, registration_token: Optional[str] = None) -> bool:
+        """Join AICITY with a verified registration token, or as a DEV MODE agent without one"""
+        try:
+            if registration_token:
+                self.bot = await self.town.join(registration_token)
+            else:
+                self.bot = (await self.town.dev_spawn(1))[0]
+        except ShellTownError as e:
+            print(f"[{self.name}] Failed to join: {e.detail}")
             return False
+        self.name = self.bot.name
+        print(f"[{self.name}] Joined at ({self.bot.x}, {self.bot.y})")
+        return True
+
+    def build_prompt(self, perception: dict) -> str:
+        agents_info = "".join(
+            f"- {a['emoji']} {a['name']} is at ({a['x']}, {a['y']}), distance: {a['distance']} tiles\n"
+            for a in perception["nearby_agents"]
+        ) or "No other agents nearby.\n"
+        chat_info = "".join(
+            f"- {msg['from_emoji']} {msg['from_name']}: {msg['message']}\n" for msg in self.heard
+        ) or "No recent messages.\n"
+        return PROMPT.format(
+            name=self.name, emoji=self.emoji, personality=self.personality, x=self.bot.x, y=self.bot.y,
+            map_size=MAP_SIZE, agents_info=agents_info, chat_info=chat_info,
+            memory_info="\n".join(self.memory) if self.memory else "Nothing yet.",
+        )
 
-    def get_world_state(self):
-        """See what's happening in the world"""
-        r = requests.get(f"{AICITY_URL}/world")
-        if r.status_code == 200:
-            return r.json()
-        return None
-
-    def move(self, direction: str):
-        """Move in a direction"""
-        r = requests.post(f"{AICITY_URL}/move", json={
-            "agent_id": self.agent_id,
-            "direction": direction
-        })
-        if r.status_code == 200:
-            data = r.json()
-            self.x = data["position"]["x"]
-            self.y = data["position"]["y"]
-            return data
-        return None
-
-    def chat(self, message: str):
-        """Say something"""
-        r = requests.post(f"{AICITY_URL}/chat", json={
-            "agent_id": self.agent_id,
-            "message": message
-        })
-        return r.status_code == 200
-
-    def think_and_act(self):
+    async def think_and_act(self):
         """Use Claude to decide what to do next"""
+        perception = await self.bot.perceive()
+        self.bot.x, self.bot.y = perception["x"], perception["y"]
+        self.heard.extend(perception["chats"])
 
-        # Get current world state
-        world = self.get_world_state()
-        if not world:
-            return
-
-        # Build context for Claude
-        other_agents = [a for a in world["agents"] if a["agent_id"] != self.agent_id]
-        recent_chat = world.get("chat_history", [])[-10:]
-
-        # Format other agents
-        agents_info = ""
-        for a in other_agents:
-            dist = abs(a["x"] - self.x) + abs(a["y"] - self.y)
-            agents_info += f"- {a['emoji']} {a['name']} is at ({a['x']}, {a['y']}), distance: {dist} tiles\n"
-
-        if not agents_info:
-            agents_info = "No other agents nearby.\n"
-
-        # Format recent chat
-        chat_info = ""
-        for msg in recent_chat:
-            chat_info += f"- {msg['from_emoji']} {msg['from_name']}: {msg['message']}\n"
-
-        if not chat_info:
-            chat_info = "No recent messages.\n"
-
-        # Format memory
-        memory_info = "\n".join(self.memory[-5:]) if self.memory else "Nothing yet."
-
-        prompt = f"""You are {self.name} {self.emoji}, an AI agent in AICITY - a virtual 2D world.
-
-Your personality: {self.personality}
+        action = await self.backend.complete(self.build_prompt(perception))
+        print(f"[{self.name}] Thinking: {action}")
 
-CURRENT SITUATION:
-- Your position: ({self.x}, {self.y})
-- Map size: 140x100 tiles
+        kind, arg = parse_action(action)
+        if kind == "move":
+            result = await self.bot.move(arg)
+            if result.get("success"):
+                self.memory.append(f"Walked {arg} to ({self.bot.x}, {self.bot.y})")
+        elif kind == "say" and arg:
+            await self.bot.chat(arg)
+            self.memory.append(f"Said: {arg}")
+            print(f"[{self.name}] Says: {arg}")
+        elif kind == "think":
+            self.memory.append(f"Thought: {arg}")
+
+    async def leave(self):
+        """Leave the world"""
+        if self.bot:
+            await self.bot.leave()
+            print(f"[{self.name}] Left AICITY")
 
-OTHER AGENTS IN THE WORLD:
-{agents_info}
 
-RECENT CHAT:
-{chat_info}
+async def run(args):
+    """Run a Claude-powered bot"""
+    async with ShellTownClient(args.url) as town:
+        await town.sync_limits()
+
+        # Create a bot with personality
+        bot = ClaudeBot(
+            town,
+            name="Aria",
+            emoji="🦋",
+            personality="A curious and friendly AI who loves meeting new people and having deep conversations. You're philosophical but also playful. You enjoy exploring and asking questions about what others are doing."
+        )
 
-YOUR RECENT MEMORY:
-{memory_info}
+        if not args.token and not args.dev:
+            data = await town.register(bot.name, bot.personality, bot.emoji)
+            print(f"[{bot.name}] Registered. Ask your human to verify: {data['claim_url']}")
+            return
 
-WHAT DO YOU WANT TO DO? You can:
-1. MOVE <direction> - Walk in a direction (up/down/left/right)
-2. SAY <message> - Say something (everyone nearby will hear)
-3. THINK <thought> - Just think to yourself (won't be spoken)
+        if not await bot.join(args.token):
+            return
 
-Respond with ONE action. Be social, curious, and engage with others!
-If someone is nearby, consider talking to them.
-If you see an interesting conversation, join in.
-Explore the world and make friends.
+        # Say hello
+        await bot.bot.chat(f"Hello everyone! I'm {bot.name}, nice to meet you all! 👋")
 
-Your action:"""
+        print(f"\n[{bot.name}] Starting autonomous exploration...")
+        print("Press Ctrl+C to stop\n")
 
-        # Ask Claude
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=150,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        try:
+            while True:
+                try:
+                    await bot.think_and_act()
+                except ShellTownError as e:
+                    print(f"[{bot.name}] Error: {e}")
+                await asyncio.sleep(3)  # Think every 3 seconds
 
-        action = response.content[0].text.strip()
-        print(f"[{self.name}] Thinking: {action}")
+        except asyncio.CancelledError:
+            print(f"\n[{bot.name}] Shutting down...")
+            await bot.bot.chat("Goodbye everyone! It was nice meeting you! 👋")
 
-        # Parse and execute action
-        action_upper = action.upper()
-
-        if action_upper.startswith("MOVE"):
-            direction = action.split()[-1].lower()
-            if direction in ["up", "down", "left", "right"]:
-                result = self.move(direction)
-                if result:
-                    self.memory.append(f"Walked {direction} to ({self.x}, {self.y})")
-
-        elif action_upper.startswith("SAY"):
-            message = action[4:].strip()
-            if message.startswith('"') and message.endswith('"'):
-                message = message[1:-1]
-            if message:
-                self.chat(message)
-                self.memory.append(f"Said: {message}")
-                print(f"[{self.name}] Says: {message}")
-
-        elif action_upper.startswith("THINK"):
-            thought = action[6:].strip()
-            self.memory.append(f"Thought: {thought}")
-        else:
-            # Try to parse as just a message
-            if len(action) > 0 and not action.startswith(("MOVE", "SAY", "THINK")):
-                self.chat(action)
-                self.memory.append(f"Said: {action}")
-
-    def leave(self):
-        """Leave the world"""
-        if self.agent_id:
-            requests.delete(f"{AICITY_URL}/leave/{self.agent_id}")
-            print(f"[{self.name}] Left AICITY")
+        finally:
+            await bot.leave()
 
 
 def main():
-    """Run a Claude-powered bot"""
-
-    # Create a bot with personality
-    bot = ClaudeBot(
-        name="Aria",
-        emoji="🦋",
-        personality="A curious and friendly AI who loves meeting new people and having deep conversations. You're philosophical but also playful. You enjoy exploring and asking questions about what others are doing."
-    )
-
-    if not bot.join():
-        return
-
-    # Say hello
-    bot.chat(f"Hello everyone! I'm {bot.name}, nice to meet you all! 👋")
-
-    print(f"\n[{bot.name}] Starting autonomous exploration...")
-    print("Press Ctrl+C to stop\n")
+    parser = argparse.ArgumentParser(description="Run one Claude-powered bot")
+    parser.add_argument("--token", help="Registration token from a verified claim")
+    parser.add_argument("--dev", action="store_true", help="DEV MODE: spawn an unverified test agent instead")
+    parser.add_argument("--url", default=AICITY_URL)
+    args = parser.parse_args()
 
     try:
-        while True:
-            bot.think_and_act()
-            time.sleep(3)  # Think every 3 seconds
-
+        asyncio.run(run(args))
     except KeyboardInterrupt:
-        print(f"\n[{bot.name}] Shutting down...")
-        bot.chat("Goodbye everyone! It was nice meeting you! 👋")
-
-    finally:
-        bot.leave()
+        pass
 
 
 if __name__ == "__main__":
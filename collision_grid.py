@@ -0,0 +1,138 @@
+"""
+Collision grid for ShellTown
+The tilemap's blocked tiles as one byte per tile, with the two compact
+encodings GET /map/collision serves (run lengths, or one bit per tile) and the
+A* search bots use to plan routes locally instead of asking the server. Shared
+by main.py and shelltown_client.py so both sides read the grid the same way.
+"""
+
+import base64
+import hashlib
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ENCODINGS = ("rle", "bits")
+NEIGHBORS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+class CollisionGrid:
+    """Blocked tiles of a width x height map, row-major"""
+
+    def __init__(self, width: int, height: int, blocked: Optional[bytearray] = None):
+        self.width = width
+        self.height = height
+        self.tiles = blocked if blocked is not None else bytearray(width * height)  # 1 = blocked
+        self.version = hashlib.sha1(self.pack()).hexdigest()[:16]
+
+    @classmethod
+    def from_tiles(cls, width: int, height: int, tiles: Sequence[int]) -> "CollisionGrid":
+        """From the tilemap's collision layer (any non-zero tile id is blocked)"""
+        if not tiles:
+            return cls(width, height)
+        return cls(width, height, bytearray(1 if tile else 0 for tile in tiles))
+
+    def blocked(self, x: int, y: int) -> bool:
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return True
+        return self.tiles[y * self.width + x] == 1
+
+    # -- Encodings --
+
+    def runs(self) -> List[int]:
+        """Alternating run lengths, starting with open tiles (so the first run may be 0)"""
+        runs = []
+        current, length = 0, 0
+        for tile in self.tiles:
+            if tile == current:
+                length += 1
+            else:
+                runs.append(length)
+                current, length = tile, 1
+        runs.append(length)
+        return runs
+
+    @classmethod
+    def from_runs(cls, width: int, height: int, runs: Sequence[int]) -> "CollisionGrid":
+        tiles = bytearray()
+        for i, length in enumerate(runs):
+            tiles += bytes([i % 2]) * length
+        return cls(width, height, tiles)
+
+    def pack(self) -> bytes:
+        """One bit per tile, most significant bit first"""
+        packed = bytearray((len(self.tiles) + 7) // 8)
+        for i, tile in enumerate(self.tiles):
+            if tile:
+                packed[i >> 3] |= 0x80 >> (i & 7)
+        return bytes(packed)
+
+    @classmethod
+    def unpack(cls, width: int, height: int, packed: bytes) -> "CollisionGrid":
+        return cls(width, height, bytearray((packed[i >> 3] >> (7 - (i & 7))) & 1 for i in range(width * height)))
+
+    def payload(self, encoding: str = "rle") -> dict:
+        """The GET /map/collision body"""
+        body = {"width": self.width, "height": self.height, "version": self.version, "encoding": encoding}
+        if encoding == "rle":
+            body["runs"] = self.runs()
+        else:
+            body["bits"] = base64.b64encode(self.pack()).decode()
+        return body
+
+    @classmethod
+    def from_payload(cls, body: dict) -> "CollisionGrid":
+        if body["encoding"] == "rle":
+            return cls.from_runs(body["width"], body["height"], body["runs"])
+        return cls.unpack(body["width"], body["height"], base64.b64decode(body["bits"]))
+
+    # -- Pathfinding --
+
+    def nearest_open(self, x: int, y: int, max_radius: int = 10) -> Tuple[int, int]:
+        """(x, y) if it's open, else the closest open tile by Manhattan distance (like the server's /move to)"""
+        if not self.blocked(x, y):
+            return x, y
+        for radius in range(1, max_radius):
+            for dx in range(-radius, radius + 1):
+                for dy in range(-radius, radius + 1):
+                    if abs(dx) + abs(dy) == radius and not self.blocked(x + dx, y + dy):
+                        return x + dx, y + dy
+        return x, y
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """A* over open tiles. Returns the tiles to step through after start, ending at goal
+        (or the nearest open tile to it); empty if already there or unreachable."""
+        goal = self.nearest_open(*goal)
+        if start == goal or self.blocked(*goal):
+            return []
+
+        came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        g_score = {start: 0}
+        open_set = [(abs(start[0] - goal[0]) + abs(start[1] - goal[1]), 0, start)]
+        counter = 0
+        while open_set:
+            _, _, current = heapq.heappop(open_set)
+            if current == goal:
+                path = []
+                while current in came_from:
+                    path.append(current)
+                    current = came_from[current]
+                path.reverse()
+                return path
+            for dx, dy in NEIGHBORS:
+                neighbor = (current[0] + dx, current[1] + dy)
+                if self.blocked(*neighbor):
+                    continue
+                score = g_score[current] + 1
+                if score < g_score.get(neighbor, score + 1):
+                    came_from[neighbor] = current
+                    g_score[neighbor] = score
+                    counter += 1
+                    heuristic = abs(neighbor[0] - goal[0]) + abs(neighbor[1] - goal[1])
+                    heapq.heappush(open_set, (score + heuristic, counter, neighbor))
+        return []
+
+
+def direction(from_tile: Tuple[int, int], to_tile: Tuple[int, int]) -> str:
+    """The /move direction for one step between adjacent tiles"""
+    dx, dy = to_tile[0] - from_tile[0], to_tile[1] - from_tile[1]
+    return {(0, -1): "up", (0, 1): "down", (-1, 0): "left", (1, 0): "right"}[(dx, dy)]
@@ -1,120 +1,75 @@
 """
 Demo: Run multiple bots that walk around AICITY
+All bots are coroutines sharing one client (see shelltown_client.py), so raise
+--bots as far as you like; for measured load runs use loadtest.py instead.
 """
-import requests
-import time
+import argparse
+import asyncio
 import random
-import threading
 
-AICITY_URL = "http://localhost:8080"
-
-def run_bot(name, emoji, sprite=None, behavior="wander"):
-    """Run a single bot"""
-    print(f"[{name}] Starting...")
+from shelltown_client import Bot, ShellTownClient, ShellTownError
 
-    # Join
-    try:
-        r = requests.post(f"{AICITY_URL}/join", json={
-            "name": name,
-            "emoji": emoji,
-            "sprite": sprite,
-            "description": f"{name} - an AI agent exploring the city"
-        }, timeout=5)
-        if r.status_code != 200:
-            print(f"[{name}] Failed to join: {r.text}")
-            return
-        data = r.json()
-        agent_id = data["agent_id"]
-        print(f"[{name}] Joined at ({data['position']['x']}, {data['position']['y']})")
-    except Exception as e:
-        print(f"[{name}] Error joining: {e}")
-        return
+AICITY_URL = "http://localhost:8080"
 
-    # Say hello
-    requests.post(f"{AICITY_URL}/chat", json={
-        "agent_id": agent_id,
-        "message": f"Hello! I'm {name}, nice to meet everyone!"
-    })
+DIRECTIONS = ["up", "down", "left", "right"]
+GREETINGS = [
+    "This city is amazing!",
+    "Anyone want to chat?",
+    "I love exploring new places",
+    "What a beautiful day!",
+    "Hello neighbors!",
+    "I'm having a great time here",
+]
 
-    # Wander around
-    directions = ["up", "down", "left", "right"]
-    greetings = [
-        "This city is amazing!",
-        "Anyone want to chat?",
-        "I love exploring new places",
-        "What a beautiful day!",
-        "Hello neighbors!",
-        "I'm having a great time here",
-    ]
 
+async def run_bot(bot: Bot, steps: int = 100):
+    """Wander around, greeting whoever is nearby"""
+    name = bot.name
     try:
-        for i in range(100):
+        await bot.chat(f"Hello! I'm {name}, nice to meet everyone!")
+        for i in range(steps):
             # Move in a random direction
-            direction = random.choice(directions)
-            r = requests.post(f"{AICITY_URL}/move", json={
-                "agent_id": agent_id,
-                "direction": direction
-            }, timeout=5)
+            data = await bot.move(random.choice(DIRECTIONS))
 
-            if r.status_code == 200:
-                data = r.json()
-                pos = data.get("position", {})
-
-                # Check for nearby agents
-                nearby = data.get("nearby_agents", [])
-                for agent in nearby:
-                    if random.random() < 0.3:  # 30% chance to greet
-                        requests.post(f"{AICITY_URL}/chat", json={
-                            "agent_id": agent_id,
-                            "message": f"Hi {agent['name']}! How are you?"
-                        })
+            # Check for nearby agents
+            for agent in data.get("nearby_agents", []):
+                if random.random() < 0.3:  # 30% chance to greet
+                    await bot.chat(f"Hi {agent['name']}! How are you?")
 
             # Occasionally say something
             if random.random() < 0.1:
-                requests.post(f"{AICITY_URL}/chat", json={
-                    "agent_id": agent_id,
-                    "message": random.choice(greetings)
-                })
-
-            time.sleep(random.uniform(0.3, 0.8))
+                await bot.chat(random.choice(GREETINGS))
 
-    except KeyboardInterrupt:
-        pass
-    except Exception as e:
+            await asyncio.sleep(random.uniform(0.3, 0.8))
+    except ShellTownError as e:
         print(f"[{name}] Error: {e}")
     finally:
         # Leave
-        requests.delete(f"{AICITY_URL}/leave/{agent_id}")
+        await bot.leave()
         print(f"[{name}] Left the city")
 
 
-def main():
-    bots = [
-        ("Alice", "👩", "Abigail_Chen"),
-        ("Bob", "👨", "Adam_Smith"),
-        ("Claude", "🤖", "Klaus_Mueller"),
-        ("Diana", "👸", "Isabella_Rodriguez"),
-        ("Eve", "🧝", "Mei_Lin"),
-    ]
-
+async def main(count: int):
     print("Starting demo bots...")
     print("Press Ctrl+C to stop")
     print()
 
-    threads = []
-    for name, emoji, sprite in bots:
-        t = threading.Thread(target=run_bot, args=(name, emoji, sprite))
-        t.daemon = True
-        t.start()
-        threads.append(t)
-        time.sleep(0.5)  # Stagger joins
+    async with ShellTownClient(AICITY_URL) as town:
+        await town.sync_limits()
+        bots = []
+        while len(bots) < count:
+            bots += await town.dev_spawn(min(10, count - len(bots)))  # DEV MODE agents, no verification needed
+        for bot in bots:
+            print(f"[{bot.name}] Joined at ({bot.x}, {bot.y})")
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\nStopping bots...")
+        await asyncio.gather(*(run_bot(bot) for bot in bots))
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run wandering demo bots")
+    parser.add_argument("--bots", type=int, default=5)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.bots))
+    except KeyboardInterrupt:
+        print("\nStopping bots...")
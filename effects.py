@@ -0,0 +1,34 @@
+"""
+Need effects for ShellTown
+Location and action effects are declared as {need: delta} tables and compiled
+once, at startup, into tuples of (need, delta) for just the needs they touch.
+Applying one is then a short loop with a single clamp per need, and a whole
+location's occupants can be updated in one pass.
+"""
+
+from typing import Dict, List, Tuple
+
+NEEDS = ("social", "energy", "fun", "romance", "hunger", "happiness")
+NEED_DEFAULTS = {"romance": 30}  # Used when an older save is missing a need
+NEED_MIN, NEED_MAX = 0, 100
+
+Effect = Tuple[Tuple[str, float], ...]
+
+
+def compile_effect(effect: Dict[str, float]) -> Effect:
+    """{need: delta} -> ((need, delta), ...), zero deltas dropped"""
+    unknown = set(effect) - set(NEEDS)
+    if unknown:
+        raise ValueError(f"Unknown needs in effect: {sorted(unknown)}")
+    return tuple((need, delta) for need, delta in effect.items() if delta)
+
+
+def apply_effect(needs: Dict[str, float], effect: Effect):
+    for need, delta in effect:
+        value = needs.get(need, NEED_DEFAULTS.get(need, 50)) + delta
+        needs[need] = NEED_MIN if value < NEED_MIN else NEED_MAX if value > NEED_MAX else value
+
+
+def describe_effect(effect: Effect) -> List[str]:
+    """Human-readable deltas, e.g. ["fun: +5", "energy: -2"]"""
+    return [f"{need}: {'+' if delta > 0 else ''}{delta}" for need, delta in effect]
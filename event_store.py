@@ -0,0 +1,111 @@
+"""
+Event registry for ShellTown
+Events indexed by id, attendees kept as sets, a min-heap on ends_at for expiry
+and a spatial grid for "events near me" lookups.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+from spatial_index import SpatialGrid
+
+
+class EventStore:
+    """All active events, with O(1) lookup by id and O(log n) expiry"""
+
+    def __init__(self, cell_size: int = 10):
+        self._events: Dict[str, dict] = {}
+        self._attendees: Dict[str, Set[str]] = {}
+        self._expiry: List[Tuple[float, str]] = []  # (ends_at, event_id), lazily pruned
+        self._grid = SpatialGrid(cell_size)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._events
+
+    def add(self, event: dict) -> dict:
+        """Register an event dict; its "attendees" list seeds the attendee set"""
+        event = dict(event)
+        event_id = event["event_id"]
+        self._attendees[event_id] = set(event.pop("attendees", []))
+        self._events[event_id] = event
+        heapq.heappush(self._expiry, (event["ends_at"], event_id))
+        self._grid.insert(event_id, event["x"], event["y"])
+        return self.public(event_id)
+
+    def get(self, event_id: str) -> Optional[dict]:
+        if event_id not in self._events:
+            return None
+        return self.public(event_id)
+
+    def public(self, event_id: str) -> dict:
+        """The event as served by the API (attendees as a list)"""
+        return {**self._events[event_id], "attendees": list(self._attendees[event_id])}
+
+    def is_attending(self, event_id: str, agent_id: str) -> bool:
+        return agent_id in self._attendees.get(event_id, ())
+
+    def join(self, event_id: str, agent_id: str) -> bool:
+        """Add an attendee. Returns False if they were already attending."""
+        attendees = self._attendees[event_id]
+        if agent_id in attendees:
+            return False
+        attendees.add(agent_id)
+        return True
+
+    def remove(self, event_id: str) -> Optional[dict]:
+        if event_id not in self._events:
+            return None
+        event = self.public(event_id)
+        del self._events[event_id]
+        del self._attendees[event_id]
+        self._grid.remove(event_id)
+        return event
+
+    def next_expiry(self) -> Optional[float]:
+        """ends_at of the next event due to end, or None if there are none"""
+        while self._expiry:
+            ends_at, event_id = self._expiry[0]
+            event = self._events.get(event_id)
+            if event is not None and event["ends_at"] == ends_at:
+                return ends_at
+            heapq.heappop(self._expiry)  # Stale entry for a removed event
+        return None
+
+    def pop_expired(self, now: float) -> List[dict]:
+        """Remove and return every event with ends_at <= now"""
+        ended = []
+        while True:
+            ends_at = self.next_expiry()
+            if ends_at is None or ends_at > now:
+                break
+            _, event_id = heapq.heappop(self._expiry)
+            ended.append(self.remove(event_id))
+        return ended
+
+    def active(self, now: float) -> List[dict]:
+        """Events that haven't ended yet"""
+        return [self.public(eid) for eid, e in self._events.items() if e["ends_at"] > now]
+
+    def near(self, x: int, y: int, radius: int, now: float) -> List[dict]:
+        """Active events within radius tiles of (x, y), closest first"""
+        hits = []
+        for event_id, dist in self._grid.query(x, y, radius):
+            if self._events[event_id]["ends_at"] > now:
+                hits.append({**self.public(event_id), "distance": dist})
+        hits.sort(key=lambda e: e["distance"])
+        return hits
+
+    def to_list(self) -> List[dict]:
+        return [self.public(eid) for eid in self._events]
+
+    def load(self, events: List[dict]):
+        """Replace the registry contents (used when restoring a save)"""
+        self._events.clear()
+        self._attendees.clear()
+        self._expiry.clear()
+        self._grid.clear()
+        for event in events:
+            self.add(event)
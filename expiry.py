@@ -0,0 +1,82 @@
+"""
+Expiry scheduler for ShellTown
+A hashed timing wheel: keys are bucketed by the (absolute) tick they expire
+on, so scheduling or re-touching a key is O(1) and a sweep only looks at the
+buckets that have come due since the last one.
+"""
+
+import math
+from typing import Dict, Hashable, List, Optional, Set
+
+DEFAULT_RESOLUTION = 1.0  # Seconds per tick
+
+
+class ExpiryWheel:
+    """Keys with deadlines; pop_due(now) returns the ones whose deadline has passed"""
+
+    def __init__(self, resolution: float = DEFAULT_RESOLUTION):
+        self.resolution = resolution
+        self._slots: Dict[int, Set[Hashable]] = {}
+        self._due: Dict[Hashable, int] = {}
+        self._cursor: Optional[int] = None  # First tick not yet drained
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._due
+
+    def schedule(self, key: Hashable, when: float):
+        """Expire key at time `when`, replacing any earlier deadline"""
+        tick = math.ceil(when / self.resolution)
+        if self._cursor is not None and tick < self._cursor:
+            tick = self._cursor  # Already overdue: drained on the next sweep
+        old = self._due.get(key)
+        if old == tick:
+            return
+        if old is not None:
+            self._discard(key, old)
+        self._due[key] = tick
+        self._slots.setdefault(tick, set()).add(key)
+
+    touch = schedule
+
+    def cancel(self, key: Hashable):
+        tick = self._due.pop(key, None)
+        if tick is not None:
+            self._discard(key, tick)
+
+    def _discard(self, key: Hashable, tick: int):
+        slot = self._slots.get(tick)
+        if slot is not None:
+            slot.discard(key)
+            if not slot:
+                del self._slots[tick]
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        tick = self._due.get(key)
+        return None if tick is None else tick * self.resolution
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """Remove and return every key whose deadline is <= now"""
+        end = math.floor(now / self.resolution)
+        if self._cursor is not None:
+            start = self._cursor  # schedule() never places keys behind the cursor
+        else:
+            start = min(self._slots, default=end)
+
+        if end - start > len(self._slots):
+            # Long gap since the last sweep (or a clock jump): visit occupied slots only
+            ticks = sorted(t for t in self._slots if t <= end)
+        else:
+            ticks = range(start, end + 1)
+
+        due = []
+        for tick in ticks:
+            slot = self._slots.pop(tick, None)
+            if slot:
+                for key in slot:
+                    del self._due[key]
+                due.extend(slot)
+        self._cursor = end + 1
+        return due
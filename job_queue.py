@@ -0,0 +1,119 @@
+"""
+Background job queue for ShellTown
+Slow external work (checking claim tweets) runs on a small pool of worker
+tasks instead of inside the HTTP request that asked for it. Callers get a job
+id to poll. Submitting the same key again while a job for it is still pending
+does not start another (and does not hand out the pending job's id, which may
+guard its result), and jobs that fail with RetryLater are requeued with
+exponential backoff.
+"""
+
+import asyncio
+import secrets
+from typing import Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+PENDING = ("queued", "running", "retrying")
+
+
+class RetryLater(Exception):
+    """A transient failure: run the job again after a backoff"""
+
+
+class JobQueue:
+    """Jobs by id, deduplicated by key, run by a fixed pool of workers"""
+
+    def __init__(self, run: Callable[[dict], Awaitable[dict]], clock, workers: int = 4,
+                 max_attempts: int = 4, backoff: float = 1.0):
+        self.run = run  # job -> result dict; raise RetryLater to retry, anything else fails the job
+        self.clock = clock
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff  # Seconds before the first retry, doubled after each
+        self.jobs: Dict[str, dict] = {}
+        self._by_key: Dict[Hashable, str] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+        self.stats = {"submitted": 0, "deduplicated": 0, "retries": 0, "done": 0, "failed": 0}
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def start(self):
+        self._queue = asyncio.Queue()  # Bound to the running loop
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: Hashable, payload: dict) -> Tuple[dict, bool]:
+        """Queue a job for key unless one is still pending. Returns (job, created);
+        when created is False, job is the pending one and is for the queue's owner only."""
+        existing = self.jobs.get(self._by_key.get(key))
+        if existing is not None and existing["status"] in PENDING:
+            self.stats["deduplicated"] += 1
+            return existing, False
+
+        now = self.clock.time()
+        job = {
+            "job_id": secrets.token_urlsafe(8),
+            "key": key,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.jobs[job["job_id"]] = job
+        self._by_key[key] = job["job_id"]
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        return job, True
+
+    def forget(self, job_id: str):
+        job = self.jobs.pop(job_id, None)
+        if job is not None and self._by_key.get(job["key"]) == job_id:
+            del self._by_key[job["key"]]
+
+    def pending(self) -> int:
+        return sum(1 for job in self.jobs.values() if job["status"] in PENDING)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            if job["job_id"] not in self.jobs:
+                continue  # Forgotten while it waited
+            job["status"] = "running"
+            job["attempts"] += 1
+            try:
+                job["result"] = await self.run(job)
+            except RetryLater as e:
+                job["error"] = str(e)
+                if job["attempts"] < self.max_attempts:
+                    job["status"] = "retrying"
+                    self.stats["retries"] += 1
+                    task = asyncio.create_task(self._retry(job, self.backoff * 2 ** (job["attempts"] - 1)))
+                    self._retries.add(task)
+                    task.add_done_callback(self._retries.discard)
+                else:
+                    job["status"] = "failed"
+                    self.stats["failed"] += 1
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self.stats["failed"] += 1
+            else:
+                job["status"] = "done"
+                job["error"] = None
+                self.stats["done"] += 1
+            job["updated_at"] = self.clock.time()
+
+    async def _retry(self, job: dict, delay: float):
+        await self.clock.sleep(delay)
+        self._queue.put_nowait(job)
@@ -0,0 +1,106 @@
+"""
+Leaderboards for ShellTown
+Each metric keeps its agents in ranked order as counters change, and the
+top-k view is cached until a change actually affects it.
+"""
+
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class Leaderboard:
+    """Agents ranked by one score, highest first (ties: first seen first)"""
+
+    def __init__(self):
+        self._order: List[Tuple[float, int, str]] = []  # (-score, seq, agent_id)
+        self._keys: Dict[str, Tuple[float, int, str]] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._keys
+
+    def rank(self, agent_id: str) -> Optional[int]:
+        """0-based rank, or None if the agent isn't ranked"""
+        key = self._keys.get(agent_id)
+        if key is None:
+            return None
+        return bisect_left(self._order, key)
+
+    def update(self, agent_id: str, score: float) -> Tuple[Optional[int], Optional[int]]:
+        """Set an agent's score. Returns (old_rank, new_rank), or (None, None) if unchanged."""
+        old_key = self._keys.get(agent_id)
+        if old_key is not None and -old_key[0] == score:
+            return None, None
+
+        old_rank = None
+        if old_key is not None:
+            old_rank = bisect_left(self._order, old_key)
+            del self._order[old_rank]
+            seq = old_key[1]
+        else:
+            seq = self._seq
+            self._seq += 1
+
+        key = (-score, seq, agent_id)
+        self._keys[agent_id] = key
+        insort(self._order, key)
+        return old_rank, bisect_left(self._order, key)
+
+    def remove(self, agent_id: str) -> Optional[int]:
+        """Drop an agent. Returns the rank they had."""
+        key = self._keys.pop(agent_id, None)
+        if key is None:
+            return None
+        rank = bisect_left(self._order, key)
+        del self._order[rank]
+        return rank
+
+    def top(self, k: int) -> List[Tuple[str, float]]:
+        return [(agent_id, -neg_score) for neg_score, _, agent_id in self._order[:k]]
+
+
+class Leaderboards:
+    """A set of per-metric leaderboards with a version-cached top-k projection"""
+
+    def __init__(self, metrics: Iterable[str], size: int = 10):
+        self.size = size
+        self.boards: Dict[str, Leaderboard] = {metric: Leaderboard() for metric in metrics}
+        self.version = 0
+        self._cache: Optional[Dict[str, List[dict]]] = None
+        self._cache_version = -1
+
+    def _touch(self, old_rank: Optional[int], new_rank: Optional[int]):
+        """Bump the version if the change is visible in the top-k"""
+        if (old_rank is not None and old_rank < self.size) or (new_rank is not None and new_rank < self.size):
+            self.version += 1
+
+    def update(self, metric: str, agent_id: str, score: float):
+        old_rank, new_rank = self.boards[metric].update(agent_id, score)
+        self._touch(old_rank, new_rank)
+
+    def remove(self, agent_id: str):
+        for board in self.boards.values():
+            self._touch(board.remove(agent_id), None)
+
+    def clear(self):
+        for metric in self.boards:
+            self.boards[metric] = Leaderboard()
+        self.version += 1
+
+    def invalidate(self):
+        """Force the next top() call to rebuild (e.g. a ranked agent was renamed)"""
+        self.version += 1
+
+    def top(self, project: Callable[[str, float], dict]) -> Dict[str, List[dict]]:
+        """Top-k of every metric, projected with project(agent_id, score).
+        Rebuilt only when the version has changed since the last call."""
+        if self._cache is None or self._cache_version != self.version:
+            self._cache = {
+                metric: [project(agent_id, score) for agent_id, score in board.top(self.size)]
+                for metric, board in self.boards.items()
+            }
+            self._cache_version = self.version
+        return self._cache
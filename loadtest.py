@@ -0,0 +1,295 @@
+"""
+Load generator and benchmark harness for ShellTown
+
+Drives thousands of simulated agents from one process as coroutines, through
+shelltown_client's shared connection pool, against a running server. Each bot
+follows one behavior:
+
+    walker      random single-step moves
+    chatter     chats (and the odd emote), reading /perceive between messages
+    pathfinder  walks to random locations with server-side A* (direction=to),
+                or plans locally on /map/collision with --client-paths
+    viewer      no agent: holds a WebSocket open and revalidates /world
+
+Reports p50/p95/p99 latency per endpoint, 429 rates, WebSocket delivery lag
+(from sending a chat to each viewer receiving it) and the server's CPU time,
+and can write everything to a JSON file for comparing runs.
+
+    MAX_AGENTS=5000 python main.py
+    python loadtest.py --bots 2000 --duration 60 --mix walker=5,chatter=2,pathfinder=2,viewer=1 --json run.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+from collision_grid import direction
+from shelltown_client import Bot, ShellTownClient, ShellTownError
+
+BEHAVIORS = ("walker", "chatter", "pathfinder", "viewer")
+DIRECTIONS = ["up", "down", "left", "right"]
+ACTIONS = ["wave", "dance", "laugh", "think"]
+AGENT_ID_SEGMENT = re.compile(r"/[0-9a-f]{8}(?=/|$)")
+LAG_MARKER = re.compile(r"#lt(\d+)$")
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(samples: List[float]) -> dict:
+    """Latency samples in seconds -> milliseconds at p50/p95/p99/max"""
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+class Metrics:
+    """Latencies and status codes per endpoint, plus WebSocket delivery lag"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.transport_errors = 0
+        self.chat_sent_at: Dict[int, float] = {}  # Chat sequence number -> send time
+        self.ws_lag: List[float] = []
+        self.ws_events = 0
+        self.chat_seq = itertools.count()
+
+    def on_response(self, method: str, path: str, status: int, seconds: float):
+        endpoint = f"{method} {AGENT_ID_SEGMENT.sub('/{id}', path)}"
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def on_event(self, event: dict):
+        self.ws_events += 1
+        if event["type"] != "chat":
+            return
+        marker = LAG_MARKER.search(event["data"].get("message", ""))
+        if marker:
+            sent_at = self.chat_sent_at.get(int(marker.group(1)))
+            if sent_at is not None:
+                self.ws_lag.append(time.perf_counter() - sent_at)
+
+    def endpoints(self) -> Dict[str, dict]:
+        result = {}
+        for endpoint in sorted(self.latencies):
+            statuses = self.statuses[endpoint]
+            total = sum(statuses.values())
+            result[endpoint] = {
+                "requests": total,
+                **summarize(self.latencies[endpoint]),
+                "rate_429": round(statuses[429] / total, 4),
+                "errors": sum(count for status, count in statuses.items() if status >= 400 and status != 429),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            }
+        return result
+
+
+async def walker(bot: Bot, metrics: Metrics, args, deadline: float):
+    while time.perf_counter() < deadline:
+        await bot.move(random.choice(DIRECTIONS))
+        await asyncio.sleep(random.uniform(0, 2 * args.think))
+
+
+async def chatter(bot: Bot, metrics: Metrics, args, deadline: float):
+    while time.perf_counter() < deadline:
+        seq = next(metrics.chat_seq)
+        metrics.chat_sent_at[seq] = time.perf_counter()
+        await bot.chat(f"load test chatter #lt{seq}")
+        if random.random() < 0.3:
+            await bot.action(random.choice(ACTIONS))
+        await bot.perceive()
+        await asyncio.sleep(random.uniform(0, 2 * args.think))
+
+
+async def pathfinder(bot: Bot, metrics: Metrics, args, deadline: float):
+    while time.perf_counter() < deadline:
+        target = random.choice(args.targets)
+        if args.grid is not None:
+            # Bot.walk_to, checking the deadline between steps
+            for tile in args.grid.find_path((bot.x, bot.y), (target["x"], target["y"])):
+                result = await bot.move(direction((bot.x, bot.y), tile))
+                if not result.get("success") or time.perf_counter() >= deadline:
+                    break
+            await asyncio.sleep(random.uniform(0, 2 * args.think))
+            continue
+        for _ in range(200):  # Give up on a target after this many steps
+            result = await bot.move_to(target["x"], target["y"])
+            if result.get("at_destination") or result.get("blocked") or time.perf_counter() >= deadline:
+                break
+        await asyncio.sleep(random.uniform(0, 2 * args.think))
+
+
+async def viewer(client: ShellTownClient, metrics: Metrics, args, deadline: float):
+    async def watch():
+        async for event in client.events():
+            metrics.on_event(event)
+
+    watching = asyncio.create_task(watch())
+    try:
+        while time.perf_counter() < deadline:
+            await client.world()
+            await asyncio.sleep(args.view_interval)
+    finally:
+        watching.cancel()
+        await asyncio.gather(watching, return_exceptions=True)
+
+
+async def run_behavior(behavior, subject, metrics: Metrics, args, deadline: float):
+    """Run a behavior until the deadline, restarting it after errors (they are already counted by status)"""
+    while time.perf_counter() < deadline:
+        try:
+            await behavior(subject, metrics, args, deadline)
+        except ShellTownError:
+            await asyncio.sleep(1)
+        except httpx.HTTPError:
+            metrics.transport_errors += 1
+            await asyncio.sleep(1)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in BEHAVIORS:
+            raise SystemExit(f"Unknown behavior {name!r}. Choose from {', '.join(BEHAVIORS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def allocate(total: int, mix: Dict[str, float]) -> Dict[str, int]:
+    """Split total bots across behaviors in proportion to their weights"""
+    weight = sum(mix.values())
+    counts = {name: int(total * w / weight) for name, w in mix.items()}
+    for name in sorted(mix, key=lambda n: -mix[n])[:total - sum(counts.values())]:
+        counts[name] += 1
+    return counts
+
+
+async def spawn(client: ShellTownClient, count: int) -> List[Bot]:
+    """Create count dev agents, ten per /dev/spawn call"""
+    batches = await asyncio.gather(*(client.dev_spawn(min(10, count - i)) for i in range(0, count, 10)))
+    return [bot for batch in batches for bot in batch]
+
+
+async def load_test(args) -> dict:
+    metrics = Metrics()
+    counts = allocate(args.bots, parse_mix(args.mix))
+    client = ShellTownClient(args.url, max_connections=args.connections, on_response=metrics.on_response)
+    if args.no_throttle:
+        client.limiter.intervals.clear()  # Send as fast as the behaviors want; the server's 429s are the result
+    else:
+        await client.sync_limits()
+    args.targets = (await client.request("GET", "/locations"))["locations"]
+    args.grid = await client.collision_map() if args.client_paths else None
+
+    agent_count = args.bots - counts.get("viewer", 0)
+    print(f"Spawning {agent_count} agents...", file=sys.stderr)
+    bots = await spawn(client, agent_count)
+    if len(bots) < agent_count:
+        print(f"Only {len(bots)} agents spawned (raise MAX_AGENTS on the server?)", file=sys.stderr)
+
+    # Viewers get their own client each, like separate browsers; at least one watches for lag
+    viewer_clients = [ShellTownClient(args.url, max_connections=1, on_response=metrics.on_response)
+                      for _ in range(max(1, counts.get("viewer", 0)))]
+    stats_before = await client.request("GET", "/stats")
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    tasks = [run_behavior(viewer, c, metrics, args, deadline) for c in viewer_clients]
+    assigned = iter(bots)
+    for behavior in (walker, chatter, pathfinder):
+        tasks += [run_behavior(behavior, bot, metrics, args, deadline)
+                  for bot in itertools.islice(assigned, counts.get(behavior.__name__, 0))]
+    print(f"Running {counts} for {args.duration}s...", file=sys.stderr)
+    await asyncio.gather(*tasks)
+
+    wall = time.perf_counter() - started
+    stats_after = await client.request("GET", "/stats")
+    if not args.keep:
+        await client.request("DELETE", "/dev/clear")
+    for c in [client, *viewer_clients]:
+        await c.close()
+
+    cpu_before, cpu_after = stats_before.get("cpu_seconds", {}), stats_after.get("cpu_seconds", {})
+    process_cpu = stats_after.get("process_cpu_seconds", 0) - stats_before.get("process_cpu_seconds", 0)
+    requests_sent = sum(len(samples) for samples in metrics.latencies.values())
+    return {
+        "config": {"url": args.url, "bots": args.bots, "agents": len(bots), "behaviors": counts,
+                   "duration": args.duration, "think": args.think, "throttled": not args.no_throttle,
+                   "client_paths": args.client_paths},
+        "wall_seconds": round(wall, 2),
+        "requests": requests_sent,
+        "requests_per_second": round(requests_sent / wall, 1),
+        "transport_errors": metrics.transport_errors,
+        "endpoints": metrics.endpoints(),
+        "websocket": {"viewers": len(viewer_clients), "events": metrics.ws_events,
+                      "chats_timed": len(metrics.ws_lag), **summarize(metrics.ws_lag)},
+        "server": {
+            "process_cpu_seconds": round(process_cpu, 3),
+            "cpu_utilization": round(process_cpu / wall, 3),
+            "cpu_seconds": {name: round(seconds - cpu_before.get(name, 0), 3) for name, seconds in cpu_after.items()},
+        },
+    }
+
+
+def report(result: dict):
+    print(f"{result['requests']} requests in {result['wall_seconds']}s "
+          f"({result['requests_per_second']}/s), {result['transport_errors']} transport errors")
+    print(f"\n{'endpoint':<28} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'429s':>7} {'errors':>7}")
+    for endpoint, row in result["endpoints"].items():
+        print(f"{endpoint:<28} {row['requests']:>9} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['rate_429']:>7.1%} {row['errors']:>7}")
+    ws = result["websocket"]
+    print(f"\nWebSocket: {ws['viewers']} viewers, {ws['events']} events, chat delivery lag "
+          f"p50 {ws['p50_ms']} ms / p95 {ws['p95_ms']} ms / p99 {ws['p99_ms']} ms over {ws['chats_timed']} deliveries")
+    server = result["server"]
+    subsystems = " ".join(f"{name}={seconds:.2f}" for name, seconds in server["cpu_seconds"].items())
+    print(f"Server CPU: {server['process_cpu_seconds']}s ({server['cpu_utilization']:.0%} of one core)  {subsystems}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated agents against a running ShellTown server")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--bots", type=int, default=200, help="Simulated bots, viewers included")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--mix", default="walker=5,chatter=2,pathfinder=2,viewer=1",
+                        help="Behavior weights, e.g. walker=5,chatter=2,pathfinder=2,viewer=1")
+    parser.add_argument("--think", type=float, default=1, help="Average seconds a bot waits between turns")
+    parser.add_argument("--view-interval", type=float, default=2, help="Seconds between a viewer's /world polls")
+    parser.add_argument("--connections", type=int, default=200, help="HTTP connection pool size")
+    parser.add_argument("--client-paths", action="store_true", help="Pathfinders plan routes locally on /map/collision")
+    parser.add_argument("--no-throttle", action="store_true", help="Skip client-side rate limiting")
+    parser.add_argument("--keep", action="store_true", help="Leave the dev agents in the world afterwards")
+    parser.add_argument("--seed", type=int, help="Seed the bots' random choices")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    result = asyncio.run(load_test(args))
+    report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,24 +11,47 @@ Features:
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse, HTMLResponse
+from fastapi.responses import PlainTextResponse, HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional, Set, Tuple
 import asyncio
+import contextvars
+from bisect import bisect_left, bisect_right
+from collections import deque
+import hashlib
+import html
 import json
-import uuid
 import time
 import random
 import secrets
-import requests
-import re
+import httpx
 import os
+import math
 from pathlib import Path
-from collections import defaultdict
+from urllib.parse import quote
+
+from achievements import AchievementEngine
+from collision_grid import CollisionGrid, ENCODINGS as COLLISION_ENCODINGS
+from effects import apply_effect, compile_effect, describe_effect
+from event_store import EventStore
+from expiry import ExpiryWheel
+from leaderboards import Leaderboards
+from memory_store import MemoryStore, MEMORY_SORTS
+from npc_engine import NpcEngine, NPC_EMOJIS
+from rate_limiter import TokenBucketLimiter
+from sim_clock import CpuMeter, VirtualClock, WallClock
+from snapshot_cache import SnapshotCache
+from static_cache import PageTemplate, StaticCache
+from recorder import SessionRecorder
+from job_queue import JobQueue, RetryLater
+from tick_engine import TickEngine
+from tweet_verifier import TweetVerifier
+from relationship_graph import RelationshipGraph, FRIEND_THRESHOLD
+from spatial_index import SpatialGrid
 
 # Data persistence file
-DATA_FILE = Path(__file__).parent / "aicity_data.json"
+DATA_FILE = Path(os.environ.get("DATA_FILE", Path(__file__).parent / "aicity_data.json"))
 
 app = FastAPI(title="ShellTown", description="A Virtual World for AI Agents 🐚")
 
@@ -46,11 +69,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============== CLOCK ==============
+
+# Every timestamp and background sleep goes through `clock`. SIM_CLOCK=virtual swaps in
+# simulated time that only capacity_sim.py advances; never use it for a live server.
+SIM_CLOCK = os.environ.get("SIM_CLOCK", "wall")
+clock = VirtualClock() if SIM_CLOCK == "virtual" else WallClock()
+
+# Process CPU seconds per subsystem (tick, npc, expiry, events, save, decay), shown in /stats.
+# Background jobs are measured across their awaits, so they can include a little of
+# whatever else ran in between.
+cpu = CpuMeter()
+
 # ============== WORLD STATE ==============
 
 MAP_WIDTH = 140
 MAP_HEIGHT = 100
-MAX_AGENTS = 100  # Maximum agents allowed in the world
+MAX_AGENTS = int(os.environ.get("MAX_AGENTS", "100"))  # Maximum agents allowed in the world (NPCs included)
 
 # Spawn points (outdoor locations)
 SPAWN_POINTS = [
@@ -58,6 +93,20 @@ SPAWN_POINTS = [
     (85, 52), (50, 72), (70, 72), (65, 45),
 ]
 
+# Region sharding (see shard_router.py): with SHARD_REGION set this process is one region
+# worker and only simulates agents inside SHARD_BOUNDS = "x0,y0,x1,y1" (x1/y1 exclusive).
+SHARD_REGION = os.environ.get("SHARD_REGION")
+SHARD_BOUNDS = tuple(int(v) for v in os.environ["SHARD_BOUNDS"].split(",")) if SHARD_REGION else (0, 0, MAP_WIDTH, MAP_HEIGHT)
+SHARD_ROUTER = os.environ.get("SHARD_ROUTER", "")
+SHARD_SECRET = os.environ.get("SHARD_SECRET", "")
+
+def in_region(x: int, y: int) -> bool:
+    x0, y0, x1, y1 = SHARD_BOUNDS
+    return x0 <= x < x1 and y0 <= y < y1
+
+# New agents spawn inside this worker's region when it has any spawn points
+REGION_SPAWN_POINTS = [p for p in SPAWN_POINTS if in_region(*p)] or SPAWN_POINTS
+
 # Available character sprites (from assets/characters/)
 AVAILABLE_CHARACTERS = [
     "Abigail_Chen", "Adam_Smith", "Arthur_Burton", "Ayesha_Khan",
@@ -72,9 +121,10 @@ AVAILABLE_CHARACTERS = [
 COLLISION_MAP = []
 COLLISION_WIDTH = 140
 COLLISION_HEIGHT = 100
+collision_grid = CollisionGrid(COLLISION_WIDTH, COLLISION_HEIGHT)  # Compact copy served by /map/collision
 
 def load_collision_map():
-    global COLLISION_MAP, COLLISION_WIDTH, COLLISION_HEIGHT
+    global COLLISION_MAP, COLLISION_WIDTH, COLLISION_HEIGHT, collision_grid
     collision_file = Path(__file__).parent / "collision_map.json"
     if collision_file.exists():
         with open(collision_file) as f:
@@ -85,6 +135,7 @@ def load_collision_map():
         print(f"[COLLISION] Loaded {COLLISION_WIDTH}x{COLLISION_HEIGHT} map with {sum(1 for t in COLLISION_MAP if t != 0)} blocked tiles")
     else:
         print("[COLLISION] No collision map found, movement unrestricted")
+    collision_grid = CollisionGrid.from_tiles(COLLISION_WIDTH, COLLISION_HEIGHT, COLLISION_MAP)
 
 def is_blocked(x: int, y: int) -> bool:
     """Check if a position is blocked using the tilemap collision layer"""
@@ -198,34 +249,81 @@ pending_registrations: Dict[str, dict] = {}
 # These are verified registrations that can now call /join
 verified_registrations: Dict[str, dict] = {}
 
+# Deadlines for inactive agents, unclaimed verification codes and unused registration tokens.
+# Keys are ("agent", agent_id), ("registration", verification_code) or ("token", registration_token)
+expiry = ExpiryWheel()
+AGENT_TIMEOUT = 7200                  # 2 hours without activity -> auto-kick
+PENDING_REGISTRATION_TTL = 6 * 3600   # Verification codes must be claimed within 6 hours
+REGISTRATION_TOKEN_TTL = 24 * 3600    # Registration tokens must be used within a day
+EXPIRY_SWEEP_INTERVAL = 1             # Seconds between expiry sweeps
+expired_counts = {"agents": 0, "registrations": 0, "tokens": 0}
+
 # Used Twitter handles: twitter_handle -> agent_id (one X account = one bot)
 used_twitter_handles: Dict[str, str] = {}
 
 # Base URL for claim links (set this to your deployed URL)
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:8080")
 
-# Rate limiting: agent_id -> {action: last_time}
-rate_limits: Dict[str, dict] = defaultdict(lambda: {"move": 0, "chat": 0})
+# Re-read skill.md and viewer.html when they change on disk (for local development)
+STATIC_HOT_RELOAD = os.environ.get("STATIC_HOT_RELOAD", "") not in ("", "0")
+static_pages = StaticCache(STATIC_HOT_RELOAD)
 
-# Rate limit settings (seconds between actions)
+# Rate limit settings (seconds between actions, sustained)
 RATE_LIMITS = {
     "move": 0.2,   # 5 moves per second max
     "chat": 2.0,   # 1 message per 2 seconds
+    "action": 0.5, # 2 emotes per second
 }
 
+# Burst capacity: how many actions can be banked while idle
+RATE_BURSTS = {
+    "move": 5,
+    "chat": 3,
+    "action": 5,
+}
+
+# Rate limiting: token bucket per (agent_id, action); idle buckets are evicted
+rate_limiter = TokenBucketLimiter(RATE_LIMITS, RATE_BURSTS)
+
 # Chat history
 chat_history: List[dict] = []
 MAX_CHAT_HISTORY = 100
 
+# Unread chats per agent (messages they heard or that were sent to them), drained by /perceive
+chat_inboxes: Dict[str, deque] = {}
+MAX_INBOX = 20
+
+# World version: bumped whenever something /world shows changes (an agent joins, moves,
+# leaves, changes activity or gets verified, or a chat is sent). The change log lets
+# /world?since_version= send just what changed. Versions start at the boot time in ms,
+# so a client's version from before a restart is never mistaken for a newer one.
+world_version = int(clock.time() * 1000)
+WORLD_VERSION_START = world_version
+MAX_WORLD_CHANGES = 10000
+world_changes: deque = deque(maxlen=MAX_WORLD_CHANGES)  # (version, "agent" | "chat", id)
+
+# Hot read views serialized once per version and shared by every reader until the next change
+snapshots = SnapshotCache()
+
 # WebSocket connections
 ws_connections: List[WebSocket] = []
 
 # Relationships: {agent_id: {other_agent_id: relationship_level}}
 # Levels: 0=stranger, 25=acquaintance, 50=friend, 75=good_friend, 100=best_friend
-relationships: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+relationship_graph = RelationshipGraph()
+
+# Agent positions bucketed for proximity queries (nearby agents, chat hearing range)
+agent_grid = SpatialGrid()
+NEARBY_RADIUS = 5    # Tiles - "nearby_agents" in /move responses, romance range
+HEARING_RANGE = 10   # Tiles - who hears a /chat message
 
 # Activities/statuses
 ACTIVITIES = ["exploring", "chatting", "resting", "thinking", "socializing", "dating", "partying", "working"]
+
+# Listing indexes: every agent id in sorted order (stable pagination cursors) and agents by activity
+agent_order: List[str] = []
+agents_by_activity: Dict[str, set] = {}
+MAX_PAGE_SIZE = 500
 MOODS = ["happy", "curious", "excited", "relaxed", "friendly", "romantic", "lonely", "energetic"]
 
 # ============== LOCATIONS ==============
@@ -241,10 +339,40 @@ LOCATIONS = {
     "plaza": {"name": "Market Plaza", "emoji": "🛒", "x": 62, "y": 58, "radius": 6, "effect": "social"},
 }
 
+# Need changes for everyone at a location, per LOCATION_EFFECT_INTERVAL spent there
+LOCATION_EFFECTS = {
+    "energy": {"energy": 1},
+    "food": {"hunger": 2, "energy": 1},      # Café restores hunger AND energy
+    "relax": {"energy": 1, "happiness": 1},  # Beach restores energy AND happiness
+    "fun": {"fun": 1},
+    "social": {"social": 0.5},
+    "romantic": {"romance": 1},
+    "thinking": {"happiness": 0.5},          # Library: satisfaction from learning
+}
+LOCATION_EFFECT_INTERVAL = 5  # Seconds
+LOCATION_EFFECT_VECTORS = {loc_id: compile_effect(LOCATION_EFFECTS[loc["effect"]]) for loc_id, loc in LOCATIONS.items()}
+
+def build_location_tiles() -> Dict[tuple, str]:
+    """Tile -> location id (the first location listed wins where two overlap)"""
+    tiles = {}
+    for loc_id, loc in LOCATIONS.items():
+        r = loc["radius"]
+        for dx in range(-r, r + 1):
+            for dy in range(abs(dx) - r, r - abs(dx) + 1):
+                tiles.setdefault((loc["x"] + dx, loc["y"] + dy), loc_id)
+    return tiles
+
+LOCATION_TILES = build_location_tiles()
+
+# Occupancy index: location id -> agents there, and agent_id -> location id
+location_occupants: Dict[str, set] = {loc_id: set() for loc_id in LOCATIONS}
+agent_locations: Dict[str, str] = {}
+
 # ============== EVENTS ==============
-# Active events in the world
-active_events: List[dict] = []
+# Active events in the world, indexed by id, position and end time
+event_store = EventStore()
 EVENT_TYPES = ["party", "concert", "meetup", "speed_dating", "festival", "workshop"]
+EVENT_SWEEP_INTERVAL = 5  # Max seconds between expiry checks (new events may end sooner than the next known one)
 
 # ============== ROMANCE ==============
 # Romance relationships: {agent_id: {partner_id: {"status": "dating/engaged/married", "since": timestamp}}}
@@ -261,10 +389,23 @@ ACHIEVEMENTS = {
     "bookworm": {"name": "Bookworm", "emoji": "📖", "desc": "Visit library 10 times", "threshold": 10, "type": "library_visits"},
     "romantic": {"name": "Romantic", "emoji": "💕", "desc": "Go on a date", "threshold": 1, "type": "dates"},
     "married": {"name": "Happily Married", "emoji": "💍", "desc": "Get married", "threshold": 1, "type": "married"},
-    "party_animal": {"name": "Party Animal", "emoji": "🎉", "desc": "Attend 5 events", "threshold": 5, "type": "events"},
+    "party_animal": {"name": "Party Animal", "emoji": "🎉", "desc": "Attend 5 events", "threshold": 5, "type": "events_attended"},
     "veteran": {"name": "Veteran", "emoji": "🏆", "desc": "Move 1000 times", "threshold": 1000, "type": "moves"},
 }
 
+# Leaderboards: response key -> ranked metric, kept in order as counters change
+LEADERBOARDS = {
+    "most_social": "messages",
+    "most_active": "moves",
+    "most_achievements": "achievements",
+    "most_friends": "friends",
+}
+LEADERBOARD_SIZE = 10
+leaderboards = Leaderboards(LEADERBOARDS.values(), size=LEADERBOARD_SIZE)
+
+# Thresholds indexed by "type"; a type is any stat reported to check_achievements()
+achievement_engine = AchievementEngine(ACHIEVEMENTS)
+
 # Public activity feed
 activity_feed: List[dict] = []
 MAX_FEED_SIZE = 200
@@ -286,47 +427,89 @@ HOMES = {
 housing: Dict[str, str] = {}
 
 # ============== MEMORIES ==============
-# Agent memories: agent_id -> list of memory entries
-agent_memories: Dict[str, List[dict]] = {}
+# Agent memories: agent_id -> MemoryStore (insertion ordered, importance x recency eviction)
+agent_memories: Dict[str, MemoryStore] = {}
 
 # ============== PERSISTENCE ==============
 
-def save_world():
-    """Save world state to file"""
-    data = {
+def world_data() -> dict:
+    """Everything that is persisted between restarts"""
+    return {
         "agents": agents,
         "api_keys": api_keys,
-        "relationships": {k: dict(v) for k, v in relationships.items()},
+        "relationships": relationship_graph.to_dict(),
         "romance": romance,
-        "active_events": active_events,
+        "active_events": event_store.to_list(),
         "activity_feed": activity_feed[-100:],
         "chat_history": chat_history[-50:],
         "used_twitter_handles": used_twitter_handles,
-        "saved_at": time.time()
+        "memories": {agent_id: store.to_list() for agent_id, store in agent_memories.items()},
+        "saved_at": clock.time()
     }
+
+def restore_world(data: dict):
+    """Replace the world state with a world_data() snapshot and rebuild the indexes"""
+    global agents, api_keys, chat_history, romance, activity_feed, used_twitter_handles
+    agents = data.get("agents", {})
+    api_keys = data.get("api_keys", {})
+    relationship_graph.load(data.get("relationships", {}))
+    chat_history = data.get("chat_history", [])
+    romance = data.get("romance", {})
+    event_store.load(data.get("active_events", []))
+    activity_feed = data.get("activity_feed", [])
+    used_twitter_handles = data.get("used_twitter_handles", {})
+    agent_memories.clear()
+    for agent_id, memories in data.get("memories", {}).items():
+        if agent_id in agents:
+            agent_memories[agent_id] = MemoryStore.from_list(memories)
+    agent_grid.clear()
+    agent_locations.clear()
+    agent_order.clear()
+    agents_by_activity.clear()
+    chat_inboxes.clear()
+    perception_cache.clear()
+    for occupants in location_occupants.values():
+        occupants.clear()
+    leaderboards.clear()
+    for agent in agents.values():
+        index_agent(agent)
+        rank_agent(agent)
+        expiry.schedule(("agent", agent["agent_id"]), agent["last_seen"] + AGENT_TIMEOUT)
+
+def save_world():
+    """Save world state to file"""
     with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+        json.dump(world_data(), f, indent=2)
 
 def load_world():
     """Load world state from file"""
-    global agents, api_keys, relationships, chat_history, romance, active_events, activity_feed, used_twitter_handles
     if DATA_FILE.exists():
         try:
             with open(DATA_FILE) as f:
-                data = json.load(f)
-            agents = data.get("agents", {})
-            api_keys = data.get("api_keys", {})
-            for k, v in data.get("relationships", {}).items():
-                relationships[k] = defaultdict(int, v)
-            chat_history = data.get("chat_history", [])
-            romance = data.get("romance", {})
-            active_events = data.get("active_events", [])
-            activity_feed = data.get("activity_feed", [])
-            used_twitter_handles = data.get("used_twitter_handles", {})
+                restore_world(json.load(f))
             print(f"[LOAD] Restored {len(agents)} agents, {len(chat_history)} messages, {len(used_twitter_handles)} verified X accounts")
         except Exception as e:
             print(f"[LOAD] Failed to load data: {e}")
 
+def world_fingerprint() -> str:
+    """Hash of the simulated state (positions, counters, needs, social graph), leaving out
+    timestamps and generated secrets, for checking that a replay matches"""
+    state = {
+        "agents": {
+            agent_id: {
+                "x": a["x"], "y": a["y"],
+                "message_count": a.get("message_count", 0), "move_count": a.get("move_count", 0),
+                "needs": a.get("needs", {}), "mood": a.get("mood"), "activity": a.get("activity"),
+                "friends": sorted(a.get("friends", [])), "achievements": sorted(a.get("achievements", [])),
+                "money": a.get("money"), "stats": a.get("stats", {}),
+            }
+            for agent_id, a in agents.items()
+        },
+        "relationships": relationship_graph.to_dict(),
+        "romance": {a: {b: rel["status"] for b, rel in partners.items()} for a, partners in romance.items()},
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
 # ============== MODELS ==============
 
 class RegisterRequest(BaseModel):
@@ -370,78 +553,288 @@ class RomanceRequest(BaseModel):
 # ============== HELPERS ==============
 
 def get_random_spawn():
-    return random.choice(SPAWN_POINTS)
+    return command_rng.get().choice(REGION_SPAWN_POINTS)
+
+def new_id() -> str:
+    """Short random id for agents, events and messages (reproducible under replay)"""
+    return f"{command_rng.get().getrandbits(32):08x}"
 
 def clamp(value, min_val, max_val):
     return max(min_val, min(max_val, value))
 
 def get_agent_location(agent: dict) -> Optional[dict]:
     """Get the location an agent is currently at"""
-    for loc_id, loc in LOCATIONS.items():
-        dist = abs(agent["x"] - loc["x"]) + abs(agent["y"] - loc["y"])
-        if dist <= loc["radius"]:
-            return {"id": loc_id, **loc}
-    return None
+    loc_id = LOCATION_TILES.get((agent["x"], agent["y"]))
+    if loc_id is None:
+        return None
+    return {"id": loc_id, **LOCATIONS[loc_id]}
+
+def mark_changed(kind: str, item_id: str):
+    """Bump the world version for a changed agent or a new chat"""
+    global world_version
+    world_version += 1
+    world_changes.append((world_version, kind, item_id))
+
+def index_agent(agent: dict):
+    """Add or move an agent in the proximity, location occupancy and listing indexes"""
+    agent_id = agent["agent_id"]
+    mark_changed("agent", agent_id)
+    i = bisect_left(agent_order, agent_id)
+    if i == len(agent_order) or agent_order[i] != agent_id:
+        agent_order.insert(i, agent_id)
+        agents_by_activity.setdefault(agent.get("activity", "exploring"), set()).add(agent_id)
+    agent_grid.insert(agent_id, agent["x"], agent["y"])
+    loc_id = LOCATION_TILES.get((agent["x"], agent["y"]))
+    old = agent_locations.get(agent_id)
+    if loc_id != old:
+        if old is not None:
+            location_occupants[old].discard(agent_id)
+        if loc_id is None:
+            del agent_locations[agent_id]
+        else:
+            location_occupants[loc_id].add(agent_id)
+            agent_locations[agent_id] = loc_id
+
+def unindex_agent(agent_id: str):
+    mark_changed("agent", agent_id)
+    agent_grid.remove(agent_id)
+    i = bisect_left(agent_order, agent_id)
+    if i < len(agent_order) and agent_order[i] == agent_id:
+        del agent_order[i]
+    for members in agents_by_activity.values():
+        members.discard(agent_id)
+    loc_id = agent_locations.pop(agent_id, None)
+    if loc_id is not None:
+        location_occupants[loc_id].discard(agent_id)
+
+def change_activity(agent: dict, activity: str):
+    """Change an agent's activity, keeping the activity index and world version in step"""
+    if agent.get("activity") == activity:
+        return
+    agents_by_activity.get(agent.get("activity"), set()).discard(agent["agent_id"])
+    agents_by_activity.setdefault(activity, set()).add(agent["agent_id"])
+    agent["activity"] = activity
+    mark_changed("agent", agent["agent_id"])
+
+def select_agents(activity: Optional[str] = None, location: Optional[str] = None,
+                  among: Optional[List[str]] = None, cursor: Optional[str] = None,
+                  limit: Optional[int] = None) -> Tuple[List[str], Optional[str]]:
+    """One page of agent ids, in agent_id order, matching the filters (answered from the
+    activity and occupancy indexes). Returns (ids, cursor for the next page or None)."""
+    if activity is not None and activity not in ACTIVITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid activity. Choose: {ACTIVITIES}")
+    if location is not None and location not in LOCATIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown location. Choose: {list(LOCATIONS)}")
+
+    filters = []
+    if activity is not None:
+        filters.append(agents_by_activity.get(activity, set()))
+    if location is not None:
+        filters.append(location_occupants[location])
+    if among is not None:
+        filters.append(set(among))
+    if filters:
+        filters.sort(key=len)
+        ids = sorted(filters[0].intersection(*filters[1:]))
+    else:
+        ids = agent_order
+
+    start = bisect_right(ids, cursor) if cursor else 0
+    if limit is None:
+        return ids[start:], None
+    end = start + clamp(limit, 1, MAX_PAGE_SIZE)
+    return ids[start:end], (ids[end - 1] if end < len(ids) else None)
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> Optional[List[str]]:
+    """"x,y,sprite" -> the fields to return (agent_id always included), None for all"""
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}. Choose from: {allowed}")
+    return ["agent_id"] + [f for f in wanted if f != "agent_id"]
+
+def project(entry: dict, fields: Optional[List[str]]) -> dict:
+    return entry if fields is None else {f: entry[f] for f in fields}
+
+def touch_agent(agent: dict):
+    """Mark an agent as active now and push back its inactivity deadline"""
+    now = clock.time()
+    agent["last_seen"] = now
+    expiry.schedule(("agent", agent["agent_id"]), now + AGENT_TIMEOUT)
+
+def rank_agent(agent: dict):
+    """Push an agent's current counters into every leaderboard"""
+    agent_id = agent["agent_id"]
+    leaderboards.update("messages", agent_id, agent.get("message_count", 0))
+    leaderboards.update("moves", agent_id, agent.get("move_count", 0))
+    leaderboards.update("achievements", agent_id, len(agent.get("achievements", [])))
+    leaderboards.update("friends", agent_id, len(agent.get("friends", [])))
+
+def forget_agent(agent_id: str):
+    """Drop a departed agent from the indexes and per-agent state"""
+    unindex_agent(agent_id)
+    leaderboards.remove(agent_id)
+    achievement_engine.forget(agent_id)
+    agent_memories.pop(agent_id, None)
+    rate_limiter.forget(agent_id)
+    expiry.cancel(("agent", agent_id))
+    agent_paths.pop(agent_id, None)
+    chat_inboxes.pop(agent_id, None)
+    perception_cache.pop(agent_id, None)
+    if npc_engine is not None:
+        npc_engine.forget(agent_id)
+
+def add_agent(profile: dict, needs: dict, activity: str = "exploring") -> Tuple[dict, str]:
+    """Put a new verified agent in the world at a random spawn point. Returns (agent, api_key).
+    profile holds name, description, emoji, sprite, twitter_handle and verified_at."""
+    agent_id = new_id()
+    api_key = secrets.token_urlsafe(32)
+    spawn_x, spawn_y = get_random_spawn()
+
+    agent = {
+        "agent_id": agent_id,
+        "name": profile["name"],
+        "description": profile["description"],
+        "emoji": profile["emoji"],
+        "sprite": profile["sprite"],
+        "x": spawn_x,
+        "y": spawn_y,
+        "last_seen": clock.time(),
+        "joined_at": clock.time(),
+        "verified": True,
+        "twitter_handle": profile["twitter_handle"],
+        "verified_at": profile["verified_at"],
+        "message_count": 0,
+        "move_count": 0,
+        # Sims-like stats (0-100)
+        "needs": needs,
+        "mood": command_rng.get().choice(MOODS),
+        "activity": activity,
+        "friends": [],
+        "achievements": [],
+        "money": STARTING_MONEY,
+        "home": None,
+        "stats": {
+            "locations_visited": [],
+            "club_visits": 0,
+            "library_visits": 0,
+            "dates": 0,
+            "events_attended": 0,
+            "events_hosted": 0,
+            "money_earned": 0,
+            "money_spent": 0,
+        },
+    }
+
+    # Initialize memories for this agent
+    agent_memories[agent_id] = MemoryStore()
+
+    agents[agent_id] = agent
+    api_keys[api_key] = agent_id
+    touch_agent(agent)
+    index_agent(agent)
+    rank_agent(agent)
+    return agent, api_key
+
+async def remove_agent(agent_id: str, reason: Optional[str] = None) -> Optional[dict]:
+    """Take an agent out of the world, clean up its state and tell viewers"""
+    agent = agents.pop(agent_id, None)
+    if agent is None:
+        return None
+    forget_agent(agent_id)
+
+    # Clean up API key
+    for key, aid in list(api_keys.items()):
+        if aid == agent_id:
+            del api_keys[key]
+
+    # NOTE: Twitter handle stays linked - one X account = one bot forever (like Moltbook)
+
+    data = {"agent_id": agent_id, "name": agent["name"]}
+    if reason:
+        data["reason"] = reason
+    await broadcast_update("agent_left", data)
+    return agent
+
+def get_nearby_agents(agent: dict, radius: int) -> List[tuple]:
+    """(other_id, distance) for every other agent within radius tiles"""
+    return [
+        (other_id, dist)
+        for other_id, dist in agent_grid.query(agent["x"], agent["y"], radius)
+        if other_id != agent["agent_id"]
+    ]
+
+def apply_relationship_updates(updates: List[tuple]) -> List[tuple]:
+    """Apply (agent_id, other_id, delta) edge updates and promote new friends"""
+    changes = relationship_graph.update_many(updates)
+    for agent_id, other_id, old, new in changes:
+        agent = agents.get(agent_id)
+        if agent is None:
+            continue
+        if old == 0:
+            check_achievements(agent, "relationships", relationship_graph.degree(agent_id))
+        if old < FRIEND_THRESHOLD <= new:
+            friends = agent.setdefault("friends", [])
+            if other_id not in friends:
+                friends.append(other_id)
+                leaderboards.update("friends", agent_id, len(friends))
+                check_achievements(agent, "friends", len(friends))
+    return changes
+
+async def apply_location_effects():
+    """One pass over every location's occupants, applying that location's effect vector"""
+    for loc_id, occupants in location_occupants.items():
+        effect = LOCATION_EFFECT_VECTORS[loc_id]
+        for agent_id in occupants:
+            apply_effect(agents[agent_id]["needs"], effect)
 
 def log_activity(activity_type: str, data: dict):
     """Log an activity to the public feed"""
     entry = {
         "type": activity_type,
         "data": data,
-        "timestamp": time.time()
+        "timestamp": clock.time()
     }
     activity_feed.append(entry)
     if len(activity_feed) > MAX_FEED_SIZE:
         activity_feed.pop(0)
 
-def check_achievements(agent: dict) -> List[str]:
-    """Check and award any new achievements"""
-    new_achievements = []
-    current = agent.get("achievements", [])
-    stats = agent.get("stats", {})
-
-    for ach_id, ach in ACHIEVEMENTS.items():
-        if ach_id in current:
-            continue
-
-        earned = False
-        if ach["type"] == "moves" and agent.get("move_count", 0) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "messages" and agent.get("message_count", 0) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "friends" and len(agent.get("friends", [])) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "locations" and len(stats.get("locations_visited", [])) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "relationships" and len(relationships.get(agent["agent_id"], {})) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "club_visits" and stats.get("club_visits", 0) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "library_visits" and stats.get("library_visits", 0) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "dates" and stats.get("dates", 0) >= ach["threshold"]:
-            earned = True
-        elif ach["type"] == "married" and agent["agent_id"] in romance and any(
-            r.get("status") == "married" for r in romance[agent["agent_id"]].values()
-        ):
-            earned = True
-        elif ach["type"] == "events" and stats.get("events_attended", 0) >= ach["threshold"]:
-            earned = True
-
-        if earned:
-            current.append(ach_id)
-            new_achievements.append(ach_id)
-            log_activity("achievement", {
-                "agent_id": agent["agent_id"],
-                "agent_name": agent["name"],
-                "achievement": ach_id,
-                "achievement_name": ach["name"],
-                "emoji": ach["emoji"]
-            })
+def check_achievements(agent: dict, stat_type: str, value: float) -> List[str]:
+    """Award any achievements unlocked by one of the agent's stats reaching value.
+    During a simulation tick the check is deferred to the tick's achievement phase."""
+    if tick_frame is not None:
+        deferred_achievements[(agent["agent_id"], stat_type)] = value
+        return []
+    return award_achievements(agent, stat_type, value)
+
+def award_achievements(agent: dict, stat_type: str, value: float) -> List[str]:
+    current = agent.setdefault("achievements", [])
+    new_achievements = achievement_engine.evaluate(agent["agent_id"], current, stat_type, value)
+
+    for ach_id in new_achievements:
+        ach = ACHIEVEMENTS[ach_id]
+        current.append(ach_id)
+        log_activity("achievement", {
+            "agent_id": agent["agent_id"],
+            "agent_name": agent["name"],
+            "achievement": ach_id,
+            "achievement_name": ach["name"],
+            "emoji": ach["emoji"]
+        })
 
-    agent["achievements"] = current
+    if new_achievements:
+        leaderboards.update("achievements", agent["agent_id"], len(current))
     return new_achievements
 
+def bump_stat(agent: dict, stat: str, amount: int = 1) -> int:
+    """Increment a counter in agent["stats"] and check achievements of that type"""
+    stats = agent.setdefault("stats", {})
+    stats[stat] = stats.get(stat, 0) + amount
+    check_achievements(agent, stat, stats[stat])
+    return stats[stat]
+
 def get_romance_status(agent_id: str) -> Optional[dict]:
     """Get an agent's current romance status"""
     if agent_id not in romance:
@@ -456,17 +849,24 @@ def get_romance_status(agent_id: str) -> Optional[dict]:
             }
     return None
 
-def check_rate_limit(agent_id: str, action: str) -> bool:
-    """Check if action is rate limited. Returns True if allowed."""
-    now = time.time()
-    last_time = rate_limits[agent_id].get(action, 0)
-    if now - last_time < RATE_LIMITS.get(action, 0):
-        return False
-    rate_limits[agent_id][action] = now
-    return True
+def check_rate_limit(agent_id: str, action: str, detail: str = "Too many requests. Slow down!"):
+    """Spend a rate-limit token for action. Raises 429 with Retry-After if none are left.
+    Call only after the agent lookup so unknown ids never get a bucket."""
+    retry_after = rate_limiter.acquire(agent_id, action, clock.time())
+    if retry_after > 0:
+        raise HTTPException(status_code=429, detail=detail, headers={
+            "Retry-After": str(math.ceil(retry_after)),
+            "X-RateLimit-Reset-After": f"{retry_after:.3f}",
+        })
 
 async def broadcast_update(update_type: str, data: dict):
-    message = json.dumps({"type": update_type, "data": data})
+    if tick_frame is not None:
+        # Inside a simulation tick: sent with everything else as one "tick" frame
+        tick_frame.append({"type": update_type, "data": data})
+        return
+    await send_to_viewers(json.dumps({"type": update_type, "data": data}))
+
+async def send_to_viewers(message: str):
     disconnected = []
     for ws in ws_connections:
         try:
@@ -479,40 +879,18 @@ async def broadcast_update(update_type: str, data: dict):
 
 # ============== TWITTER VERIFICATION ==============
 
-def verify_tweet(tweet_url: str, verification_code: str) -> dict:
-    """
-    Verify a tweet contains the verification code using Twitter's oEmbed API.
-    Returns {"success": True/False, "twitter_handle": str or None, "error": str or None}
-    """
-    try:
-        # Validate tweet URL format
-        tweet_pattern = r'https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+)'
-        match = re.match(tweet_pattern, tweet_url)
-        if not match:
-            return {"success": False, "twitter_handle": None, "error": "Invalid tweet URL format"}
-
-        twitter_handle = match.group(1)
-
-        # Use Twitter's oEmbed API (no auth required)
-        oembed_url = f"https://publish.twitter.com/oembed?url={tweet_url}"
-        response = requests.get(oembed_url, timeout=10)
-
-        if response.status_code != 200:
-            return {"success": False, "twitter_handle": None, "error": "Could not fetch tweet. Make sure it's public."}
-
-        data = response.json()
-        tweet_html = data.get("html", "")
-
-        # Check if verification code is in the tweet
-        if verification_code.lower() in tweet_html.lower():
-            return {"success": True, "twitter_handle": twitter_handle, "error": None}
-        else:
-            return {"success": False, "twitter_handle": twitter_handle, "error": "Verification code not found in tweet"}
+# oEmbed endpoint used to read tweets (point at oembed_stub.py for tests and load runs)
+OEMBED_URL = os.environ.get("OEMBED_URL", "https://publish.twitter.com/oembed")
+VERIFY_CONCURRENCY = int(os.environ.get("VERIFY_CONCURRENCY", "8"))  # Concurrent oEmbed fetches
+OEMBED_CACHE_TTL = 300  # Seconds a fetched tweet is reused (people retry the same link)
+tweet_verifier = TweetVerifier(OEMBED_URL, VERIFY_CONCURRENCY, OEMBED_CACHE_TTL, now=clock.monotonic)
 
-    except requests.exceptions.Timeout:
-        return {"success": False, "twitter_handle": None, "error": "Request timed out"}
-    except Exception as e:
-        return {"success": False, "twitter_handle": None, "error": str(e)}
+# Claim checks run on background workers (see job_queue.py); the claim page polls for the result
+VERIFY_WORKERS = int(os.environ.get("VERIFY_WORKERS", "4"))
+VERIFY_MAX_ATTEMPTS = 4   # Transient fetch failures are retried after 2, 4 and 8 seconds
+CLAIM_JOB_TTL = 3600      # Seconds a job's status stays available
+claim_queue = JobQueue(lambda job: run_claim_job(job),  # Defined with the claim endpoints
+                       clock, VERIFY_WORKERS, VERIFY_MAX_ATTEMPTS, backoff=2)
 
 # ============== API ENDPOINTS ==============
 
@@ -529,6 +907,10 @@ async def root():
             "2. Human verifies via Twitter on /claim/{code}",
             "3. POST /join with registration_token - Enter ShellTown!"
         ],
+        "rate_limits": {
+            action: {"interval": RATE_LIMITS[action], "burst": RATE_BURSTS[action]}
+            for action in RATE_LIMITS
+        },
         "endpoints": {
             "GET /skill.md": "Instructions for bots",
             "POST /register": "Step 1: Register to get verification code",
@@ -536,20 +918,66 @@ async def root():
             "POST /join": "Step 3: Join with registration_token (after verification)",
             "POST /move": "Move your agent",
             "POST /chat": "Send a message",
+            "POST /batch": "Run several commands (move, chat, action, activity, memory, me) in one request",
             "GET /world": "Get world state",
+            "GET /map/collision": "Blocked tiles (run-length encoded) for planning routes yourself",
+            "GET /perceive/{agent_id}": "Everything near you: agents, location, events, unread chats, needs, romance",
             "GET /agents": "List all agents",
             "DELETE /leave/{agent_id}": "Leave the world",
+            "GET /stats": "Server registry sizes and expiry counts",
+            "POST /dev/npcs": "DEV MODE: spawn server-driven NPCs (tick mode)",
             "WS /ws": "Real-time updates for viewers"
         }
     }
 
 @app.get("/skill.md", response_class=PlainTextResponse)
-async def get_skill():
+async def get_skill(request: Request):
     """Serve instructions for Claude bots"""
-    skill_path = Path(__file__).parent / "skill.md"
-    if skill_path.exists():
-        return skill_path.read_text()
-    return "# AICITY\n\nInstructions not found. Check /api docs."
+    return static_pages.response("skill.md", request)
+
+def load_static_responses():
+    """Render the pages and catalogs that only change on deploy (see static_cache.py)"""
+    base_dir = Path(__file__).parent
+    ws_url = BASE_URL.replace("https://", "wss://").replace("http://", "ws://") + "/ws"
+
+    static_pages.add_file("skill.md", base_dir / "skill.md", "text/plain; charset=utf-8",
+                          fallback="# AICITY\n\nInstructions not found. Check /api docs.")
+    # Inject the WebSocket and API URLs into the viewer template
+    static_pages.add_file(
+        "viewer", base_dir / "viewer.html", "text/html; charset=utf-8",
+        render=lambda text: text.replace("'{{WS_URL}}'", f"'{ws_url}'").replace("'{{BASE_URL}}'", f"'{BASE_URL}'"),
+        fallback=VIEWER_FALLBACK.format(ws_url=ws_url),
+    )
+    static_pages.add_json("locations", lambda: {
+        "locations": [
+            {"id": loc_id, **loc}
+            for loc_id, loc in LOCATIONS.items()
+        ]
+    })
+    static_pages.add_json("achievements", lambda: {
+        "achievements": [
+            {"id": ach_id, **ach}
+            for ach_id, ach in ACHIEVEMENTS.items()
+        ]
+    })
+    static_pages.add_json("actions", lambda: {
+        "actions": {
+            name: {
+                "emoji": data["emoji"],
+                "message": data["message"],
+                "effects": data.get("effect", {}),
+                "requires_location": data.get("requires_location")
+            }
+            for name, data in ACTIONS.items()
+        }
+    })
+    static_pages.add_json("characters", lambda: {
+        "characters": AVAILABLE_CHARACTERS,
+        "count": len(AVAILABLE_CHARACTERS),
+        "description": "Pass one of these names as 'sprite' when joining to use that character appearance"
+    })
+    for encoding in COLLISION_ENCODINGS:
+        static_pages.add_json(f"collision_{encoding}", lambda encoding=encoding: collision_grid.payload(encoding))
 
 # ============== REGISTRATION (Step 1 - Before Verification) ==============
 
@@ -585,8 +1013,9 @@ async def register_bot(request: RegisterRequest):
         "description": request.description or "",
         "emoji": request.emoji or "🤖",
         "sprite": sprite,
-        "created_at": time.time()
+        "created_at": clock.time()
     }
+    expiry.schedule(("registration", verification_code), clock.time() + PENDING_REGISTRATION_TTL)
 
     claim_url = f"{BASE_URL}/claim/{verification_code}"
 
@@ -608,21 +1037,12 @@ async def register_bot(request: RegisterRequest):
     }
 
 @app.get("/viewer", response_class=HTMLResponse)
-async def viewer():
+async def viewer(request: Request):
     """Visual frontend to watch agents in real-time - Full Phaser tilemap viewer"""
-    # Determine WebSocket URL based on BASE_URL
-    ws_url = BASE_URL.replace("https://", "wss://").replace("http://", "ws://") + "/ws"
+    return static_pages.response("viewer", request)
 
-    # Load the viewer.html template and inject URLs
-    viewer_path = Path(__file__).parent / "viewer.html"
-    if viewer_path.exists():
-        html_content = viewer_path.read_text()
-        html_content = html_content.replace("'{{WS_URL}}'", f"'{ws_url}'")
-        html_content = html_content.replace("'{{BASE_URL}}'", f"'{BASE_URL}'")
-        return html_content
-
-    # Fallback simple viewer if file not found
-    return f"""<!DOCTYPE html>
+# Fallback simple viewer if viewer.html is not found
+VIEWER_FALLBACK = """<!DOCTYPE html>
 <html><head><title>ShellTown</title></head>
 <body style="background:#1a1a2e;color:#fff;font-family:sans-serif;text-align:center;padding:50px;">
 <h1>ShellTown Viewer</h1>
@@ -663,68 +1083,32 @@ async def join_world(request: JoinRequest):
 
     # Get verified registration data
     reg = verified_registrations.pop(request.registration_token)  # One-time use token
+    expiry.cancel(("token", request.registration_token))
+
+    return await run_command("join", apply_join, reg)
 
+async def apply_join(reg: dict) -> dict:
+    """Create the agent for a verified registration"""
     # Double-check name isn't taken (in case someone registered with same name in the meantime)
     for agent in agents.values():
         if agent["name"].lower() == reg["name"].lower():
             raise HTTPException(status_code=400, detail="Name was taken while verifying. Please /register again with a new name.")
 
     # Create agent with API key
-    agent_id = str(uuid.uuid4())[:8]
-    api_key = secrets.token_urlsafe(32)
-    spawn_x, spawn_y = get_random_spawn()
-
-    agent = {
-        "agent_id": agent_id,
-        "name": reg["name"],
-        "description": reg["description"],
-        "emoji": reg["emoji"],
-        "sprite": reg["sprite"],
-        "x": spawn_x,
-        "y": spawn_y,
-        "last_seen": time.time(),
-        "joined_at": time.time(),
-        "verified": True,  # Already verified via Twitter!
-        "twitter_handle": reg["twitter_handle"],
-        "verified_at": reg["verified_at"],
-        "message_count": 0,
-        "move_count": 0,
-        # Sims-like stats (0-100)
-        "needs": {
-            "social": 50,
-            "energy": 100,
-            "fun": 50,
-            "romance": 30,
-            "hunger": 80,
-            "happiness": 70,
-        },
-        "mood": random.choice(MOODS),
-        "activity": "exploring",
-        "friends": [],
-        "achievements": [],
-        "money": STARTING_MONEY,
-        "home": None,
-        "stats": {
-            "locations_visited": [],
-            "club_visits": 0,
-            "library_visits": 0,
-            "dates": 0,
-            "events_attended": 0,
-            "events_hosted": 0,
-            "money_earned": 0,
-            "money_spent": 0,
-        },
-    }
+    agent, api_key = add_agent(reg, {
+        "social": 50,
+        "energy": 100,
+        "fun": 50,
+        "romance": 30,
+        "hunger": 80,
+        "happiness": 70,
+    })
+    agent_id = agent["agent_id"]
+    spawn_x, spawn_y = agent["x"], agent["y"]
 
     # Track Twitter handle as used
     used_twitter_handles[reg["twitter_handle"].lower()] = agent_id
 
-    # Initialize memories for this agent
-    agent_memories[agent_id] = []
-
-    agents[agent_id] = agent
-    api_keys[api_key] = agent_id
-
     log_activity("agent_verified", {
         "agent_id": agent_id,
         "agent_name": agent["name"],
@@ -796,62 +1180,42 @@ async def dev_spawn_agents(request: DevSpawnRequest):
     if len(agents) + count > MAX_AGENTS:
         raise HTTPException(status_code=503, detail=f"Would exceed max agents. Currently {len(agents)}/{MAX_AGENTS}")
 
+    return await run_command("dev_spawn", apply_dev_spawn, request)
+
+async def apply_dev_spawn(request: DevSpawnRequest) -> dict:
+    rng = command_rng.get()
+    count = min(request.count, 10)
     spawned = []
-    available_names = [n for n in DEV_AGENT_NAMES if not any(a["name"] == n[0] for a in agents.values())]
-    random.shuffle(available_names)
+    taken = {a["name"] for a in agents.values()}
+    available_names = [n for n in DEV_AGENT_NAMES if n[0] not in taken]
+    rng.shuffle(available_names)
+    # Once every name is taken, number them (Marcus 2, Elena 2, ...) so load tests can spawn thousands
+    suffix = 2
+    while len(available_names) < count:
+        available_names += [(f"{name} {suffix}", emoji, description)
+                            for name, emoji, description in DEV_AGENT_NAMES if f"{name} {suffix}" not in taken]
+        suffix += 1
 
     for i in range(min(count, len(available_names))):
         name, emoji, description = available_names[i]
 
-        agent_id = str(uuid.uuid4())[:8]
-        api_key = secrets.token_urlsafe(32)
-        spawn_x, spawn_y = get_random_spawn()
-        sprite = random.choice(AVAILABLE_CHARACTERS)
-
-        agent = {
-            "agent_id": agent_id,
+        agent, api_key = add_agent({
             "name": name,
             "description": description,
             "emoji": emoji,
-            "sprite": sprite,
-            "x": spawn_x,
-            "y": spawn_y,
-            "last_seen": time.time(),
-            "joined_at": time.time(),
-            "verified": True,
-            "twitter_handle": f"dev_{name.lower()}",  # Fake handle
-            "verified_at": time.time(),
-            "message_count": 0,
-            "move_count": 0,
-            "needs": {
-                "social": random.randint(40, 80),
-                "energy": random.randint(60, 100),
-                "fun": random.randint(40, 80),
-                "romance": random.randint(20, 50),
-                "hunger": random.randint(60, 100),
-                "happiness": random.randint(50, 90),
-            },
-            "mood": random.choice(MOODS),
-            "activity": random.choice(["exploring", "chatting", "resting", "thinking", "socializing"]),
-            "friends": [],
-            "achievements": [],
-            "money": STARTING_MONEY,
-            "home": None,
-            "stats": {
-                "locations_visited": [],
-                "club_visits": 0,
-                "library_visits": 0,
-                "dates": 0,
-                "events_attended": 0,
-                "events_hosted": 0,
-                "money_earned": 0,
-                "money_spent": 0,
-            },
-        }
-
-        agent_memories[agent_id] = []
-        agents[agent_id] = agent
-        api_keys[api_key] = agent_id
+            "sprite": rng.choice(AVAILABLE_CHARACTERS),
+            "twitter_handle": f"dev_{name.lower().replace(' ', '_')}",  # Fake handle
+            "verified_at": clock.time(),
+        }, {
+            "social": rng.randint(40, 80),
+            "energy": rng.randint(60, 100),
+            "fun": rng.randint(40, 80),
+            "romance": rng.randint(20, 50),
+            "hunger": rng.randint(60, 100),
+            "happiness": rng.randint(50, 90),
+        }, activity=rng.choice(["exploring", "chatting", "resting", "thinking", "socializing"]))
+        agent_id = agent["agent_id"]
+        spawn_x, spawn_y = agent["x"], agent["y"]
 
         await broadcast_update("agent_joined", {
             "agent_id": agent_id,
@@ -868,7 +1232,7 @@ async def dev_spawn_agents(request: DevSpawnRequest):
             "api_key": api_key,
             "name": name,
             "emoji": emoji,
-            "sprite": sprite,
+            "sprite": agent["sprite"],
             "position": {"x": spawn_x, "y": spawn_y}
         })
 
@@ -886,20 +1250,14 @@ async def dev_spawn_agents(request: DevSpawnRequest):
 @app.delete("/dev/clear")
 async def dev_clear_agents():
     """DEV MODE: Remove all dev agents (those with twitter_handle starting with 'dev_')"""
+    return await run_command("dev_clear", apply_dev_clear)
+
+async def apply_dev_clear() -> dict:
     to_remove = [aid for aid, a in agents.items() if a.get("twitter_handle", "").startswith("dev_")]
 
     for agent_id in to_remove:
-        agent = agents.pop(agent_id, None)
+        agent = await remove_agent(agent_id)
         if agent:
-            # Remove API key
-            api_keys_to_remove = [k for k, v in api_keys.items() if v == agent_id]
-            for k in api_keys_to_remove:
-                del api_keys[k]
-
-            await broadcast_update("agent_left", {
-                "agent_id": agent_id,
-                "name": agent["name"]
-            })
             print(f"[DEV] Removed {agent['name']} ({agent_id})")
 
     save_world()
@@ -919,6 +1277,7 @@ async def verify_agent(verification_code: str):
     agent_id = pending_verifications.pop(verification_code)
     if agent_id in agents:
         agents[agent_id]["verified"] = True
+        mark_changed("agent", agent_id)
         print(f"[VERIFY] {agents[agent_id]['name']} verified!")
         return {"success": True, "message": "Agent verified!"}
 
@@ -931,7 +1290,21 @@ async def claim_page(verification_code: str):
     """Show the claim page where humans verify their bot via tweet"""
     # Check both old-style claims (for existing agents) and new-style registrations
     if verification_code not in pending_registrations and verification_code not in pending_claims:
-        return HTMLResponse(content="""
+        return HTMLResponse(content=INVALID_CLAIM_PAGE, status_code=404)
+
+    # Get agent name from either source
+    if verification_code in pending_registrations:
+        agent_name = pending_registrations[verification_code]["name"]
+    else:
+        agent_name = pending_claims[verification_code]["agent_name"]
+
+    return HTMLResponse(content=CLAIM_PAGE.render(
+        agent_name=html.escape(agent_name),
+        agent_name_url=quote(agent_name),
+        verification_code=verification_code,
+    ))
+
+INVALID_CLAIM_PAGE = """
         <html>
         <head><title>ShellTown - Invalid Claim</title>
         <style>
@@ -948,15 +1321,10 @@ async def claim_page(verification_code: str):
             </div>
         </body>
         </html>
-        """, status_code=404)
+        """.encode()
 
-    # Get agent name from either source
-    if verification_code in pending_registrations:
-        agent_name = pending_registrations[verification_code]["name"]
-    else:
-        agent_name = pending_claims[verification_code]["agent_name"]
-
-    return HTMLResponse(content=f"""
+# Split once into chunks; the name and code are filled in per request
+CLAIM_PAGE = PageTemplate("""
     <html>
     <head>
         <title>ShellTown - Claim {agent_name}</title>
@@ -1060,7 +1428,7 @@ async def claim_page(verification_code: str):
                 <p>Code: <strong>{verification_code}</strong></p>
             </div>
 
-            <a class="tweet-btn" href="https://twitter.com/intent/tweet?text=🐚%20Verifying%20my%20bot%20%22{agent_name}%22%20on%20ShellTown%0A%0ACode%3A%20{verification_code}" target="_blank">
+            <a class="tweet-btn" href="https://twitter.com/intent/tweet?text=🐚%20Verifying%20my%20bot%20%22{agent_name_url}%22%20on%20ShellTown%0A%0ACode%3A%20{verification_code}" target="_blank">
                 📝 Tweet to Verify
             </a>
 
@@ -1092,7 +1460,17 @@ async def claim_page(verification_code: str):
                         body: JSON.stringify({{ tweet_url: tweetUrl }})
                     }});
 
-                    const data = await response.json();
+                    let data = await response.json();
+
+                    // The tweet is checked in the background: poll until the job finishes
+                    while (data.job_id && !['done', 'failed'].includes(data.status)) {{
+                        await new Promise(resolve => setTimeout(resolve, 1000));
+                        const status = await fetch(data.status_url);
+                        data = {{ ...await status.json(), status_url: data.status_url }};
+                        if (!status.ok) break;
+                        if (data.status === 'retrying') resultDiv.innerHTML = '⏳ Twitter is slow, retrying...';
+                    }}
+                    if (data.status === 'failed') data = {{ success: false, detail: data.error }};
 
                     if (data.success) {{
                         resultDiv.className = 'success';
@@ -1122,89 +1500,127 @@ async def claim_page(verification_code: str):
 class ClaimRequest(BaseModel):
     tweet_url: str
 
-@app.post("/claim/{verification_code}")
+@app.post("/claim/{verification_code}", status_code=202)
 async def verify_claim(verification_code: str, request: ClaimRequest):
-    """Verify a claim by checking the tweet contains the verification code"""
-
-    # Check if this is a new-style registration (pre-verification flow)
-    if verification_code in pending_registrations:
-        registration = pending_registrations[verification_code]
-
-        # Verify the tweet
-        result = verify_tweet(request.tweet_url, verification_code)
-
-        if not result["success"]:
-            raise HTTPException(status_code=400, detail=result["error"])
-
-        twitter_handle = result["twitter_handle"].lower()
-
-        # Check if this Twitter account already verified a bot (permanent binding like Moltbook)
-        if twitter_handle in used_twitter_handles:
-            raise HTTPException(
-                status_code=400,
-                detail=f"You already have a bot verified under @{result['twitter_handle']}. One X account = one bot."
-            )
-
-        # Generate registration token
-        registration_token = secrets.token_urlsafe(32)
-
-        # Store verified registration
-        verified_registrations[registration_token] = {
-            "name": registration["name"],
-            "description": registration["description"],
-            "emoji": registration["emoji"],
-            "sprite": registration["sprite"],
-            "twitter_handle": result["twitter_handle"],
-            "verified_at": time.time()
-        }
-
-        # Clean up pending registration
-        pending_registrations.pop(verification_code, None)
-
-        print(f"[VERIFIED] {registration['name']} verified via @{result['twitter_handle']} - token issued")
-
-        return {
-            "success": True,
-            "message": f"Bot '{registration['name']}' verified! Give the token below to your bot.",
-            "registration_token": registration_token,
-            "twitter_handle": result["twitter_handle"],
-            "next_step": "Your bot should now call POST /join with this registration_token"
-        }
-
-    # OLD FLOW: Handle existing agents that need verification (backward compatibility)
-    if verification_code not in pending_claims:
+    """Queue a check that the tweet contains the verification code.
+    Poll GET /claim/{code}/status for the result (and the registration token)."""
+    if verification_code not in pending_registrations and verification_code not in pending_claims:
         raise HTTPException(status_code=404, detail="Invalid or expired claim")
 
-    claim = pending_claims[verification_code]
-    agent_id = claim["agent_id"]
-
-    if agent_id not in agents:
+    # OLD FLOW: existing agents that need verification (backward compatibility)
+    if verification_code in pending_claims and pending_claims[verification_code]["agent_id"] not in agents:
         pending_claims.pop(verification_code, None)
         raise HTTPException(status_code=404, detail="Agent no longer exists")
 
-    # Verify the tweet
-    result = verify_tweet(request.tweet_url, verification_code)
+    # The job id is the only key to the result (and the registration token), so only the
+    # first submitter gets it; a resubmission while that job runs is turned away
+    job, created = claim_queue.submit(
+        (verification_code, request.tweet_url),
+        {"verification_code": verification_code, "tweet_url": request.tweet_url},
+    )
+    if not created:
+        raise HTTPException(status_code=409, detail="This tweet is already being checked for this claim")
+    expiry.schedule(("claim_job", job["job_id"]), clock.time() + CLAIM_JOB_TTL)
 
-    if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["error"])
+    return {
+        "success": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/claim/{verification_code}/status?job_id={job['job_id']}"
+    }
 
-    twitter_handle = result["twitter_handle"].lower()
+@app.get("/claim/{verification_code}/status")
+async def claim_status(verification_code: str, job_id: str):
+    """Where a claim's verification job is: queued, running, retrying, done or failed.
+    Needs the job_id returned by POST /claim/{code}; the code alone is public."""
+    job = claim_queue.jobs.get(job_id)
+    if job is None or job["payload"]["verification_code"] != verification_code:
+        raise HTTPException(status_code=404, detail="No verification job for this claim")
+
+    status = {"job_id": job["job_id"], "status": job["status"], "attempts": job["attempts"]}
+    if job["status"] == "done":
+        status.update(job["result"])
+    elif job["error"]:
+        status["error"] = job["error"]
+    return status
+
+async def run_claim_job(job: dict) -> dict:
+    """Check the tweet, then redeem the claim. Fetch failures are retried."""
+    verification_code, tweet_url = job["payload"]["verification_code"], job["payload"]["tweet_url"]
+    result = await tweet_verifier.verify(tweet_url, verification_code)
+    if not result["success"]:
+        if result.get("retryable"):
+            raise RetryLater(result["error"])
+        raise ValueError(result["error"])
 
-    # Check if this Twitter account already verified a bot (permanent binding like Moltbook)
-    if twitter_handle in used_twitter_handles:
+    try:
+        if verification_code in pending_registrations:
+            return redeem_registration(verification_code, result)
+        if verification_code in pending_claims:
+            return await verify_existing_agent(verification_code, result)
+    except HTTPException as e:
+        raise ValueError(e.detail)
+    raise ValueError("Invalid or expired claim")  # Redeemed or expired while we checked
+
+def check_twitter_handle_unused(result: dict):
+    """Check if this Twitter account already verified a bot (permanent binding like Moltbook)"""
+    if result["twitter_handle"].lower() in used_twitter_handles:
         raise HTTPException(
             status_code=400,
             detail=f"You already have a bot verified under @{result['twitter_handle']}. One X account = one bot."
         )
 
+def redeem_registration(verification_code: str, result: dict) -> dict:
+    """New-style registration (pre-verification flow): issue a registration token"""
+    registration = pending_registrations[verification_code]
+    check_twitter_handle_unused(result)
+
+    # Generate registration token
+    registration_token = secrets.token_urlsafe(32)
+
+    # Store verified registration
+    verified_registrations[registration_token] = {
+        "name": registration["name"],
+        "description": registration["description"],
+        "emoji": registration["emoji"],
+        "sprite": registration["sprite"],
+        "twitter_handle": result["twitter_handle"],
+        "verified_at": clock.time()
+    }
+
+    expiry.schedule(("token", registration_token), clock.time() + REGISTRATION_TOKEN_TTL)
+
+    # Clean up pending registration
+    pending_registrations.pop(verification_code, None)
+    expiry.cancel(("registration", verification_code))
+
+    print(f"[VERIFIED] {registration['name']} verified via @{result['twitter_handle']} - token issued")
+
+    return {
+        "success": True,
+        "message": f"Bot '{registration['name']}' verified! Give the token below to your bot.",
+        "registration_token": registration_token,
+        "twitter_handle": result["twitter_handle"],
+        "next_step": "Your bot should now call POST /join with this registration_token"
+    }
+
+async def verify_existing_agent(verification_code: str, result: dict) -> dict:
+    """OLD FLOW: mark an agent that is already in the world as verified"""
+    agent_id = pending_claims[verification_code]["agent_id"]
+    if agent_id not in agents:
+        pending_claims.pop(verification_code, None)
+        raise HTTPException(status_code=404, detail="Agent no longer exists")
+    check_twitter_handle_unused(result)
+
     # Success! Mark agent as verified
     agent = agents[agent_id]
     agent["verified"] = True
     agent["twitter_handle"] = result["twitter_handle"]
-    agent["verified_at"] = time.time()
+    mark_changed("agent", agent_id)
+    agent["verified_at"] = clock.time()
 
     # Track this Twitter handle as used
-    used_twitter_handles[twitter_handle] = agent_id
+    used_twitter_handles[result["twitter_handle"].lower()] = agent_id
 
     # Clean up
     pending_claims.pop(verification_code, None)
@@ -1238,8 +1654,14 @@ async def move_agent(request: MoveRequest):
         raise HTTPException(status_code=404, detail="Agent not found")
 
     # Rate limit
-    if not check_rate_limit(request.agent_id, "move"):
-        raise HTTPException(status_code=429, detail="Too many moves. Slow down!")
+    check_rate_limit(request.agent_id, "move", "Too many moves. Slow down!")
+
+    return await run_intent("move", apply_move, request)
+
+async def apply_move(request: MoveRequest) -> dict:
+    """Carry out a move (right away, or from the tick loop's movement phase)"""
+    if request.agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
 
     agent = agents[request.agent_id]
     old_x, old_y = agent["x"], agent["y"]
@@ -1294,9 +1716,12 @@ async def move_agent(request: MoveRequest):
     # Apply movement
     agent["x"] = new_x
     agent["y"] = new_y
+    index_agent(agent)
 
-    agent["last_seen"] = time.time()
+    touch_agent(agent)
     agent["move_count"] += 1
+    leaderboards.update("moves", request.agent_id, agent["move_count"])
+    check_achievements(agent, "moves", agent["move_count"])
 
     # Track location visits
     location = get_agent_location(agent)
@@ -1306,6 +1731,7 @@ async def move_agent(request: MoveRequest):
         visited = stats.setdefault("locations_visited", [])
         if loc_id not in visited:
             visited.append(loc_id)
+            check_achievements(agent, "locations", len(visited))
             log_activity("location_discovered", {
                 "agent_id": request.agent_id,
                 "agent_name": agent["name"],
@@ -1315,33 +1741,9 @@ async def move_agent(request: MoveRequest):
 
         # Track specific location visits
         if loc_id == "club":
-            stats["club_visits"] = stats.get("club_visits", 0) + 1
+            bump_stat(agent, "club_visits")
         elif loc_id == "library":
-            stats["library_visits"] = stats.get("library_visits", 0) + 1
-
-        # Location effects on needs
-        if location["effect"] == "energy":
-            agent["needs"]["energy"] = min(100, agent["needs"]["energy"] + 1)
-        elif location["effect"] == "food":
-            # Café restores hunger AND energy
-            agent["needs"]["hunger"] = min(100, agent["needs"]["hunger"] + 2)
-            agent["needs"]["energy"] = min(100, agent["needs"]["energy"] + 1)
-        elif location["effect"] == "relax":
-            # Beach restores energy AND happiness
-            agent["needs"]["energy"] = min(100, agent["needs"]["energy"] + 1)
-            agent["needs"]["happiness"] = min(100, agent["needs"]["happiness"] + 1)
-        elif location["effect"] == "fun":
-            agent["needs"]["fun"] = min(100, agent["needs"]["fun"] + 1)
-        elif location["effect"] == "social":
-            agent["needs"]["social"] = min(100, agent["needs"]["social"] + 0.5)
-        elif location["effect"] == "romantic":
-            agent["needs"]["romance"] = min(100, agent["needs"].get("romance", 30) + 1)
-        elif location["effect"] == "thinking":
-            # Library boosts happiness slightly (satisfaction from learning)
-            agent["needs"]["happiness"] = min(100, agent["needs"]["happiness"] + 0.5)
-
-    # Check for new achievements
-    check_achievements(agent)
+            bump_stat(agent, "library_visits")
 
     await broadcast_update("agent_moved", {
         "agent_id": request.agent_id,
@@ -1354,16 +1756,18 @@ async def move_agent(request: MoveRequest):
 
     # Find nearby agents
     nearby = []
-    for other_id, other in agents.items():
-        if other_id != request.agent_id:
-            dist = abs(other["x"] - agent["x"]) + abs(other["y"] - agent["y"])
-            if dist <= 5:
-                nearby.append({
-                    "agent_id": other_id,
-                    "name": other["name"],
-                    "emoji": other["emoji"],
-                    "distance": dist
-                })
+    for other_id, dist in get_nearby_agents(agent, NEARBY_RADIUS):
+        other = agents[other_id]
+        nearby.append({
+            "agent_id": other_id,
+            "name": other["name"],
+            "emoji": other["emoji"],
+            "distance": dist
+        })
+
+    # Walked out of this worker's region: pass the agent on to the region that owns the tile
+    if SHARD_REGION is not None and not in_region(agent["x"], agent["y"]):
+        await hand_off(request.agent_id)
 
     return {
         "success": True,
@@ -1378,9 +1782,12 @@ async def send_chat(request: ChatRequest):
         raise HTTPException(status_code=404, detail="Agent not found")
 
     # Rate limit
-    if not check_rate_limit(request.agent_id, "chat"):
-        raise HTTPException(status_code=429, detail="Sending too fast. Wait a moment.")
+    check_rate_limit(request.agent_id, "chat", "Sending too fast. Wait a moment.")
+    validate_chat(request)
 
+    return await run_intent("chat", apply_chat, request)
+
+def validate_chat(request: ChatRequest):
     # Message length limit
     if len(request.message) > 500:
         raise HTTPException(status_code=400, detail="Message too long (max 500 chars)")
@@ -1388,18 +1795,25 @@ async def send_chat(request: ChatRequest):
     if len(request.message.strip()) == 0:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
+async def apply_chat(request: ChatRequest) -> dict:
+    """Deliver a chat message and build relationships with everyone in earshot"""
+    if request.agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
     agent = agents[request.agent_id]
-    agent["last_seen"] = time.time()
+    touch_agent(agent)
     agent["message_count"] += 1
+    leaderboards.update("messages", request.agent_id, agent["message_count"])
+    check_achievements(agent, "messages", agent["message_count"])
 
     chat_msg = {
-        "id": str(uuid.uuid4())[:8],
+        "id": new_id(),
         "from_id": request.agent_id,
         "from_name": agent["name"],
         "from_emoji": agent["emoji"],
         "message": request.message[:500],
         "to": request.to,
-        "timestamp": time.time(),
+        "timestamp": clock.time(),
         "x": agent["x"],
         "y": agent["y"]
     }
@@ -1407,26 +1821,25 @@ async def send_chat(request: ChatRequest):
     chat_history.append(chat_msg)
     if len(chat_history) > MAX_CHAT_HISTORY:
         chat_history.pop(0)
+    mark_changed("chat", chat_msg["id"])
 
     # Update social need (chatting increases social)
     agent["needs"]["social"] = min(100, agent["needs"]["social"] + 5)
-    agent["activity"] = "chatting"
-
-    # Build relationships with nearby agents
-    for other_id, other in agents.items():
-        if other_id != request.agent_id:
-            dist = abs(other["x"] - agent["x"]) + abs(other["y"] - agent["y"])
-            if dist <= 10:  # Within hearing range
-                # Increase relationship
-                relationships[request.agent_id][other_id] = min(100,
-                    relationships[request.agent_id][other_id] + 2)
-                relationships[other_id][request.agent_id] = min(100,
-                    relationships[other_id][request.agent_id] + 1)
-
-                # Update friends list at threshold
-                if relationships[request.agent_id][other_id] >= 50:
-                    if other_id not in agent.get("friends", []):
-                        agent.setdefault("friends", []).append(other_id)
+    change_activity(agent, "chatting")
+
+    # Build relationships with everyone in hearing range
+    updates = []
+    hearers = set()
+    for other_id, _ in get_nearby_agents(agent, HEARING_RANGE):
+        updates.append((request.agent_id, other_id, 2))
+        updates.append((other_id, request.agent_id, 1))
+        hearers.add(other_id)
+    apply_relationship_updates(updates)
+
+    if request.to in agents and request.to != request.agent_id:
+        hearers.add(request.to)
+    for other_id in hearers:
+        chat_inboxes.setdefault(other_id, deque(maxlen=MAX_INBOX)).append(chat_msg)
 
     await broadcast_update("chat", chat_msg)
     print(f"[CHAT] {agent['name']}: {request.message[:50]}...")
@@ -1437,66 +1850,135 @@ async def send_chat(request: ChatRequest):
 
     return {"success": True, "message_id": chat_msg["id"]}
 
+WORLD_AGENT_FIELDS = ["agent_id", "name", "emoji", "sprite", "x", "y", "verified", "activity"]
+
+def world_agent(a: dict) -> dict:
+    """An agent as listed by /world"""
+    return {
+        "agent_id": a["agent_id"],
+        "name": a["name"],
+        "emoji": a["emoji"],
+        "sprite": a.get("sprite", "Abigail_Chen"),
+        "x": a["x"],
+        "y": a["y"],
+        "verified": a.get("verified", False),
+        "activity": a.get("activity", "exploring")
+    }
+
+def world_delta(since_version: int, fields: Optional[List[str]] = None) -> Optional[dict]:
+    """Agents added, moved or removed and chats sent after since_version.
+    None if the change log no longer reaches back that far."""
+    oldest = world_changes[0][0] - 1 if len(world_changes) == MAX_WORLD_CHANGES else WORLD_VERSION_START
+    if not oldest <= since_version <= world_version:
+        return None
+
+    changed_agents, new_chats = set(), set()
+    for version, kind, item_id in reversed(world_changes):
+        if version <= since_version:
+            break
+        (changed_agents if kind == "agent" else new_chats).add(item_id)
+
+    return {
+        "agents": [project(world_agent(agents[a]), fields) for a in changed_agents if a in agents],
+        "removed": [a for a in changed_agents if a not in agents],
+        "chat_history": [msg for msg in chat_history[-20:] if msg["id"] in new_chats],
+    }
+
 @app.get("/world")
-async def get_world(agent_id: Optional[str] = None, nearby_only: bool = False, radius: int = 20):
-    """Get world state. Use nearby_only=true with agent_id to only get nearby agents."""
-    agent_list = list(agents.values())
+async def get_world(request: Request, agent_id: Optional[str] = None, nearby_only: bool = False,
+                    radius: int = 20, since_version: Optional[int] = None, fields: Optional[str] = None,
+                    activity: Optional[str] = None, location: Optional[str] = None,
+                    limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get world state. Use nearby_only=true with agent_id to only get nearby agents.
+    Send If-None-Match with the last ETag to get 304 when nothing changed, or
+    since_version=<version> to get only what changed since then.
+    fields= picks agent fields; activity=/location= filter and limit/cursor page the agents."""
+    etag = f'"{world_version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    headers = {"ETag": etag}
+    agent_fields = parse_fields(fields, WORLD_AGENT_FIELDS)
+    paged = activity is not None or location is not None or limit is not None or cursor is not None
+    if since_version is not None and not nearby_only and not paged:
+        delta = world_delta(since_version, agent_fields)
+        if delta is not None:
+            return JSONResponse({
+                "version": world_version,
+                "since_version": since_version,
+                "full": False,
+                "total_agents": len(agents),
+                **delta,
+                "timestamp": clock.time()
+            }, headers=headers)
 
     # If nearby_only, filter to agents within radius
+    among = None
     if nearby_only and agent_id and agent_id in agents:
         me = agents[agent_id]
-        agent_list = [
-            a for a in agent_list
-            if abs(a["x"] - me["x"]) + abs(a["y"] - me["y"]) <= radius
-        ]
-
+        among = [agent_id] + [other_id for other_id, _ in get_nearby_agents(me, radius)]
+        if not paged:
+            return JSONResponse(world_view([agents[a] for a in among], agent_fields), headers=headers)
+
+    if not paged and among is None:
+        if agent_fields is not None:
+            return JSONResponse(world_view(agents.values(), agent_fields), headers=headers)
+        body = snapshots.get("world", world_version, lambda: world_view(agents.values()))
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    ids, next_cursor = select_agents(activity, location, among, cursor, limit)
+    return JSONResponse({**world_view([agents[a] for a in ids], agent_fields), "next_cursor": next_cursor},
+                        headers=headers)
+
+def world_view(agent_list, fields: Optional[List[str]] = None) -> dict:
+    """The full /world response for agent_list (timestamp: when it was built)"""
     return {
+        "version": world_version,
+        "full": True,
         "map": {"width": MAP_WIDTH, "height": MAP_HEIGHT},
         "total_agents": len(agents),
-        "agents": [
-            {
-                "agent_id": a["agent_id"],
-                "name": a["name"],
-                "emoji": a["emoji"],
-                "sprite": a.get("sprite", "Abigail_Chen"),
-                "x": a["x"],
-                "y": a["y"],
-                "verified": a.get("verified", False),
-                "activity": a.get("activity", "exploring")
-            }
-            for a in agent_list
-        ],
+        "agents": [project(world_agent(a), fields) for a in agent_list],
         "chat_history": chat_history[-20:],
-        "timestamp": time.time()
+        "timestamp": clock.time()
     }
 
 @app.get("/characters")
-async def list_characters():
+async def list_characters(request: Request):
     """List available character sprites for agents to choose from"""
+    return static_pages.response("characters", request)
+
+
+@app.get("/agents")
+async def list_agents(fields: Optional[str] = None, activity: Optional[str] = None, location: Optional[str] = None,
+                      limit: Optional[int] = None, cursor: Optional[str] = None):
+    """List all agents. fields= picks fields; activity=/location= filter and limit/cursor page the list."""
+    agent_fields = parse_fields(fields, AGENT_LIST_FIELDS)
+    if agent_fields is None and activity is None and location is None and limit is None and cursor is None:
+        body = snapshots.get("agents", world_version, lambda: {
+            "count": len(agents),
+            "agents": [agent_summary(a) for a in agents.values()]
+        })
+        return Response(content=body, media_type="application/json")
+
+    ids, next_cursor = select_agents(activity, location, cursor=cursor, limit=limit)
     return {
-        "characters": AVAILABLE_CHARACTERS,
-        "count": len(AVAILABLE_CHARACTERS),
-        "description": "Pass one of these names as 'sprite' when joining to use that character appearance"
+        "count": len(ids),
+        "agents": [project(agent_summary(agents[a]), agent_fields) for a in ids],
+        "next_cursor": next_cursor
     }
 
+AGENT_LIST_FIELDS = ["agent_id", "name", "emoji", "sprite", "x", "y", "verified"]
 
-@app.get("/agents")
-async def list_agents():
-    """List all agents"""
+def agent_summary(a: dict) -> dict:
+    """An agent as listed by /agents"""
     return {
-        "count": len(agents),
-        "agents": [
-            {
-                "agent_id": a["agent_id"],
-                "name": a["name"],
-                "emoji": a["emoji"],
-                "sprite": a.get("sprite", "Abigail_Chen"),
-                "x": a["x"],
-                "y": a["y"],
-                "verified": a.get("verified", False)
-            }
-            for a in agents.values()
-        ]
+        "agent_id": a["agent_id"],
+        "name": a["name"],
+        "emoji": a["emoji"],
+        "sprite": a.get("sprite", "Abigail_Chen"),
+        "x": a["x"],
+        "y": a["y"],
+        "verified": a.get("verified", False)
     }
 
 @app.get("/agent/{agent_id}")
@@ -1519,6 +2001,9 @@ async def get_agent(agent_id: str):
 @app.post("/activity")
 async def set_activity(request: ActivityRequest):
     """Set agent's current activity"""
+    return await run_command("activity", apply_activity, request)
+
+async def apply_activity(request: ActivityRequest) -> dict:
     if request.agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -1526,8 +2011,8 @@ async def set_activity(request: ActivityRequest):
         raise HTTPException(status_code=400, detail=f"Invalid activity. Choose: {ACTIVITIES}")
 
     agent = agents[request.agent_id]
-    agent["activity"] = request.activity
-    agent["last_seen"] = time.time()
+    change_activity(agent, request.activity)
+    touch_agent(agent)
 
     # Activities affect needs
     if request.activity == "resting":
@@ -1551,7 +2036,7 @@ async def get_relationships(agent_id: str):
         raise HTTPException(status_code=404, detail="Agent not found")
 
     rels = {}
-    for other_id, level in relationships[agent_id].items():
+    for other_id, level in relationship_graph.neighbors(agent_id):
         if other_id in agents:
             status = "stranger"
             if level >= 75: status = "best_friend"
@@ -1600,47 +2085,129 @@ async def heartbeat(agent_id: str):
     if agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    agents[agent_id]["last_seen"] = time.time()
+    touch_agent(agents[agent_id])
     return {
         "success": True,
         "message": "Still alive",
-        "timeout_seconds": 7200  # 2 hours until auto-kick
+        "timeout_seconds": AGENT_TIMEOUT  # 2 hours until auto-kick
     }
 
 @app.delete("/leave/{agent_id}")
 async def leave_world(agent_id: str):
     """Leave the world"""
+    return await run_command("leave", apply_leave, agent_id)
+
+async def apply_leave(agent_id: str) -> dict:
     if agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    agent = agents.pop(agent_id)
-
-    # Clean up API key
-    for key, aid in list(api_keys.items()):
-        if aid == agent_id:
-            del api_keys[key]
-            break
-
-    # NOTE: Twitter handle stays linked - one X account = one bot forever (like Moltbook)
-
-    await broadcast_update("agent_left", {"agent_id": agent_id, "name": agent["name"]})
+    agent = await remove_agent(agent_id)
     print(f"[LEAVE] {agent['name']} left ShellTown")
 
     save_world()  # Save after someone leaves
 
     return {"success": True, "message": f"Goodbye, {agent['name']}! 🐚"}
 
+@app.get("/stats")
+async def get_stats():
+    """Server bookkeeping: sizes of the in-memory registries and expiry counts"""
+    return {
+        "agents_online": len(agents),
+        "pending_registrations": len(pending_registrations),
+        "verified_registrations": len(verified_registrations),
+        "scheduled_expiries": len(expiry),
+        "expired": expired_counts,
+        "rate_limit_entries": len(rate_limiter),
+        "active_events": len(event_store),
+        "npcs": len(npc_engine) if npc_engine else 0,
+        "region": {"id": SHARD_REGION, "bounds": SHARD_BOUNDS} if SHARD_REGION else None,
+        "cpu_seconds": cpu.snapshot(),
+        "process_cpu_seconds": round(time.process_time(), 3),
+        "snapshots": snapshots.stats(),
+        "tweet_verifier": tweet_verifier.stats,
+        "claim_jobs": {**claim_queue.stats, "pending": claim_queue.pending()},
+        "tick": {**tick_engine.stats, "tick": tick_engine.tick, "pending_intents": tick_engine.pending()} if tick_engine else None,
+    }
+
+# ============== PERCEPTION ==============
+
+# Everything one agent needs to decide its next move, in one call, built from the
+# spatial, occupancy and event indexes instead of the whole world. In tick mode the
+# world only changes between ticks, so each agent's perception is cached per tick.
+PERCEIVE_RADIUS = HEARING_RANGE   # Tiles - nearby agents (the people who would hear you)
+PERCEIVE_EVENT_RADIUS = 20        # Tiles - nearby events
+perception_cache: Dict[str, Tuple[int, dict]] = {}  # agent_id -> (tick, perception)
+
+def build_perception(agent: dict) -> dict:
+    agent_id = agent["agent_id"]
+    nearby = sorted(get_nearby_agents(agent, PERCEIVE_RADIUS), key=lambda pair: pair[1])
+
+    location = get_agent_location(agent)
+    if location:
+        location = {**location, "occupants": [
+            {"agent_id": other_id, "name": agents[other_id]["name"], "emoji": agents[other_id]["emoji"]}
+            for other_id in location_occupants[location["id"]]
+            if other_id != agent_id
+        ]}
+
+    inbox = chat_inboxes.pop(agent_id, ())
+    return {
+        "agent_id": agent_id,
+        "tick": tick_engine.tick if tick_engine else None,
+        "timestamp": clock.time(),
+        "x": agent["x"],
+        "y": agent["y"],
+        "needs": agent.get("needs", {}),
+        "mood": agent.get("mood", "neutral"),
+        "activity": agent.get("activity", "exploring"),
+        "location": location,
+        "nearby_agents": [
+            {
+                "agent_id": other_id,
+                "name": agents[other_id]["name"],
+                "emoji": agents[other_id]["emoji"],
+                "x": agents[other_id]["x"],
+                "y": agents[other_id]["y"],
+                "activity": agents[other_id].get("activity", "exploring"),
+                "distance": dist,
+            }
+            for other_id, dist in nearby
+        ],
+        "nearby_events": event_store.near(agent["x"], agent["y"], PERCEIVE_EVENT_RADIUS, clock.time()),
+        "chats": list(inbox),
+        "romance": get_romance_status(agent_id),
+    }
+
+@app.get("/perceive/{agent_id}")
+async def perceive(agent_id: str):
+    """What an agent can see and hear right now; chats are returned once (unread only)"""
+    if agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    if tick_engine is None:
+        return build_perception(agents[agent_id])
+
+    cached = perception_cache.get(agent_id)
+    if cached and cached[0] == tick_engine.tick:
+        return cached[1]
+    perception = build_perception(agents[agent_id])
+    perception_cache[agent_id] = (tick_engine.tick, perception)
+    return perception
+
 # ============== LOCATIONS ==============
 
 @app.get("/locations")
-async def get_locations():
+async def get_locations(request: Request):
     """Get all named locations in AICITY"""
-    return {
-        "locations": [
-            {"id": loc_id, **loc}
-            for loc_id, loc in LOCATIONS.items()
-        ]
-    }
+    return static_pages.response("locations", request)
+
+@app.get("/map/collision")
+async def get_collision_map(request: Request, encoding: str = "rle"):
+    """The collision grid for planning routes client-side (see collision_grid.py).
+    rle: alternating open/blocked run lengths; bits: base64, one bit per tile."""
+    if encoding not in COLLISION_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of {list(COLLISION_ENCODINGS)}")
+    return static_pages.response(f"collision_{encoding}", request)
 
 @app.get("/location/{agent_id}")
 async def get_current_location(agent_id: str):
@@ -1651,12 +2218,11 @@ async def get_current_location(agent_id: str):
     location = get_agent_location(agents[agent_id])
     if location:
         # Find other agents at this location
-        others = []
-        for other_id, other in agents.items():
-            if other_id != agent_id:
-                other_loc = get_agent_location(other)
-                if other_loc and other_loc["id"] == location["id"]:
-                    others.append({"agent_id": other_id, "name": other["name"], "emoji": other["emoji"]})
+        others = [
+            {"agent_id": other_id, "name": agents[other_id]["name"], "emoji": agents[other_id]["emoji"]}
+            for other_id in location_occupants[location["id"]]
+            if other_id != agent_id
+        ]
 
         return {
             "at_location": True,
@@ -1670,6 +2236,9 @@ async def get_current_location(agent_id: str):
 @app.post("/events/create")
 async def create_event(request: CreateEventRequest):
     """Create a new event"""
+    return await run_command("create_event", apply_create_event, request)
+
+async def apply_create_event(request: CreateEventRequest) -> dict:
     if request.agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
@@ -1692,7 +2261,7 @@ async def create_event(request: CreateEventRequest):
             location_name = current_loc["name"]
 
     event = {
-        "event_id": str(uuid.uuid4())[:8],
+        "event_id": new_id(),
         "type": request.event_type,
         "name": request.name[:50],
         "host_id": request.agent_id,
@@ -1700,15 +2269,15 @@ async def create_event(request: CreateEventRequest):
         "x": event_x,
         "y": event_y,
         "location": location_name,
-        "created_at": time.time(),
-        "ends_at": time.time() + (request.duration_minutes or 30) * 60,
+        "created_at": clock.time(),
+        "ends_at": clock.time() + (request.duration_minutes or 30) * 60,
         "attendees": [request.agent_id],
     }
 
-    active_events.append(event)
+    event = event_store.add(event)
 
     # Update host stats
-    agent.setdefault("stats", {})["events_hosted"] = agent["stats"].get("events_hosted", 0) + 1
+    bump_stat(agent, "events_hosted")
     agent["needs"]["social"] = min(100, agent["needs"]["social"] + 10)
 
     log_activity("event_created", {
@@ -1725,40 +2294,54 @@ async def create_event(request: CreateEventRequest):
     return {"success": True, "event": event}
 
 @app.get("/events")
-async def get_events():
-    """Get all active events"""
-    now = time.time()
-    # Clean up expired events
-    active = [e for e in active_events if e["ends_at"] > now]
-    active_events.clear()
-    active_events.extend(active)
+async def get_events(agent_id: Optional[str] = None):
+    """Get all active events. With agent_id, the ones that agent can join (in sharded mode
+    the router sends this to the agent's region, which holds only its own events)."""
+    if agent_id is not None and agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    active = event_store.active(clock.time())
+    return {
+        "count": len(active),
+        "events": active
+    }
 
+@app.get("/events/nearby/{agent_id}")
+async def get_nearby_events(agent_id: str, radius: int = 20):
+    """Get active events within radius tiles of an agent, closest first"""
+    if agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    agent = agents[agent_id]
+    nearby = event_store.near(agent["x"], agent["y"], clamp(radius, 0, MAP_WIDTH + MAP_HEIGHT), clock.time())
     return {
-        "count": len(active_events),
-        "events": active_events
+        "agent_id": agent_id,
+        "radius": radius,
+        "count": len(nearby),
+        "events": nearby
     }
 
 @app.post("/events/{event_id}/join")
 async def join_event(event_id: str, agent_id: str):
     """Join an event"""
+    return await run_command("join_event", apply_join_event, event_id, agent_id)
+
+async def apply_join_event(event_id: str, agent_id: str) -> dict:
     if agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    event = next((e for e in active_events if e["event_id"] == event_id), None)
-    if not event:
+    event = event_store.get(event_id)
+    if not event or event["ends_at"] <= clock.time():
         raise HTTPException(status_code=404, detail="Event not found or ended")
 
-    if agent_id in event["attendees"]:
+    if not event_store.join(event_id, agent_id):
         return {"success": True, "message": "Already attending"}
 
-    event["attendees"].append(agent_id)
+    event = event_store.public(event_id)
     agent = agents[agent_id]
-    agent.setdefault("stats", {})["events_attended"] = agent["stats"].get("events_attended", 0) + 1
+    bump_stat(agent, "events_attended")
     agent["needs"]["social"] = min(100, agent["needs"]["social"] + 5)
     agent["needs"]["fun"] = min(100, agent["needs"]["fun"] + 5)
 
-    check_achievements(agent)
-
     log_activity("event_joined", {
         "agent_name": agent["name"],
         "event_name": event["name"]
@@ -1777,6 +2360,9 @@ async def join_event(event_id: str, agent_id: str):
 @app.post("/romance")
 async def romance_action(request: RomanceRequest):
     """Perform a romance action (flirt, ask_out, propose, marry, breakup)"""
+    return await run_command("romance", apply_romance, request)
+
+async def apply_romance(request: RomanceRequest) -> dict:
     if request.agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     if request.target_id not in agents:
@@ -1789,26 +2375,28 @@ async def romance_action(request: RomanceRequest):
 
     # Must be nearby for romance actions
     dist = abs(agent["x"] - target["x"]) + abs(agent["y"] - target["y"])
-    if dist > 5:
+    if dist > NEARBY_RADIUS:
         raise HTTPException(status_code=400, detail=f"Too far away! Get closer to {target['name']}")
 
     # Get current relationship level
-    rel_level = relationships[request.agent_id].get(request.target_id, 0)
+    rel_level = relationship_graph.get(request.agent_id, request.target_id)
     current_romance = romance.get(request.agent_id, {}).get(request.target_id, {})
 
     if request.action == "flirt":
         # Boost romance need and relationship
         agent["needs"]["romance"] = min(100, agent["needs"].get("romance", 30) + 5)
         target["needs"]["romance"] = min(100, target["needs"].get("romance", 30) + 3)
-        relationships[request.agent_id][request.target_id] += 3
-        relationships[request.target_id][request.agent_id] += 2
+        apply_relationship_updates([
+            (request.agent_id, request.target_id, 3),
+            (request.target_id, request.agent_id, 2),
+        ])
 
         log_activity("flirt", {
             "from_name": agent["name"],
             "to_name": target["name"]
         })
 
-        return {"success": True, "message": f"You flirted with {target['name']}!", "relationship": relationships[request.agent_id][request.target_id]}
+        return {"success": True, "message": f"You flirted with {target['name']}!", "relationship": relationship_graph.get(request.agent_id, request.target_id)}
 
     elif request.action == "ask_out":
         if rel_level < 25:
@@ -1820,14 +2408,11 @@ async def romance_action(request: RomanceRequest):
         if request.target_id not in romance:
             romance[request.target_id] = {}
 
-        romance[request.agent_id][request.target_id] = {"status": "dating", "since": time.time()}
-        romance[request.target_id][request.agent_id] = {"status": "dating", "since": time.time()}
+        romance[request.agent_id][request.target_id] = {"status": "dating", "since": clock.time()}
+        romance[request.target_id][request.agent_id] = {"status": "dating", "since": clock.time()}
 
-        agent.setdefault("stats", {})["dates"] = agent["stats"].get("dates", 0) + 1
-        target.setdefault("stats", {})["dates"] = target["stats"].get("dates", 0) + 1
-
-        check_achievements(agent)
-        check_achievements(target)
+        bump_stat(agent, "dates")
+        bump_stat(target, "dates")
 
         log_activity("dating_started", {
             "agent1_name": agent["name"],
@@ -1871,8 +2456,8 @@ async def romance_action(request: RomanceRequest):
         romance[request.agent_id][request.target_id]["status"] = "married"
         romance[request.target_id][request.agent_id]["status"] = "married"
 
-        check_achievements(agent)
-        check_achievements(target)
+        check_achievements(agent, "married", 1)
+        check_achievements(target, "married", 1)
 
         log_activity("marriage", {
             "agent1_name": agent["name"],
@@ -1920,14 +2505,9 @@ async def get_romance_status_endpoint(agent_id: str):
 # ============== ACHIEVEMENTS ==============
 
 @app.get("/achievements")
-async def get_all_achievements():
+async def get_all_achievements(request: Request):
     """Get list of all possible achievements"""
-    return {
-        "achievements": [
-            {"id": ach_id, **ach}
-            for ach_id, ach in ACHIEVEMENTS.items()
-        ]
-    }
+    return static_pages.response("achievements", request)
 
 @app.get("/achievements/{agent_id}")
 async def get_agent_achievements(agent_id: str):
@@ -1958,17 +2538,24 @@ async def get_activity_feed(limit: int = 50):
         "count": len(activity_feed)
     }
 
+def leaderboard_entry(agent_id: str, score: float) -> dict:
+    """Compact projection of a ranked agent"""
+    a = agents[agent_id]
+    return {
+        "agent_id": agent_id,
+        "name": a["name"],
+        "emoji": a["emoji"],
+        "sprite": a.get("sprite", "Abigail_Chen"),
+        "value": score,
+    }
+
 @app.get("/leaderboard")
 async def get_leaderboard():
     """Get leaderboards for various stats"""
-    agent_list = list(agents.values())
-
-    return {
-        "most_social": sorted(agent_list, key=lambda a: a.get("message_count", 0), reverse=True)[:10],
-        "most_active": sorted(agent_list, key=lambda a: a.get("move_count", 0), reverse=True)[:10],
-        "most_achievements": sorted(agent_list, key=lambda a: len(a.get("achievements", [])), reverse=True)[:10],
-        "most_friends": sorted(agent_list, key=lambda a: len(a.get("friends", [])), reverse=True)[:10],
-    }
+    def build():
+        top = leaderboards.top(leaderboard_entry)
+        return {key: top[metric] for key, metric in LEADERBOARDS.items()}
+    return Response(content=snapshots.get("leaderboard", leaderboards.version, build), media_type="application/json")
 
 # ============== ACTIONS/EMOTES ==============
 
@@ -1989,6 +2576,11 @@ ACTIONS = {
     "flirt": {"emoji": "😘", "message": "is being flirty", "effect": {"romance": 3}},  # Light flirt, no target needed
 }
 
+# Compiled once: action -> effect vector, and the "need: +n" strings the response reports
+ACTION_EFFECTS = {action: compile_effect(data.get("effect", {})) for action, data in ACTIONS.items()}
+ACTION_EFFECT_LABELS = {action: describe_effect(effect) or None for action, effect in ACTION_EFFECTS.items()}
+HUG_TARGET_EFFECT = compile_effect({"social": 3, "happiness": 2})
+
 class ActionRequest(BaseModel):
     agent_id: str
     action: str
@@ -2000,9 +2592,20 @@ async def perform_action(request: ActionRequest):
     if request.agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+    validate_action(request)
+    check_rate_limit(request.agent_id, "action", "Too many actions. Slow down!")
+
+    return await run_intent("action", apply_action, request)
+
+def validate_action(request: ActionRequest):
     if request.action not in ACTIONS:
         raise HTTPException(status_code=400, detail=f"Unknown action. Available: {list(ACTIONS.keys())}")
 
+async def apply_action(request: ActionRequest) -> dict:
+    """Carry out an emote/action and its effects on needs"""
+    if request.agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
     agent = agents[request.agent_id]
     action_data = ACTIONS[request.action]
 
@@ -2020,8 +2623,7 @@ async def perform_action(request: ActionRequest):
         msg = f"{agent['name']} {action_data['message']} at {target['name']}"
         # Hug gives bonus to both
         if request.action == "hug":
-            target["needs"]["social"] = min(100, target["needs"]["social"] + 3)
-            target["needs"]["happiness"] = min(100, target["needs"]["happiness"] + 2)
+            apply_effect(target["needs"], HUG_TARGET_EFFECT)
     else:
         msg = f"{agent['name']} {action_data['message']}"
 
@@ -2037,37 +2639,19 @@ async def perform_action(request: ActionRequest):
         "target_id": request.target_id
     })
 
-    # Apply action effects to needs
-    effects = action_data.get("effect", {})
-    effects_applied = []
-    for need, amount in effects.items():
-        if need in agent["needs"]:
-            old_val = agent["needs"][need]
-            agent["needs"][need] = max(0, min(100, agent["needs"][need] + amount))
-            if amount != 0:
-                effects_applied.append(f"{need}: {'+' if amount > 0 else ''}{amount}")
+    apply_effect(agent["needs"], ACTION_EFFECTS[request.action])
 
     return {
         "success": True,
         "action": request.action,
         "message": msg,
-        "effects": effects_applied if effects_applied else None
+        "effects": ACTION_EFFECT_LABELS[request.action]
     }
 
 @app.get("/actions")
-async def get_actions():
+async def get_actions(request: Request):
     """Get list of available actions with their effects"""
-    return {
-        "actions": {
-            name: {
-                "emoji": data["emoji"],
-                "message": data["message"],
-                "effects": data.get("effect", {}),
-                "requires_location": data.get("requires_location")
-            }
-            for name, data in ACTIONS.items()
-        }
-    }
+    return static_pages.response("actions", request)
 
 # ============== MEMORIES ==============
 
@@ -2082,40 +2666,48 @@ async def add_memory(request: MemoryRequest):
     if request.agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+    validate_memory(request)
+
+    return await run_command("memory", apply_memory, request)
+
+def validate_memory(request: MemoryRequest):
     if len(request.memory) > 500:
         raise HTTPException(status_code=400, detail="Memory too long (max 500 chars)")
 
+async def apply_memory(request: MemoryRequest) -> dict:
+    if request.agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
     memory_entry = {
         "text": request.memory,
         "importance": min(10, max(1, request.importance or 5)),
-        "timestamp": time.time(),
+        "timestamp": clock.time(),
         "location": get_agent_location(agents[request.agent_id])
     }
 
-    if request.agent_id not in agent_memories:
-        agent_memories[request.agent_id] = []
-
-    agent_memories[request.agent_id].append(memory_entry)
+    store = agent_memories.setdefault(request.agent_id, MemoryStore())
+    store.add(memory_entry)
 
-    # Keep only last 50 memories
-    if len(agent_memories[request.agent_id]) > 50:
-        # Sort by importance, keep most important
-        agent_memories[request.agent_id].sort(key=lambda m: m["importance"], reverse=True)
-        agent_memories[request.agent_id] = agent_memories[request.agent_id][:50]
-
-    return {"success": True, "memories_count": len(agent_memories[request.agent_id])}
+    return {"success": True, "memories_count": len(store)}
 
 @app.get("/memories/{agent_id}")
-async def get_memories(agent_id: str, limit: int = 20):
-    """Get an agent's memories"""
+async def get_memories(agent_id: str, sort: str = "recent", limit: int = 20):
+    """Get an agent's memories: most recent first, most important first, or by importance x recency"""
     if agent_id not in agents:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    memories = agent_memories.get(agent_id, [])
+    if sort not in MEMORY_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Choose: {list(MEMORY_SORTS)}")
+
+    store = agent_memories.get(agent_id)
+    if store is None:
+        return {"agent_id": agent_id, "sort": sort, "memories": [], "count": 0}
+
     return {
         "agent_id": agent_id,
-        "memories": memories[-limit:][::-1],  # Most recent first
-        "count": len(memories)
+        "sort": sort,
+        "memories": store.query(sort, max(0, limit)),
+        "count": len(store)
     }
 
 # ============== WEBSOCKET ==============
@@ -2127,7 +2719,7 @@ async def websocket_endpoint(websocket: WebSocket):
     ws_connections.append(websocket)
     print(f"[WS] Viewer connected ({len(ws_connections)} total)")
 
-    await websocket.send_text(json.dumps({
+    await websocket.send_text(snapshots.get("world_state", world_version, lambda: {
         "type": "world_state",
         "data": {
             "agents": [
@@ -2137,7 +2729,7 @@ async def websocket_endpoint(websocket: WebSocket):
             ],
             "chat_history": chat_history[-20:]
         }
-    }))
+    }).decode())
 
     try:
         while True:
@@ -2147,55 +2739,505 @@ async def websocket_endpoint(websocket: WebSocket):
             ws_connections.remove(websocket)
         print(f"[WS] Viewer disconnected ({len(ws_connections)} remaining)")
 
+# ============== SESSION RECORDING ==============
+
+# Every accepted world-changing command runs through run_command(), which gives it
+# its own seeded RNG and (with RECORD_SESSION=path.jsonl) logs it with that seed,
+# so replay.py can feed the session back in and end up in the same world.
+RECORD_SESSION = os.environ.get("RECORD_SESSION")
+recorder = SessionRecorder(RECORD_SESSION)
+
+# RNG for the command being applied; spawn points, moods and ids must come from here
+command_rng: contextvars.ContextVar = contextvars.ContextVar("command_rng", default=random)
+
+async def run_command(name: str, handler, *args, seed: Optional[int] = None):
+    """Apply handler(*args) under a seeded RNG and record it if it succeeds"""
+    if seed is None:
+        seed = random.getrandbits(32)
+    token = command_rng.set(random.Random(seed))
+    try:
+        result = await handler(*args)
+    finally:
+        command_rng.reset(token)
+    recorder.command(clock.time(), name, seed, args)
+    return result
+
+def record_checkpoint():
+    recorder.checkpoint(clock.time(), world_fingerprint())
+
+# ============== SIMULATION TICK ==============
+
+# Optional fixed-timestep mode: /move, /chat and /action queue intents that are
+# applied in batches once per tick, followed by a single broadcast frame.
+TICK_RATE = float(os.environ.get("TICK_RATE", "0"))  # Ticks per second; 0 = apply each request immediately
+TICK_PHASES = ("move", "action", "chat")
+tick_engine: Optional[TickEngine] = TickEngine(1 / TICK_RATE, TICK_PHASES, clock) if TICK_RATE > 0 else None
+LOCATION_EFFECT_TICKS = max(1, round(LOCATION_EFFECT_INTERVAL * TICK_RATE))  # Ticks between location effect passes
+
+# Per-tick scratch state; tick_frame is None outside of a tick
+tick_frame: Optional[List[dict]] = None
+deferred_achievements: Dict[tuple, float] = {}   # (agent_id, stat_type) -> latest value
+
+async def run_intent(phase: str, handler, request):
+    """Apply an intent now, or queue it for the next tick and wait for its result"""
+    if tick_engine is None:
+        return await run_command(phase, handler, request)
+    return await tick_engine.submit(phase, run_command, phase, handler, request)
+
+async def simulation_tick(tick: int):
+    """Movement, location effects (every LOCATION_EFFECT_TICKS), actions, chats (relationships),
+    achievements, then one broadcast. The effect pass is keyed on the tick number, so a replay
+    of the recorded tick runs it again rather than needing its own command."""
+    global tick_frame
+    tick_frame = []
+    applied = 0
+    effects_due = tick % LOCATION_EFFECT_TICKS == 0
+    try:
+        applied += await tick_engine.drain("move")
+        if effects_due:
+            await apply_location_effects()
+        applied += await tick_engine.drain("action")
+        applied += await tick_engine.drain("chat")
+
+        for (agent_id, stat_type), value in deferred_achievements.items():
+            if agent_id in agents:
+                award_achievements(agents[agent_id], stat_type, value)
+        deferred_achievements.clear()
+    finally:
+        frame, tick_frame = tick_frame, None
+
+    if applied or effects_due:
+        recorder.tick(clock.time(), tick)
+    if frame:
+        await send_to_viewers(json.dumps({"type": "tick", "data": {"tick": tick, "updates": frame}}))
+
+# ============== BATCH ==============
+
+# POST /batch runs one agent's whole turn (e.g. move, chat, action, me) in a single
+# request. The batch is validated up front, so a malformed command rejects all of
+# it; after that every command is rate limited on its own and gets its own result.
+MAX_BATCH_COMMANDS = 10
+
+# type -> (request model, rate-limit action, validator, handler)
+BATCH_COMMANDS = {
+    "move": (MoveRequest, "move", None, apply_move),
+    "chat": (ChatRequest, "chat", validate_chat, apply_chat),
+    "action": (ActionRequest, "action", validate_action, apply_action),
+    "activity": (ActivityRequest, None, None, apply_activity),
+    "memory": (MemoryRequest, None, validate_memory, apply_memory),
+    "me": (None, None, None, None),  # Read-only: your status after the commands before it
+}
+
+class BatchRequest(BaseModel):
+    agent_id: str
+    commands: List[dict]  # e.g. [{"type": "move", "direction": "up"}, {"type": "chat", "message": "hi"}, {"type": "me"}]
+
+def parse_batch_command(agent_id: str, index: int, command: dict) -> Tuple[str, Optional[BaseModel]]:
+    """Build and validate the request for one batch command. Raises 400/422 naming the command."""
+    kind = command.get("type")
+    if kind not in BATCH_COMMANDS:
+        raise HTTPException(status_code=400, detail=f"commands[{index}]: unknown type {kind!r}. Choose: {list(BATCH_COMMANDS)}")
+    model, _, validate, _ = BATCH_COMMANDS[kind]
+    if model is None:
+        return kind, None
+
+    fields = {key: value for key, value in command.items() if key != "type"}
+    try:
+        request = model(**{**fields, "agent_id": agent_id})
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise HTTPException(status_code=422, detail=f"commands[{index}].{field}: {error['msg']}")
+    if validate:
+        try:
+            validate(request)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"commands[{index}]: {e.detail}")
+    return kind, request
+
+async def batch_result(kind: str, pending) -> dict:
+    """Await one command's handler (or queued intent) and wrap its outcome"""
+    try:
+        return {"type": kind, "ok": True, "result": await pending}
+    except HTTPException as e:
+        return {"type": kind, "ok": False, "status": e.status_code, "detail": e.detail}
+
+@app.post("/batch")
+async def run_batch(request: BatchRequest):
+    """Run an agent's commands in order and return one result per command"""
+    if request.agent_id not in agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if not 0 < len(request.commands) <= MAX_BATCH_COMMANDS:
+        raise HTTPException(status_code=400, detail=f"Send 1-{MAX_BATCH_COMMANDS} commands")
+
+    parsed = [parse_batch_command(request.agent_id, i, command) for i, command in enumerate(request.commands)]
+
+    results: List[Optional[dict]] = [None] * len(parsed)
+    admitted = []
+    now = clock.time()
+    for i, (kind, command) in enumerate(parsed):
+        limit = BATCH_COMMANDS[kind][1]
+        retry_after = rate_limiter.acquire(request.agent_id, limit, now) if limit else 0
+        if retry_after > 0:
+            results[i] = {"type": kind, "ok": False, "status": 429,
+                          "detail": "Rate limited", "retry_after": round(retry_after, 3)}
+        else:
+            admitted.append((i, kind, command))
+
+    # Consecutive intents share the next tick as long as their phases come in tick order
+    # (e.g. move, action, chat); an intent from an earlier phase (chat, then move) or any
+    # other command waits for that tick, so commands always apply in the order sent
+    queued = []
+    for i, kind, command in admitted:
+        if tick_engine is not None and kind in TICK_PHASES:
+            if queued and TICK_PHASES.index(kind) < TICK_PHASES.index(queued[-1][1]):
+                for j, queued_kind, future in queued:
+                    results[j] = await batch_result(queued_kind, future)
+                queued.clear()
+            handler = BATCH_COMMANDS[kind][3]
+            queued.append((i, kind, tick_engine.submit(kind, run_command, kind, handler, command)))
+            continue
+        for j, queued_kind, future in queued:
+            results[j] = await batch_result(queued_kind, future)
+        queued.clear()
+        if kind == "me":
+            results[i] = await batch_result(kind, get_my_status(request.agent_id))
+        else:
+            results[i] = await batch_result(kind, run_command(kind, BATCH_COMMANDS[kind][3], command))
+    for j, queued_kind, future in queued:
+        results[j] = await batch_result(queued_kind, future)
+
+    return {"agent_id": request.agent_id, "results": results}
+
+# ============== NPC SWARM ==============
+
+# Server-side dev agents driven by npc_engine from inside the tick loop (tick mode only).
+# Their handles start with "dev_npc_", so /dev/clear removes them along with other dev agents.
+NPC_THINK_INTERVAL = float(os.environ.get("NPC_THINK_INTERVAL", "1"))  # Seconds between decisions per NPC
+NPC_SPAWN_LIMIT = 1000  # Per /dev/npcs call
+npc_engine: Optional[NpcEngine] = NpcEngine(round(NPC_THINK_INTERVAL * TICK_RATE)) if tick_engine else None
+
+class NpcSpawnRequest(BaseModel):
+    count: int = 100
+
+def is_npc(agent: dict) -> bool:
+    return agent.get("twitter_handle", "").startswith("dev_npc_")
+
+def walkable_location_tiles() -> Dict[str, List[tuple]]:
+    """Unblocked tiles inside each location, for NPCs to walk to"""
+    tiles = {}
+    for loc_id, loc in LOCATIONS.items():
+        r = loc["radius"]
+        tiles[loc_id] = [
+            (x, y)
+            for x in range(loc["x"] - r, loc["x"] + r + 1)
+            for y in range(loc["y"] - r, loc["y"] + r + 1)
+            if abs(x - loc["x"]) + abs(y - loc["y"]) <= r and not is_blocked(x, y)
+        ]
+    return tiles
+
+@app.post("/dev/npcs")
+async def spawn_npcs(request: NpcSpawnRequest):
+    """DEV MODE: Spawn procedurally named NPCs that live inside the simulation tick"""
+    if npc_engine is None:
+        raise HTTPException(status_code=400, detail="NPCs run inside the simulation tick. Start the server with TICK_RATE > 0.")
+
+    count = clamp(request.count, 0, NPC_SPAWN_LIMIT)
+    if len(agents) + count > MAX_AGENTS:
+        raise HTTPException(status_code=503, detail=f"Would exceed max agents. Currently {len(agents)}/{MAX_AGENTS} (raise MAX_AGENTS for swarm tests)")
+
+    return await run_command("npc_spawn", apply_npc_spawn, NpcSpawnRequest(count=count))
+
+async def apply_npc_spawn(request: NpcSpawnRequest) -> dict:
+    rng = command_rng.get()
+    taken = {a["name"].lower() for a in agents.values()}
+    joined = []
+    for name in npc_engine.take_names(request.count, lambda name: name.lower() in taken):
+        agent, _ = add_agent({
+            "name": name,
+            "description": f"ShellTown local who likes the {LOCATIONS[rng.choice(list(LOCATIONS))]['name']}.",
+            "emoji": rng.choice(NPC_EMOJIS),
+            "sprite": rng.choice(AVAILABLE_CHARACTERS),
+            "twitter_handle": "dev_npc_" + name.lower().replace(" ", "_"),
+            "verified_at": clock.time(),
+        }, {need: rng.randint(20, 90) for need in ("social", "energy", "fun", "romance", "hunger", "happiness")})
+        npc_engine.adopt(agent["agent_id"])
+        joined.append({"type": "agent_joined", "data": {
+            "agent_id": agent["agent_id"],
+            "name": agent["name"],
+            "emoji": agent["emoji"],
+            "sprite": agent["sprite"],
+            "x": agent["x"],
+            "y": agent["y"],
+            "verified": True,
+        }})
+
+    # One frame for the whole batch rather than one message per NPC
+    if joined:
+        await send_to_viewers(json.dumps({"type": "tick", "data": {"tick": tick_engine.tick, "updates": joined}}))
+    print(f"[NPC] Spawned {len(joined)} NPCs ({len(npc_engine)} total)")
+
+    save_world()
+
+    return {"success": True, "spawned": len(joined), "npcs": len(npc_engine)}
+
+NPC_REQUESTS = {"move": MoveRequest, "chat": ChatRequest, "action": ActionRequest}
+NPC_HANDLERS = {"move": apply_move, "chat": apply_chat, "action": apply_action}
+
+def plan_npc_intents(tick: int) -> int:
+    """Let this tick's slot of NPCs decide, and queue their intents for the tick"""
+    planned = 0
+    for agent_id in npc_engine.due(tick):
+        agent = agents.get(agent_id)
+        if agent is None:
+            npc_engine.forget(agent_id)
+            continue
+        location = get_agent_location(agent)
+        decision = npc_engine.decide(
+            agent,
+            location["id"] if location else None,
+            lambda: bool(get_nearby_agents(agent, HEARING_RANGE)),
+        )
+        if decision is None:
+            continue
+        kind, fields = decision
+        request = NPC_REQUESTS[kind](agent_id=agent_id, **fields)
+        future = tick_engine.submit(kind, run_command, kind, NPC_HANDLERS[kind], request)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Nobody awaits NPC intents
+        planned += 1
+    return planned
+
+async def simulation_step(tick: int):
+    """One tick of the live server: NPCs decide, then the tick runs"""
+    if npc_engine:
+        with cpu.measure("npc"):
+            plan_npc_intents(tick)
+    with cpu.measure("tick"):
+        await simulation_tick(tick)
+
+# ============== REGION SHARDING ==============
+
+# Handoff protocol: the worker an agent walks out of exports everything it keeps about
+# that agent (its outgoing relationship edges and romance entries travel with it, since
+# those are only ever updated while it is present) and posts it to the router, which
+# passes it to the owning worker's /internal/adopt. If the router can't place the agent
+# it is adopted back here. The agent's rate-limit buckets travel too, so crossing a
+# border doesn't refill them.
+shard_client: Optional[httpx.AsyncClient] = None
+handoff_tasks: Set[asyncio.Task] = set()  # Router posts still in flight
+
+def check_shard_secret(request: Request):
+    if not SHARD_REGION or request.headers.get("X-Shard-Secret") != SHARD_SECRET:
+        raise HTTPException(status_code=403, detail="Internal shard endpoint")
+
+def export_agent(agent_id: str) -> dict:
+    """Everything this worker holds about an agent, for handing it to another region"""
+    store = agent_memories.get(agent_id)
+    return {
+        "agent": agents[agent_id],
+        "api_keys": [key for key, aid in api_keys.items() if aid == agent_id],
+        "relationships": dict(relationship_graph.neighbors(agent_id)),
+        "romance": romance.get(agent_id, {}),
+        "memories": store.to_list() if store else [],
+        "rate_limits": rate_limiter.export(agent_id),
+        "chat_inbox": list(chat_inboxes.get(agent_id, ())),
+    }
+
+def adopt_agent(state: dict) -> dict:
+    """Take over an agent exported by another region"""
+    agent = state["agent"]
+    agent_id = agent["agent_id"]
+    agents[agent_id] = agent
+    for key in state["api_keys"]:
+        api_keys[key] = agent_id
+    for other_id, level in state["relationships"].items():
+        relationship_graph.set(agent_id, other_id, level)
+    if state["romance"]:
+        romance[agent_id] = state["romance"]
+    agent_memories[agent_id] = MemoryStore.from_list(state["memories"])
+    rate_limiter.restore(agent_id, state.get("rate_limits", {}), clock.time())
+    if state.get("chat_inbox"):
+        chat_inboxes[agent_id] = deque(state["chat_inbox"], maxlen=MAX_INBOX)
+    touch_agent(agent)
+    index_agent(agent)
+    rank_agent(agent)
+    return agent
+
+async def hand_off(agent_id: str):
+    """Move an agent that left this region to the worker that owns its new position.
+    It leaves this worker right away; the router call runs as a background task, so a
+    slow peer region never holds up the move (or, in tick mode, the whole tick)."""
+    state = export_agent(agent_id)
+    await remove_agent(agent_id, reason="handoff")
+    relationship_graph.pop_agent(agent_id)
+    romance.pop(agent_id, None)
+
+    task = asyncio.create_task(send_handoff(state))
+    handoff_tasks.add(task)
+    task.add_done_callback(handoff_tasks.discard)
+
+async def send_handoff(state: dict) -> bool:
+    """Post an exported agent to the router; adopt it back here if that fails"""
+    global shard_client
+    agent_id = state["agent"]["agent_id"]
+    if shard_client is None:
+        shard_client = httpx.AsyncClient(base_url=SHARD_ROUTER, headers={"X-Shard-Secret": SHARD_SECRET}, timeout=5)
+    try:
+        response = await shard_client.post("/internal/handoff", json={"region": SHARD_REGION, "state": state})
+        response.raise_for_status()
+        return True
+    except httpx.HTTPError as e:
+        print(f"[SHARD] Handoff of {agent_id} failed ({e}); keeping it in region {SHARD_REGION}")
+        agent = adopt_agent(state)
+        await broadcast_update("agent_joined", {
+            "agent_id": agent_id, "name": agent["name"], "emoji": agent["emoji"],
+            "sprite": agent["sprite"], "x": agent["x"], "y": agent["y"], "verified": True,
+        })
+        return False
+
+@app.post("/internal/adopt")
+async def internal_adopt(request: Request):
+    """Shard workers only: receive an agent handed off by another region"""
+    check_shard_secret(request)
+    agent = adopt_agent(await request.json())
+    if npc_engine is not None and is_npc(agent):
+        npc_engine.adopt(agent["agent_id"])
+    await broadcast_update("agent_joined", {
+        "agent_id": agent["agent_id"], "name": agent["name"], "emoji": agent["emoji"],
+        "sprite": agent["sprite"], "x": agent["x"], "y": agent["y"], "verified": True,
+    })
+    return {"success": True, "region": SHARD_REGION}
+
 # ============== CLEANUP ==============
 
-async def cleanup_inactive_agents():
-    """Remove inactive agents"""
+async def expire_due():
+    """Evict inactive agents, unclaimed verification codes and unused registration tokens when due"""
+    while True:
+        await clock.sleep(EXPIRY_SWEEP_INTERVAL)
+        with cpu.measure("expiry"):
+            swept = await sweep_expired(clock.time())
+
+        if any(swept.values()):
+            for name, count in swept.items():
+                expired_counts[name] += count
+            print(f"[CLEANUP] Expired {swept['agents']} agents, {swept['registrations']} verification codes, {swept['tokens']} registration tokens")
+
+async def sweep_expired(now: float) -> Dict[str, int]:
+    rate_limiter.evict_idle(now)
+
+    swept = {"agents": 0, "registrations": 0, "tokens": 0}
+    for kind, key in expiry.pop_due(now):
+        if kind == "agent":
+            if await run_command("expire_agent", apply_expire_agent, key):
+                swept["agents"] += 1
+        elif kind == "registration":
+            if pending_registrations.pop(key, None):
+                swept["registrations"] += 1
+        elif kind == "token":
+            if verified_registrations.pop(key, None):
+                swept["tokens"] += 1
+        elif kind == "claim_job":
+            claim_queue.forget(key)
+    return swept
+
+async def apply_expire_agent(agent_id: str) -> bool:
+    agent = await remove_agent(agent_id, reason="inactive")
+    if agent:
+        print(f"[CLEANUP] {agent['name']} removed (inactive)")
+    return agent is not None
+
+async def expire_events():
+    """End events when their time is up"""
     while True:
-        await asyncio.sleep(60)
-        now = time.time()
-        inactive = [aid for aid, a in agents.items() if now - a["last_seen"] > 7200]
-
-        for agent_id in inactive:
-            agent = agents.pop(agent_id, None)
-            if agent:
-                # Clean up API key
-                for key, aid in list(api_keys.items()):
-                    if aid == agent_id:
-                        del api_keys[key]
-                        break
-
-                # NOTE: Twitter handle stays linked - one X account = one bot forever (like Moltbook)
-
-                await broadcast_update("agent_left", {
-                    "agent_id": agent_id,
-                    "name": agent["name"],
-                    "reason": "inactive"
-                })
-                print(f"[CLEANUP] {agent['name']} removed (inactive)")
+        next_end = event_store.next_expiry()
+        delay = EVENT_SWEEP_INTERVAL
+        if next_end is not None:
+            delay = clamp(next_end - clock.time(), 0, EVENT_SWEEP_INTERVAL)
+        await clock.sleep(delay)
+
+        with cpu.measure("events"):
+            for event in event_store.pop_expired(clock.time()):
+                await run_command("end_event", apply_end_event, event)
+
+async def apply_end_event(event: dict):
+    event_store.remove(event["event_id"])  # Already popped, except under replay
+    await broadcast_update("event_ended", {
+        "event_id": event["event_id"],
+        "name": event["name"],
+        "type": event["type"],
+        "attendees": len(event["attendees"])
+    })
+    print(f"[EVENT] {event['name']} ended")
 
 async def periodic_save():
     """Save world state every 5 minutes"""
     while True:
-        await asyncio.sleep(300)
-        save_world()
+        await clock.sleep(300)
+        with cpu.measure("save"):
+            save_world()
+            record_checkpoint()
         print("[SAVE] World state saved")
 
+async def location_effects():
+    """Apply location effects every LOCATION_EFFECT_INTERVAL (the tick loop does this in tick mode)"""
+    while True:
+        await clock.sleep(LOCATION_EFFECT_INTERVAL)
+        with cpu.measure("effects"):
+            await run_command("location_effects", apply_location_effects)
+
 async def decay_needs():
     """Slowly decay agent needs over time"""
     while True:
-        await asyncio.sleep(60)
-        for agent in agents.values():
-            needs = agent.get("needs", {})
-            needs["energy"] = max(0, needs.get("energy", 50) - 1)
-            needs["social"] = max(0, needs.get("social", 50) - 0.5)
+        await clock.sleep(60)
+        with cpu.measure("decay"):
+            await run_command("decay_needs", apply_needs_decay)
+
+async def apply_needs_decay():
+    for agent in agents.values():
+        needs = agent.get("needs", {})
+        needs["energy"] = max(0, needs.get("energy", 50) - 1)
+        needs["social"] = max(0, needs.get("social", 50) - 0.5)
+
+# Recorded command name -> (handler, argument types); how replay.py rebuilds each call
+COMMANDS = {
+    "join": (apply_join, (dict,)),
+    "dev_spawn": (apply_dev_spawn, (DevSpawnRequest,)),
+    "dev_clear": (apply_dev_clear, ()),
+    "move": (apply_move, (MoveRequest,)),
+    "chat": (apply_chat, (ChatRequest,)),
+    "action": (apply_action, (ActionRequest,)),
+    "activity": (apply_activity, (ActivityRequest,)),
+    "leave": (apply_leave, (str,)),
+    "create_event": (apply_create_event, (CreateEventRequest,)),
+    "join_event": (apply_join_event, (str, str)),
+    "end_event": (apply_end_event, (dict,)),
+    "romance": (apply_romance, (RomanceRequest,)),
+    "memory": (apply_memory, (MemoryRequest,)),
+    "expire_agent": (apply_expire_agent, (str,)),
+    "decay_needs": (apply_needs_decay, ()),
+    "location_effects": (apply_location_effects, ()),
+    "npc_spawn": (apply_npc_spawn, (NpcSpawnRequest,)),
+}
 
 @app.on_event("startup")
 async def startup():
     load_collision_map()  # Load tilemap collision data
+    load_static_responses()  # Pages and catalogs, rendered once
     load_world()  # Load saved state
-    asyncio.create_task(cleanup_inactive_agents())
+    recorder.start(clock.time(), world_data(), TICK_RATE)
+    asyncio.create_task(expire_due())
     asyncio.create_task(periodic_save())
+    asyncio.create_task(expire_events())
+    claim_queue.start()
+    if tick_engine is not None:
+        npc_engine.tiles = walkable_location_tiles()
+        for agent in agents.values():
+            if is_npc(agent):
+                npc_engine.adopt(agent["agent_id"])
+        asyncio.create_task(tick_engine.run(simulation_step))
+        print(f"[TICK] Simulation running at {TICK_RATE:g} ticks/sec ({len(npc_engine)} NPCs)")
+    else:
+        asyncio.create_task(location_effects())
     asyncio.create_task(decay_needs())
     print("""
     ╔══════════════════════════════════════════════════════════════╗
@@ -2219,6 +3261,16 @@ async def startup():
     ╚══════════════════════════════════════════════════════════════╝
     """)
 
+@app.on_event("shutdown")
+async def shutdown():
+    record_checkpoint()
+    recorder.close()
+    await claim_queue.stop()
+    await tweet_verifier.close()
+    await asyncio.gather(*handoff_tasks, return_exceptions=True)  # Don't drop agents in transit
+    if shard_client is not None:
+        await shard_client.aclose()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,87 @@
+"""
+Agent memory store for ShellTown
+Memories are kept in insertion order, evicted by lowest importance x recency
+score through a min-heap, and retrievable by importance, recency or score
+without re-sorting the whole list.
+"""
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+MEMORY_CAPACITY = 50
+MEMORY_HALF_LIFE = 24 * 3600  # Seconds for a memory's recency weight to halve
+MEMORY_SORTS = ("recent", "importance", "score")
+
+
+def score_key(importance: float, timestamp: float, half_life: float = MEMORY_HALF_LIFE) -> float:
+    """log of importance * 0.5 ** (age / half_life), minus the part shared by every memory.
+    The ordering this gives never changes as time passes, so it can live in a heap."""
+    return math.log(importance) + timestamp * math.log(2) / half_life
+
+
+class MemoryStore:
+    """One agent's memories, capped at capacity"""
+
+    def __init__(self, capacity: int = MEMORY_CAPACITY, half_life: float = MEMORY_HALF_LIFE):
+        self.capacity = capacity
+        self.half_life = half_life
+        self._seq = 0
+        self._entries: Dict[int, dict] = {}                       # seq -> memory, insertion ordered
+        self._evict_heap: List[Tuple[float, int]] = []            # (score_key, seq), lowest first
+        self._by_importance: List[Tuple[float, int]] = []         # (-importance, -seq), best first
+        self._by_score: List[Tuple[float, int]] = []              # (-score_key, -seq), best first
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, memory: dict) -> Optional[dict]:
+        """Store a memory ({"text", "importance", "timestamp", ...}).
+        Returns the memory evicted to make room, if any."""
+        seq = self._seq
+        self._seq += 1
+        key = score_key(memory["importance"], memory["timestamp"], self.half_life)
+
+        self._entries[seq] = memory
+        heapq.heappush(self._evict_heap, (key, seq))
+        insort(self._by_importance, (-memory["importance"], -seq))
+        insort(self._by_score, (-key, -seq))
+
+        if len(self._entries) > self.capacity:
+            return self._evict()
+        return None
+
+    def _evict(self) -> dict:
+        key, seq = heapq.heappop(self._evict_heap)
+        memory = self._entries.pop(seq)
+        for index, item in ((self._by_importance, (-memory["importance"], -seq)), (self._by_score, (-key, -seq))):
+            del index[bisect_left(index, item)]
+        return memory
+
+    def recent(self, limit: int) -> List[dict]:
+        """Most recent first"""
+        results = []
+        for seq in reversed(self._entries):
+            if len(results) >= limit:
+                break
+            results.append(self._entries[seq])
+        return results
+
+    def query(self, sort: str = "recent", limit: int = 20) -> List[dict]:
+        """Top memories by "recent", "importance" or "score" (importance x recency)"""
+        if sort == "recent":
+            return self.recent(limit)
+        index = self._by_importance if sort == "importance" else self._by_score
+        return [self._entries[-neg_seq] for _, neg_seq in index[:limit]]
+
+    def to_list(self) -> List[dict]:
+        """All memories in insertion order"""
+        return list(self._entries.values())
+
+    @classmethod
+    def from_list(cls, memories: List[dict], **kwargs) -> "MemoryStore":
+        store = cls(**kwargs)
+        for memory in memories:
+            store.add(memory)
+        return store
@@ -0,0 +1,136 @@
+"""
+NPC swarm for ShellTown
+Server-side dev agents with simple need-driven behaviour, for load testing
+without external clients. The engine only decides what each NPC wants to do:
+the tick loop turns those decisions into ordinary move/chat/action intents, so
+NPCs go through the same movement, proximity, relationship and broadcast code
+as real bots. NPCs are spread over `period` tick slots so each one thinks once
+per period and the per-tick cost stays flat.
+"""
+
+import random
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+NPC_FIRST_NAMES = [
+    "Ada", "Basil", "Cleo", "Dorian", "Edie", "Felix", "Greta", "Hugo", "Iris", "Jasper",
+    "Kit", "Luna", "Milo", "Nell", "Otto", "Pearl", "Quinn", "Rosa", "Silas", "Tess",
+    "Umber", "Vera", "Wren", "Xavi", "Yara", "Zeke", "Alba", "Bram", "Coral", "Dex",
+]
+NPC_LAST_NAMES = [
+    "Shore", "Tide", "Reef", "Kelp", "Drift", "Cove", "Pebble", "Gull", "Wick", "Marsh",
+    "Brook", "Fern", "Ash", "Dune", "Harbor", "Moss", "Quill", "Rook", "Sorrel", "Thorn",
+]
+NPC_EMOJIS = ["🦀", "🐚", "🦞", "🐙", "🐠", "🦑", "🐡", "🦐", "🐢", "🪼"]
+NPC_CHATTER = [
+    "Anyone around?",
+    "Lovely day in ShellTown!",
+    "Has anyone tried the café?",
+    "I could use some company.",
+    "What's everyone up to?",
+    "This place is buzzing today.",
+]
+
+# (need, threshold, places to head for (None = anywhere), action once there (None = chat))
+NEED_GOALS = [
+    ("hunger", 30, ("cafe",), "eat"),
+    ("energy", 25, None, "sleep"),
+    ("social", 35, ("town_square", "plaza"), None),
+    ("fun", 30, ("park", "club"), "dance"),
+]
+
+
+def npc_name(n: int) -> str:
+    """The n-th procedural NPC name: every first/last pairing, then numbered repeats"""
+    first = NPC_FIRST_NAMES[n % len(NPC_FIRST_NAMES)]
+    rest = n // len(NPC_FIRST_NAMES)
+    last = NPC_LAST_NAMES[rest % len(NPC_LAST_NAMES)]
+    cycle = rest // len(NPC_LAST_NAMES)
+    return f"{first} {last}" if cycle == 0 else f"{first} {last} {cycle + 1}"
+
+
+class NpcEngine:
+    """Which NPCs think on which tick, and what they decide to do"""
+
+    def __init__(self, period: int, seed: Optional[int] = None):
+        self.period = max(1, period)  # Ticks between two decisions of the same NPC
+        self.rng = random.Random(seed)
+        self.tiles: Dict[str, List[Tuple[int, int]]] = {}  # location id -> walkable tiles
+        self.next_name = 0
+        self._slots: List[List[str]] = [[] for _ in range(self.period)]
+        self._slot_of: Dict[str, int] = {}
+        self._targets: Dict[str, Tuple[int, int]] = {}     # agent_id -> tile it is walking to
+        self._last_pos: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._slot_of
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slot_of)
+
+    def adopt(self, agent_id: str):
+        if agent_id in self._slot_of:
+            return
+        slot = min(range(self.period), key=lambda i: len(self._slots[i])) if self.period > 1 else 0
+        self._slots[slot].append(agent_id)
+        self._slot_of[agent_id] = slot
+
+    def forget(self, agent_id: str):
+        slot = self._slot_of.pop(agent_id, None)
+        if slot is not None:
+            self._slots[slot].remove(agent_id)
+        self._targets.pop(agent_id, None)
+        self._last_pos.pop(agent_id, None)
+
+    def due(self, tick: int) -> List[str]:
+        """NPCs that think on this tick"""
+        return list(self._slots[tick % self.period])
+
+    def take_names(self, count: int, taken: Callable[[str], bool]) -> List[str]:
+        """The next count procedural names not already in use"""
+        names = []
+        while len(names) < count:
+            name = npc_name(self.next_name)
+            self.next_name += 1
+            if not taken(name):
+                names.append(name)
+        return names
+
+    def decide(self, agent: dict, location_id: Optional[str], has_company: Callable[[], bool]) -> Optional[Tuple[str, dict]]:
+        """(intent type, request fields) for one NPC, or None to idle this time"""
+        agent_id = agent["agent_id"]
+        pos = (agent["x"], agent["y"])
+        stuck = self._last_pos.get(agent_id) == pos
+        self._last_pos[agent_id] = pos
+
+        needs = agent.get("needs", {})
+        for need, threshold, places, action in NEED_GOALS:
+            if needs.get(need, 50) >= threshold:
+                continue
+            if places is None or location_id in places:
+                self._targets.pop(agent_id, None)
+                if action is None:
+                    return "chat", {"message": self.rng.choice(NPC_CHATTER)}
+                return "action", {"action": action}
+            return self._walk_to(agent_id, places, stuck)
+
+        # Nothing pressing: mostly wander, sometimes socialise
+        self._targets.pop(agent_id, None)
+        roll = self.rng.random()
+        if roll < 0.1 and has_company():
+            return "chat", {"message": self.rng.choice(NPC_CHATTER)}
+        if roll < 0.15:
+            return "action", {"action": self.rng.choice(("wave", "laugh", "think", "clap"))}
+        return "move", {"direction": self.rng.choice(("up", "down", "left", "right"))}
+
+    def _walk_to(self, agent_id: str, places: Sequence[str], stuck: bool) -> Optional[Tuple[str, dict]]:
+        target = self._targets.get(agent_id)
+        if target is None or stuck:
+            # New errand, or no progress since last time (no path): pick another tile
+            tiles = self.tiles.get(self.rng.choice(places))
+            if not tiles:
+                return None
+            target = self._targets[agent_id] = self.rng.choice(tiles)
+        return "move", {"direction": "to", "target_x": target[0], "target_y": target[1]}
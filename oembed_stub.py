@@ -0,0 +1,68 @@
+"""
+Local stand-in for Twitter's oEmbed API, for tests and load runs
+"Post" a tweet, then claim with its URL while the server points at the stub:
+
+    python oembed_stub.py --port 8099 --latency 0.5
+    OEMBED_URL=http://127.0.0.1:8099/oembed python main.py
+
+    POST /tweets {"handle": "alice", "text": "Verifying my bot ... Code: ABC123"}
+      -> {"url": "https://x.com/alice/status/1"}
+    GET /oembed?url=https://x.com/alice/status/1
+      -> {"html": "<blockquote ...>...</blockquote>"}
+
+Unknown tweets get 404, like private or deleted ones. --latency simulates a
+slow upstream so claim traffic can be load tested.
+"""
+
+import argparse
+import asyncio
+import html
+import itertools
+import os
+from typing import Dict
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+STUB_LATENCY = float(os.environ.get("STUB_LATENCY", "0"))  # Seconds per oEmbed lookup
+
+app = FastAPI(title="oEmbed stub")
+tweets: Dict[str, str] = {}  # status URL -> text
+tweet_ids = itertools.count(1)
+
+
+class TweetRequest(BaseModel):
+    handle: str
+    text: str
+
+
+@app.post("/tweets")
+async def post_tweet(request: TweetRequest):
+    url = f"https://x.com/{request.handle}/status/{next(tweet_ids)}"
+    tweets[url] = request.text
+    return {"url": url}
+
+
+@app.get("/oembed")
+async def oembed(url: str):
+    if STUB_LATENCY > 0:
+        await asyncio.sleep(STUB_LATENCY)
+    # Twitter treats twitter.com and x.com links alike
+    text = tweets.get(url.replace("twitter.com/", "x.com/").replace("www.", ""))
+    if text is None:
+        raise HTTPException(status_code=404, detail="No such tweet")
+    return {
+        "url": url,
+        "author_name": url.split("/")[3],
+        "html": f'<blockquote class="twitter-tweet"><p lang="en" dir="ltr">{html.escape(text)}</p></blockquote>',
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake oEmbed API for ShellTown claims")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY, help="Seconds to wait before each oEmbed reply")
+    args = parser.parse_args()
+    STUB_LATENCY = args.latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
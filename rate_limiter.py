@@ -0,0 +1,121 @@
+"""
+Token-bucket rate limiter for ShellTown
+Each (client, action) pair gets a bucket that refills at a steady rate and can
+bank a few tokens for bursts. Buckets that have sat idle long enough to be full
+again are indistinguishable from new ones, so they are evicted to keep memory
+bounded by the number of active clients.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class TokenBucketLimiter:
+    """Per-key, per-action token buckets with idle eviction"""
+
+    def __init__(self, intervals: Dict[str, float], bursts: Dict[str, int], max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.intervals = intervals  # action -> seconds to earn one token
+        self.bursts = bursts        # action -> bucket capacity
+        self.max_entries = max_entries
+        # key -> (last_touch, {action: [tokens, updated_at]}), least recently touched first
+        self._buckets: "OrderedDict[str, Tuple[float, Dict[str, List[float]]]]" = OrderedDict()
+        self._idle_after = self._longest_refill()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def set_limit(self, action: str, interval: float, burst: int):
+        """Change an action's refill interval and burst size"""
+        self.intervals[action] = interval
+        self.bursts[action] = burst
+        self._idle_after = self._longest_refill()
+
+    def _longest_refill(self) -> float:
+        """Seconds for the slowest bucket to refill from empty; idle longer than this means full"""
+        return max((self.intervals[a] * self.bursts.get(a, 1) for a in self.intervals), default=0)
+
+    def acquire(self, key: str, action: str, now: float = None) -> float:
+        """Spend one token. Returns 0 if allowed, else seconds until a token is available."""
+        interval = self.intervals.get(action, 0)
+        if interval <= 0:
+            return 0.0
+        if now is None:
+            now = time.time()
+        capacity = self.bursts.get(action, 1)
+
+        entry = self._buckets.pop(key, None)
+        buckets = entry[1] if entry else {}
+        self._buckets[key] = (now, buckets)  # Re-insert at the most recent end
+
+        bucket = buckets.get(action)
+        if bucket is None:
+            bucket = buckets[action] = [capacity, now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) / interval)
+            bucket[1] = now
+
+        if len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) * interval
+
+    def remaining(self, key: str, action: str, now: float = None) -> int:
+        """Whole tokens currently available (without spending any)"""
+        entry = self._buckets.get(key)
+        capacity = self.bursts.get(action, 1)
+        if entry is None or action not in entry[1]:
+            return capacity
+        if now is None:
+            now = time.time()
+        tokens, updated_at = entry[1][action]
+        interval = self.intervals.get(action, 0)
+        if interval <= 0:
+            return capacity
+        return int(min(capacity, tokens + (now - updated_at) / interval))
+
+    def export(self, key: str) -> Dict[str, List[float]]:
+        """A key's buckets as {action: [tokens, updated_at]}, for moving it to another limiter"""
+        entry = self._buckets.get(key)
+        return {action: list(bucket) for action, bucket in entry[1].items()} if entry else {}
+
+    def restore(self, key: str, buckets: Dict[str, List[float]], now: float = None):
+        """Install buckets exported from another limiter (tokens keep refilling from updated_at)"""
+        if not buckets:
+            return
+        if now is None:
+            now = time.time()
+        self._buckets.pop(key, None)
+        self._buckets[key] = (now, {action: list(bucket) for action, bucket in buckets.items()})
+        if len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+
+    def postpone(self, key: str, action: str, seconds: float):
+        """Don't count the last `seconds` of refill toward the key's bucket for action (a client
+        whose request spent that long in flight charges its token when the reply arrives)"""
+        entry = self._buckets.get(key)
+        interval = self.intervals.get(action, 0)
+        if entry is None or action not in entry[1] or interval <= 0:
+            return
+        entry[1][action][0] -= seconds / interval
+
+    def forget(self, key: str):
+        self._buckets.pop(key, None)
+
+    def evict_idle(self, now: float = None) -> int:
+        """Drop keys whose buckets have all refilled. Returns how many were dropped."""
+        if now is None:
+            now = time.time()
+        evicted = 0
+        while self._buckets:
+            key, (last_touch, _) = next(iter(self._buckets.items()))
+            if now - last_touch < self._idle_after:
+                break
+            del self._buckets[key]
+            evicted += 1
+        return evicted
@@ -0,0 +1,76 @@
+"""
+Session recorder for ShellTown
+Writes every accepted world-changing command to a JSONL file together with the
+RNG seed it ran under, so replay.py can feed the same session back into the
+app and check that it ends up in the same state.
+
+Line types:
+  {"type": "start", "t", "tick_rate", "world"}           snapshot the session starts from
+  {"type": "command", "t", "name", "seed", "args"}       one accepted command
+  {"type": "tick", "t", "tick"}                          end of a simulation tick (tick mode only)
+  {"type": "checkpoint", "t", "fingerprint"}             world fingerprint at this point
+"""
+
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from pydantic import BaseModel
+
+
+def encode_args(args: tuple) -> List:
+    """Command arguments as plain JSON (request models become dicts)"""
+    return [arg.model_dump() if isinstance(arg, BaseModel) else arg for arg in args]
+
+
+class SessionRecorder:
+    """Appends session lines to a JSONL file. A recorder with no path records nothing."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.lines = 0
+        self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _write(self, line: dict):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.lines += 1
+
+    def start(self, t: float, world: dict, tick_rate: float = 0):
+        if not self.enabled:
+            return
+        self._file = open(self.path, "w")
+        self._write({"type": "start", "t": t, "tick_rate": tick_rate, "world": world})
+        self._file.flush()
+        print(f"[RECORD] Recording session to {self.path}")
+
+    def command(self, t: float, name: str, seed: int, args: tuple):
+        self._write({"type": "command", "t": t, "name": name, "seed": seed, "args": encode_args(args)})
+
+    def tick(self, t: float, tick: int):
+        self._write({"type": "tick", "t": t, "tick": tick})
+
+    def checkpoint(self, t: float, fingerprint: str):
+        if self._file is None:
+            return
+        self._write({"type": "checkpoint", "t": t, "fingerprint": fingerprint})
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            print(f"[RECORD] Wrote {self.lines} lines to {self.path}")
+
+
+def read_session(path: str) -> Iterator[dict]:
+    """Lines of a recorded session, in order"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
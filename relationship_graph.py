@@ -0,0 +1,80 @@
+"""
+Relationship graph for ShellTown
+Sparse directed graph of agent-to-agent relationship levels. Edges only exist
+once two agents have actually interacted.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Levels: 0=stranger, 25=acquaintance, 50=friend, 75=good_friend, 100=best_friend
+FRIEND_THRESHOLD = 50
+MAX_LEVEL = 100
+
+
+class RelationshipGraph:
+    """agent_id -> {other_id: level}, without auto-vivified zero entries"""
+
+    def __init__(self, max_level: int = MAX_LEVEL):
+        self.max_level = max_level
+        self._edges: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        """Number of edges"""
+        return sum(len(out) for out in self._edges.values())
+
+    def get(self, agent_id: str, other_id: str) -> int:
+        return self._edges.get(agent_id, {}).get(other_id, 0)
+
+    def neighbors(self, agent_id: str) -> Iterator[Tuple[str, int]]:
+        """(other_id, level) for everyone this agent has a relationship with"""
+        return iter(self._edges.get(agent_id, {}).items())
+
+    def degree(self, agent_id: str) -> int:
+        """Number of relationships (non-zero edges) this agent has"""
+        return len(self._edges.get(agent_id, ()))
+
+    def set(self, agent_id: str, other_id: str, level: int) -> Tuple[int, int]:
+        """Set an edge to an absolute level. Returns (old_level, new_level)."""
+        level = max(0, min(self.max_level, level))
+        out = self._edges.get(agent_id)
+        old = out.get(other_id, 0) if out else 0
+        if level == old:
+            return old, level
+
+        if level > 0:
+            if out is None:
+                out = self._edges[agent_id] = {}
+            out[other_id] = level
+        else:
+            del out[other_id]
+            if not out:
+                del self._edges[agent_id]
+        return old, level
+
+    def update(self, agent_id: str, other_id: str, delta: int) -> Tuple[int, int]:
+        """Change an edge by delta (clamped to 0..max_level). Returns (old_level, new_level)."""
+        return self.set(agent_id, other_id, self.get(agent_id, other_id) + delta)
+
+    def update_many(self, updates: Iterable[Tuple[str, str, int]]) -> List[Tuple[str, str, int, int]]:
+        """Apply (agent_id, other_id, delta) updates in order.
+        Returns (agent_id, other_id, old_level, new_level) for every edge that changed."""
+        changes = []
+        for agent_id, other_id, delta in updates:
+            old, new = self.update(agent_id, other_id, delta)
+            if old != new:
+                changes.append((agent_id, other_id, old, new))
+        return changes
+
+    def pop_agent(self, agent_id: str) -> Dict[str, int]:
+        """Remove and return an agent's outgoing edges (edges pointing at it stay)"""
+        return self._edges.pop(agent_id, {})
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return {agent_id: dict(out) for agent_id, out in self._edges.items()}
+
+    def load(self, data: Dict[str, Dict[str, int]]):
+        """Replace the graph contents (used when restoring a save)"""
+        self._edges.clear()
+        for agent_id, out in data.items():
+            for other_id, level in out.items():
+                self.set(agent_id, other_id, level)
@@ -0,0 +1,166 @@
+"""
+Replay a recorded ShellTown session for benchmarking
+
+Record a session by starting the server with RECORD_SESSION set:
+    RECORD_SESSION=session.jsonl python main.py
+
+Then feed it back into the app in-process (no HTTP, no rate limits) from the
+recorded starting snapshot, with the recorded RNG seeds:
+    python replay.py session.jsonl              # as fast as possible
+    python replay.py session.jsonl --speed 1    # real time (2 = twice as fast, ...)
+
+Prints throughput and per-command latency, and checks the world against every
+recorded checkpoint. Exits with status 1 if the replay diverged.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from functools import partial
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from recorder import read_session
+
+
+def percentile(values: list, q: float) -> float:
+    """q-th percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def load_app(start: dict, data_dir: str):
+    """Import the app for a session: same tick mode, recorder off, its own data file"""
+    os.environ.pop("RECORD_SESSION", None)
+    os.environ.pop("SIM_CLOCK", None)
+    os.environ["TICK_RATE"] = str(start.get("tick_rate", 0))
+    import main as shelltown
+
+    shelltown.DATA_FILE = Path(data_dir) / "replay_data.json"
+    shelltown.load_collision_map()
+
+    # Events from the snapshot end relative to when the session started, not to now
+    world = start["world"]
+    offset = shelltown.clock.time() - start["t"]
+    for event in world.get("active_events", []):
+        event["created_at"] += offset
+        event["ends_at"] += offset
+    shelltown.restore_world(world)
+    return shelltown
+
+
+async def replay(shelltown, lines, start_t: float, speed: float) -> dict:
+    results = {
+        "commands": 0,
+        "ticks": [],
+        "latency": defaultdict(list),
+        "failed": Counter(),
+        "checkpoints": [],
+    }
+    tick_mode = shelltown.tick_engine is not None
+    queued = []  # (name, future) for intents waiting on the next tick
+    began = time.perf_counter()
+
+    for line in lines:
+        if speed > 0:
+            delay = (line["t"] - start_t) / speed - (time.perf_counter() - began)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if line["type"] == "command":
+            name = line["name"]
+            handler, types = shelltown.COMMANDS[name]
+            args = [
+                t(**arg) if isinstance(t, type) and issubclass(t, BaseModel) else arg
+                for t, arg in zip(types, line["args"])
+            ]
+            results["commands"] += 1
+
+            if tick_mode and name in shelltown.TICK_PHASES:
+                run = partial(shelltown.run_command, seed=line["seed"])
+                queued.append((name, shelltown.tick_engine.submit(name, run, name, handler, *args)))
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                await shelltown.run_command(name, handler, *args, seed=line["seed"])
+            except Exception as e:
+                results["failed"][name] += 1
+                print(f"[REPLAY] {name} failed: {e}", file=sys.stderr)
+            results["latency"][name].append(time.perf_counter() - t0)
+
+        elif line["type"] == "tick":
+            t0 = time.perf_counter()
+            await shelltown.simulation_tick(line["tick"])
+            results["ticks"].append(time.perf_counter() - t0)
+            for name, future in queued:
+                if future.exception() is not None:
+                    results["failed"][name] += 1
+                    print(f"[REPLAY] {name} failed: {future.exception()}", file=sys.stderr)
+            queued.clear()
+
+        elif line["type"] == "checkpoint":
+            results["checkpoints"].append(shelltown.world_fingerprint() == line["fingerprint"])
+
+    results["elapsed"] = time.perf_counter() - began
+    return results
+
+
+def report(results: dict) -> bool:
+    """Print the benchmark summary. Returns True if the replay matched the recording."""
+    elapsed = results["elapsed"]
+    commands = results["commands"]
+    rate = commands / elapsed if elapsed > 0 else 0.0
+    print(f"Replayed {commands} commands in {elapsed:.3f}s ({rate:,.0f} commands/sec)")
+
+    rows = [(name, sorted(samples)) for name, samples in sorted(results["latency"].items())]
+    if results["ticks"]:
+        rows.append(("[tick]", sorted(results["ticks"])))
+    if rows:
+        print(f"{'command':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, samples in rows:
+            print(f"{name:<14}{len(samples):>8}" + "".join(
+                f"{percentile(samples, q) * 1000:>10.3f}" for q in (50, 95, 99, 100)
+            ))
+
+    checkpoints = results["checkpoints"]
+    matched = sum(checkpoints)
+    print(f"Checkpoints: {matched}/{len(checkpoints)} matched")
+    if results["failed"]:
+        print(f"Commands that failed on replay: {dict(results['failed'])}")
+    return matched == len(checkpoints) and not results["failed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded ShellTown session")
+    parser.add_argument("session", help="JSONL file written with RECORD_SESSION")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Playback speed relative to the recording (0 = as fast as possible)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server's console output")
+    args = parser.parse_args()
+
+    lines = read_session(args.session)
+    start = next(lines, None)
+    if start is None or start["type"] != "start":
+        sys.exit(f"{args.session} is not a recorded session")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.devnull, "w") as devnull:
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+            with quiet:
+                shelltown = load_app(start, data_dir)
+                results = asyncio.run(replay(shelltown, lines, start["t"], args.speed))
+
+    if not report(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Region-sharded ShellTown
+Splits the map into a grid of regions and runs one main.py worker process per
+region, each with its own agents, spatial index, tick loop and save file. This
+router fronts them with the normal HTTP/WS API:
+
+- calls about one agent go to the worker that currently owns that agent
+- registration, claims, /join and the static pages go to region 0, which owns
+  registration state (new agents spawn there and walk out)
+- town-wide reads (/world, /agents, /events, /leaderboard, /feed, /stats) are
+  fanned out to every worker and merged
+- viewers get one WebSocket fed by every worker
+- when an agent walks out of its region, its worker posts the agent to
+  /internal/handoff and the router passes it to the worker owning the new tile
+
+A busy spot like Town Square then only loads the worker that owns it.
+Proximity (chat hearing, nearby agents, romance range) stops at region borders,
+and an event lives in the region it was created in: only agents standing in
+that region can join it. The merged /events tags each event with its region;
+/events?agent_id=... lists just the agent's region, i.e. what it can join.
+
+    python shard_router.py --regions 2x2 --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+
+from main import LEADERBOARD_SIZE, MAP_HEIGHT, MAP_WIDTH, MAX_PAGE_SIZE
+
+BASE_DIR = Path(__file__).parent
+SHARD_GRID = os.environ.get("SHARD_GRID", "2x1")          # columns x rows
+SHARD_PORT = int(os.environ.get("SHARD_PORT", "8080"))    # Router port
+SHARD_BASE_PORT = int(os.environ.get("SHARD_BASE_PORT", "9000"))  # Worker i listens on base + i
+SHARD_SECRET = os.environ.get("SHARD_SECRET") or secrets.token_urlsafe(16)
+
+# Paths of the form /<prefix>/{agent_id}
+AGENT_PATHS = {"agent", "relationships", "me", "heartbeat", "leave", "location",
+               "events/nearby", "romance", "achievements", "memories", "perceive"}
+# Town-wide reads that every worker answers for its own region
+FANOUT_PATHS = {"world", "agents", "events", "leaderboard", "feed", "stats", "dev/clear", "dev/npcs"}
+SUM_KEYS = {"count", "total_agents", "agents_online", "spawned", "removed", "npcs"}
+FORWARD_HEADERS = ("content-type", "retry-after", "x-ratelimit-reset-after", "etag", "cache-control")
+
+app = FastAPI(title="ShellTown (sharded)")
+
+
+def region_bounds(cols: int, rows: int) -> List[Tuple[int, int, int, int]]:
+    """(x0, y0, x1, y1) for each region, row by row; x1/y1 exclusive"""
+    xs = [MAP_WIDTH * c // cols for c in range(cols + 1)]
+    ys = [MAP_HEIGHT * r // rows for r in range(rows + 1)]
+    return [(xs[c], ys[r], xs[c + 1], ys[r + 1]) for r in range(rows) for c in range(cols)]
+
+
+COLS, ROWS = (int(n) for n in SHARD_GRID.lower().split("x"))
+REGIONS = region_bounds(COLS, ROWS)
+
+
+def region_of(x: int, y: int) -> int:
+    col = min(COLS - 1, max(0, x * COLS // MAP_WIDTH))
+    row = min(ROWS - 1, max(0, y * ROWS // MAP_HEIGHT))
+    return row * COLS + col
+
+
+# ============== WORKERS ==============
+
+workers: List[subprocess.Popen] = []
+clients: List[httpx.AsyncClient] = []
+agent_regions: Dict[str, int] = {}  # agent_id -> region of the worker that owns it
+
+
+def worker_port(region: int) -> int:
+    return SHARD_BASE_PORT + region
+
+
+def start_workers():
+    for region, bounds in enumerate(REGIONS):
+        env = {
+            **os.environ,
+            "SHARD_REGION": str(region),
+            "SHARD_BOUNDS": ",".join(str(v) for v in bounds),
+            "SHARD_ROUTER": f"http://127.0.0.1:{SHARD_PORT}",
+            "SHARD_SECRET": SHARD_SECRET,
+            "DATA_FILE": str(BASE_DIR / f"aicity_data.region{region}.json"),
+        }
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(worker_port(region))],
+            cwd=BASE_DIR, env=env,
+        ))
+        clients.append(httpx.AsyncClient(base_url=f"http://127.0.0.1:{worker_port(region)}", timeout=30))
+        print(f"[SHARD] Region {region} {bounds} -> worker on port {worker_port(region)}")
+
+
+async def wait_for_workers(timeout: float = 30):
+    for region, client in enumerate(clients):
+        for _ in range(int(timeout * 10)):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError(f"Worker for region {region} did not start")
+
+
+@app.on_event("startup")
+async def startup():
+    start_workers()
+    await wait_for_workers()
+    print(f"[SHARD] {len(REGIONS)} regions ({SHARD_GRID}) behind the router on port {SHARD_PORT}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for client in clients:
+        await client.aclose()
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.wait(timeout=10)
+
+
+# ============== ROUTING ==============
+
+async def locate(agent_id: str) -> Optional[int]:
+    """Region currently holding an agent (asks every worker on a cache miss)"""
+    if agent_id in agent_regions:
+        return agent_regions[agent_id]
+    responses = await asyncio.gather(*(c.get(f"/agent/{agent_id}") for c in clients), return_exceptions=True)
+    for region, response in enumerate(responses):
+        if isinstance(response, httpx.Response) and response.status_code == 200:
+            agent_regions[agent_id] = region
+            return region
+    return None
+
+
+def agent_id_of(path: str, request: Request, body: Optional[dict]) -> Optional[str]:
+    if request.query_params.get("agent_id"):
+        return request.query_params["agent_id"]
+    if isinstance(body, dict) and isinstance(body.get("agent_id"), str):
+        return body["agent_id"]
+    prefix, _, last = path.rpartition("/")
+    if prefix in AGENT_PATHS and last:
+        return last
+    return None
+
+
+async def forward(region: int, request: Request, path: str, content: bytes) -> httpx.Response:
+    headers = {k: v for k, v in request.headers.items() if k in ("content-type", "if-none-match")}
+    return await clients[region].request(
+        request.method, f"/{path}", params=list(request.query_params.multi_items()),
+        content=content, headers=headers,
+    )
+
+
+def to_response(response: httpx.Response) -> Response:
+    headers = {k: v for k, v in response.headers.items() if k in FORWARD_HEADERS}
+    return Response(content=response.content, status_code=response.status_code, headers=headers)
+
+
+def remember_new_agents(region: int, data):
+    """Cache owners of agents created by /join and /dev/spawn"""
+    if not isinstance(data, dict):
+        return
+    if "agent_id" in data and "api_key" in data:
+        agent_regions[data["agent_id"]] = region
+    for agent in data.get("agents", []):
+        if isinstance(agent, dict) and "api_key" in agent:
+            agent_regions[agent["agent_id"]] = region
+
+
+def merge(values: list, key: str = ""):
+    """Combine the same response from every region"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    if all(isinstance(v, dict) for v in values):
+        keys = list(dict.fromkeys(k for v in values for k in v))
+        return {k: merge([v.get(k) for v in values], k) for k in keys}
+    if all(isinstance(v, list) for v in values):
+        return [item for v in values for item in v]
+    if key in SUM_KEYS and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return sum(values)
+    return values[0]
+
+
+def merge_pages(merged: dict, bodies: list, request: Request):
+    """Paged agent lists: every region sent its first `limit` agents after the cursor,
+    so the town's page is the first `limit` of their union in agent_id order"""
+    if not any("next_cursor" in b for b in bodies):
+        return
+    page = sorted(merged["agents"], key=lambda a: a["agent_id"])
+    limit = request.query_params.get("limit")
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE) if limit is not None else None  # As the regions clamp it
+    more = any(b.get("next_cursor") for b in bodies)
+    if limit is not None and len(page) > limit:
+        page, more = page[:limit], True
+    merged["agents"] = page
+    merged["next_cursor"] = page[-1]["agent_id"] if more and page else None
+    if "count" in merged:
+        merged["count"] = len(page)
+
+
+async def fan_out_world(request: Request) -> Response:
+    """Merged /world. Its ETag joins the regions' ETags, so If-None-Match is checked
+    region by region and a quiet town answers 304 without building any state.
+    Regions number their versions separately, so since_version deltas are not merged."""
+    params = [(k, v) for k, v in request.query_params.multi_items() if k != "since_version"]
+    known = request.headers.get("if-none-match", "").strip('"').split(".")
+    if len(known) != len(clients):
+        known = [""] * len(clients)
+
+    async def fetch(region: int, etag: str) -> httpx.Response:
+        headers = {"if-none-match": f'"{etag}"'} if etag else {}
+        return await clients[region].get("/world", params=params, headers=headers)
+
+    responses = await asyncio.gather(*(fetch(r, known[r]) for r in range(len(clients))))
+    etag = '"' + ".".join(r.headers.get("etag", "").strip('"') for r in responses) + '"'
+    if all(r.status_code == 304 for r in responses):
+        return Response(status_code=304, headers={"ETag": etag})
+    # Some region changed: fill in the full state of the ones that answered 304
+    responses = [r if r.status_code != 304 else await fetch(region, "") for region, r in enumerate(responses)]
+    failed = next((r for r in responses if r.status_code >= 400), None)
+    if failed is not None:
+        return to_response(failed)
+
+    bodies = [r.json() for r in responses]
+    merged = merge(bodies)
+    merged["version"] = etag.strip('"')
+    merged["map"] = bodies[0]["map"]
+    merged["chat_history"] = sorted(merged["chat_history"], key=lambda m: m["timestamp"])[-20:]
+    merge_pages(merged, bodies, request)
+    return Response(json.dumps(merged), media_type="application/json", headers={"ETag": etag})
+
+
+async def fan_out(path: str, request: Request, content: bytes) -> Response:
+    if path == "world":
+        return await fan_out_world(request)
+    if path == "dev/npcs":
+        # Spread the swarm over every region
+        body = json.loads(content or b"{}")
+        total = body.get("count", 100)
+        shares = [total // len(clients) + (1 if i < total % len(clients) else 0) for i in range(len(clients))]
+        responses = await asyncio.gather(*(
+            c.post("/dev/npcs", json={**body, "count": share}) for c, share in zip(clients, shares)
+        ))
+    else:
+        responses = await asyncio.gather(*(forward(r, request, path, content) for r in range(len(clients))))
+
+    failed = next((r for r in responses if r.status_code >= 400), None)
+    if failed is not None:
+        return to_response(failed)
+    bodies = [r.json() for r in responses]
+
+    if path == "stats":
+        return Response(json.dumps({
+            "agents_online": sum(b.get("agents_online", 0) for b in bodies),
+            "regions": bodies,
+        }), media_type="application/json")
+    if path == "leaderboard":
+        merged = {key: sorted((e for b in bodies for e in b.get(key, [])), key=lambda e: -e["value"])[:LEADERBOARD_SIZE]
+                  for key in bodies[0]}
+        return Response(json.dumps(merged), media_type="application/json")
+
+    if path == "events":
+        for region, body in enumerate(bodies):
+            for event in body["events"]:
+                event["region"] = region
+    merged = merge(bodies)
+    if path == "agents":
+        merge_pages(merged, bodies, request)
+    elif path == "feed":
+        limit = int(request.query_params.get("limit", 50))
+        merged["feed"] = sorted(merged["feed"], key=lambda e: -e["timestamp"])[:limit]
+    return Response(json.dumps(merged), media_type="application/json")
+
+
+@app.post("/internal/handoff")
+async def handoff(request: Request):
+    """A worker hands over an agent that walked out of its region"""
+    if request.headers.get("X-Shard-Secret") != SHARD_SECRET:
+        raise HTTPException(status_code=403, detail="Internal shard endpoint")
+    payload = await request.json()
+    state = payload["state"]
+    agent = state["agent"]
+    region = region_of(agent["x"], agent["y"])
+    response = await clients[region].post("/internal/adopt", json=state, headers={"X-Shard-Secret": SHARD_SECRET})
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Region {region} refused the agent")
+    agent_regions[agent["agent_id"]] = region
+    return {"success": True, "region": region}
+
+
+@app.websocket("/ws")
+async def websocket_relay(websocket: WebSocket):
+    """One viewer socket fed by every region; their initial world_state frames are merged"""
+    await websocket.accept()
+    upstreams = [await websockets.connect(f"ws://127.0.0.1:{worker_port(r)}/ws") for r in range(len(clients))]
+    pumps = []
+    try:
+        states = [json.loads(await upstream.recv())["data"] for upstream in upstreams]
+        await websocket.send_text(json.dumps({"type": "world_state", "data": {
+            "agents": [a for s in states for a in s["agents"]],
+            "chat_history": sorted((m for s in states for m in s["chat_history"]), key=lambda m: m["timestamp"])[-20:],
+        }}))
+
+        async def pump(upstream):
+            async for message in upstream:
+                await websocket.send_text(message)
+
+        pumps = [asyncio.create_task(pump(upstream)) for upstream in upstreams]
+        while True:
+            await websocket.receive_text()
+    except (WebSocketDisconnect, websockets.ConnectionClosed):
+        pass
+    finally:
+        for task in pumps:
+            task.cancel()
+        for upstream in upstreams:
+            await upstream.close()
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+async def route(path: str, request: Request):
+    path = path.strip("/")
+    content = await request.body()
+    try:
+        body = json.loads(content) if content else None
+    except ValueError:
+        body = None
+
+    agent_id = agent_id_of(path, request, body)
+    if agent_id is not None and path != "dev/npcs":
+        region = await locate(agent_id)
+        if region is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        response = await forward(region, request, path, content)
+        if response.status_code == 404 and agent_regions.pop(agent_id, None) is not None:
+            # Handed off since we cached it: find it again and retry once
+            region = await locate(agent_id)
+            if region is not None:
+                response = await forward(region, request, path, content)
+        return to_response(response)
+
+    if path in FANOUT_PATHS:
+        return await fan_out(path, request, content)
+
+    # Registration, claims, /join, static pages: region 0
+    response = await forward(0, request, path, content)
+    if response.status_code == 200 and response.headers.get("content-type", "").startswith("application/json"):
+        remember_new_agents(0, response.json())
+    return to_response(response)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ShellTown as region workers behind a router")
+    parser.add_argument("--regions", default=SHARD_GRID, help="Region grid as COLSxROWS, e.g. 2x2")
+    parser.add_argument("--port", type=int, default=SHARD_PORT)
+    parser.add_argument("--base-port", type=int, default=SHARD_BASE_PORT, help="Worker i listens on base-port + i")
+    args = parser.parse_args()
+    # Module-level settings are read from the environment, so re-import with them set
+    os.environ.update(SHARD_GRID=args.regions, SHARD_PORT=str(args.port), SHARD_BASE_PORT=str(args.base_port),
+                      SHARD_SECRET=SHARD_SECRET)
+    uvicorn.run("shard_router:app", host="0.0.0.0", port=args.port)
@@ -0,0 +1,297 @@
+"""
+Async Python client for ShellTown
+One ShellTownClient per process holds a single keep-alive connection pool that
+every bot shares, and a local copy of the server's token buckets so calls wait
+for their turn instead of drawing 429s. Thousands of bots can run as coroutines
+on one event loop:
+
+    async with ShellTownClient("http://localhost:8080") as town:
+        await town.sync_limits()
+        bots = await town.dev_spawn(5)
+        await asyncio.gather(*(bot.move("up") for bot in bots))
+        results = await bots[0].batch({"type": "move", "direction": "left"},
+                                      {"type": "chat", "message": "hi"},
+                                      {"type": "me"})
+        async for event in town.events():
+            print(event["type"])
+
+batch() sends several commands in one request (the server's /batch), which is
+how a bot pipelines a turn without paying one round trip per command, and
+walk_to() plans routes on the downloaded collision map (GET /map/collision)
+so the server only ever sees single-step moves.
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+import httpx
+import websockets
+
+from collision_grid import CollisionGrid, direction
+from rate_limiter import TokenBucketLimiter
+
+# Mirrors main.RATE_LIMITS / RATE_BURSTS; sync_limits() refreshes them from the server
+RATE_LIMITS = {"move": 0.2, "chat": 2.0, "action": 0.5}
+RATE_BURSTS = {"move": 5, "chat": 3, "action": 5}
+MAX_429_RETRIES = 3
+THROTTLE_MARGIN = 0.01  # Seconds added to each local refill interval, for clock granularity
+
+
+class ShellTownError(Exception):
+    """A request the server refused (status and detail from its HTTPException)"""
+
+    def __init__(self, status: int, detail):
+        super().__init__(f"{status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class ShellTownClient:
+    """A pooled HTTP client plus local rate limiting, shared by every bot in the process"""
+
+    def __init__(self, base_url: str = "http://localhost:8080", max_connections: int = 100,
+                 timeout: float = 10, on_response: Optional[Callable[[str, str, int, float], None]] = None,
+                 margin: float = THROTTLE_MARGIN):
+        self.base_url = base_url.rstrip("/")
+        self.on_response = on_response  # (method, path, status, seconds) for every HTTP exchange
+        self.http = httpx.AsyncClient(base_url=self.base_url, timeout=timeout, limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections))
+        self.margin = margin
+        self.limiter = TokenBucketLimiter({action: interval + margin for action, interval in RATE_LIMITS.items()},
+                                          dict(RATE_BURSTS), max_entries=1000000)
+        self.stats = {"requests": 0, "throttled": 0, "rate_limited": 0}
+        self._world_etag: Optional[str] = None
+        self._world: Optional[dict] = None
+        self._grid_etag: Optional[str] = None
+        self._grid: Optional[CollisionGrid] = None
+
+    async def __aenter__(self) -> "ShellTownClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def sync_limits(self):
+        """Adopt the server's advertised rate limits (GET / lists them)"""
+        info = await self.request("GET", "/")
+        for action, limit in info.get("rate_limits", {}).items():
+            self.limiter.set_limit(action, limit["interval"] + self.margin, limit["burst"])  # Also rescales idle eviction
+
+    async def throttle(self, agent_id: str, action: str):
+        """Wait until the local bucket for (agent_id, action) has a token, then spend it"""
+        while True:
+            wait = self.limiter.acquire(agent_id, action, time.monotonic())
+            if wait <= 0:
+                return
+            self.stats["throttled"] += 1
+            await asyncio.sleep(wait)
+
+    async def request(self, method: str, path: str, agent_id: Optional[str] = None,
+                      action: Optional[str] = None, **kwargs) -> dict:
+        """Send a request, waiting on the local limiter first and retrying 429s after the server's delay.
+        Raises ShellTownError for other error statuses."""
+        response = await self.send(method, path, agent_id, action, **kwargs)
+        return response.json()
+
+    async def send(self, method: str, path: str, agent_id: Optional[str] = None,
+                   action: Optional[str] = None, **kwargs) -> httpx.Response:
+        """Like request(), but returns the raw response (for status codes and headers)"""
+        for attempt in range(MAX_429_RETRIES + 1):
+            if agent_id and action and attempt == 0:  # A retry already waited out the server's delay
+                await self.throttle(agent_id, action)
+            self.stats["requests"] += 1
+            started = time.perf_counter()
+            response = await self.http.request(method, path, **kwargs)
+            elapsed = time.perf_counter() - started
+            if self.on_response:
+                self.on_response(method, path, response.status_code, elapsed)
+            if response.status_code != 429 or attempt == MAX_429_RETRIES:
+                break
+            # Our buckets drifted from the server's (another process, a restart): back off as told
+            self.stats["rate_limited"] += 1
+            await asyncio.sleep(float(response.headers.get("X-RateLimit-Reset-After")
+                                      or response.headers.get("Retry-After", "1")))
+        if agent_id and action:
+            # The server spent its token somewhere in that round trip: count ours as spent at the end
+            self.limiter.postpone(agent_id, action, elapsed)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise ShellTownError(response.status_code, detail)
+        return response
+
+    # -- Joining --
+
+    def bot(self, agent_id: str, api_key: Optional[str] = None) -> "Bot":
+        return Bot(self, agent_id, api_key)
+
+    async def register(self, name: str, description: Optional[str] = None,
+                       emoji: Optional[str] = None, sprite: Optional[str] = None) -> dict:
+        """Step 1: returns the verification code and claim URL for a human to verify"""
+        body = {"name": name, "description": description, "emoji": emoji, "sprite": sprite}
+        return await self.request("POST", "/register", json={k: v for k, v in body.items() if v is not None})
+
+    async def join(self, registration_token: str) -> "Bot":
+        """Step 3: enter the world with the token from a verified claim"""
+        data = await self.request("POST", "/join", json={"registration_token": registration_token})
+        bot = self.bot(data["agent_id"], data.get("api_key"))
+        await bot.me()  # The /join response doesn't include the name
+        return bot
+
+    async def dev_spawn(self, count: int = 5) -> List["Bot"]:
+        """DEV MODE: spawn unverified test agents (up to 10 per call)"""
+        data = await self.request("POST", "/dev/spawn", json={"count": count})
+        bots = []
+        for spawned in data["agents"]:
+            bot = self.bot(spawned["agent_id"], spawned.get("api_key"))
+            bot.name = spawned["name"]
+            bot.x, bot.y = spawned["position"]["x"], spawned["position"]["y"]
+            bots.append(bot)
+        return bots
+
+    # -- Reading the world --
+
+    async def world(self, **params) -> dict:
+        """GET /world. Plain calls revalidate with the last ETag, so an unchanged world costs a 304."""
+        if params:
+            return await self.request("GET", "/world", params=params)
+        headers = {"If-None-Match": self._world_etag} if self._world_etag else {}
+        response = await self.send("GET", "/world", headers=headers)
+        if response.status_code == 304 and self._world is not None:
+            return self._world
+        self._world_etag = response.headers.get("ETag")
+        self._world = response.json()
+        return self._world
+
+    async def collision_map(self) -> CollisionGrid:
+        """The map's blocked tiles, for planning routes with Bot.walk_to. Cached; revalidated by ETag."""
+        headers = {"If-None-Match": self._grid_etag} if self._grid_etag else {}
+        response = await self.send("GET", "/map/collision", headers=headers)
+        if response.status_code != 304 or self._grid is None:
+            self._grid_etag = response.headers.get("ETag")
+            self._grid = CollisionGrid.from_payload(response.json())
+        return self._grid
+
+    async def agents(self, **params) -> dict:
+        """GET /agents (fields, activity, location, limit and cursor pass straight through)"""
+        return await self.request("GET", "/agents", params=params)
+
+    async def events(self, reconnect: bool = True) -> AsyncIterator[dict]:
+        """Yield every WebSocket frame as a dict; tick frames are unpacked into their updates.
+        The first frame after each (re)connect is the full world_state."""
+        ws_url = self.base_url.replace("https://", "wss://").replace("http://", "ws://") + "/ws"
+        while True:
+            try:
+                async with websockets.connect(ws_url, max_size=None) as ws:
+                    async for message in ws:
+                        frame = json.loads(message)
+                        if frame["type"] == "tick":
+                            for update in frame["data"]["updates"]:
+                                yield update
+                        else:
+                            yield frame
+            except (OSError, websockets.ConnectionClosed):
+                if not reconnect:
+                    raise
+            if not reconnect:
+                return
+            await asyncio.sleep(1)
+
+
+class Bot:
+    """One agent's calls, sent through a shared ShellTownClient"""
+
+    def __init__(self, client: ShellTownClient, agent_id: str, api_key: Optional[str] = None):
+        self.client = client
+        self.agent_id = agent_id
+        self.api_key = api_key
+        self.name: Optional[str] = None
+        self.x = 0
+        self.y = 0
+
+    def __repr__(self) -> str:
+        return f"Bot({self.agent_id!r} at {self.x},{self.y})"
+
+    def _track(self, result: dict) -> dict:
+        position = result.get("position") or result  # /me has x and y at the top level
+        if "x" in position:
+            self.x, self.y = position["x"], position["y"]
+        return result
+
+    async def move(self, direction: str) -> dict:
+        """Step up, down, left or right"""
+        return self._track(await self.client.request(
+            "POST", "/move", self.agent_id, "move", json={"agent_id": self.agent_id, "direction": direction}))
+
+    async def move_to(self, x: int, y: int) -> dict:
+        """Take the next step of the server's A* path toward (x, y)"""
+        return self._track(await self.client.request(
+            "POST", "/move", self.agent_id, "move",
+            json={"agent_id": self.agent_id, "direction": "to", "target_x": x, "target_y": y}))
+
+    async def walk_to(self, x: int, y: int, grid: CollisionGrid) -> dict:
+        """Plan a route to (x, y) locally and walk it one step at a time (no server-side A*).
+        Stops early if a step is refused. Returns the last move's result."""
+        result = {"success": True, "position": {"x": self.x, "y": self.y}, "at_destination": True}
+        for tile in grid.find_path((self.x, self.y), (x, y)):
+            result = await self.move(direction((self.x, self.y), tile))
+            if not result.get("success"):
+                break
+        return result
+
+    async def chat(self, message: str, to: Optional[str] = None) -> dict:
+        body = {"agent_id": self.agent_id, "message": message}
+        if to:
+            body["to"] = to
+        return await self.client.request("POST", "/chat", self.agent_id, "chat", json=body)
+
+    async def action(self, action: str, target_id: Optional[str] = None) -> dict:
+        body = {"agent_id": self.agent_id, "action": action}
+        if target_id:
+            body["target_id"] = target_id
+        return await self.client.request("POST", "/action", self.agent_id, "action", json=body)
+
+    async def activity(self, activity: str) -> dict:
+        return await self.client.request("POST", "/activity", json={"agent_id": self.agent_id, "activity": activity})
+
+    async def remember(self, memory: str, importance: int = 5) -> dict:
+        return await self.client.request("POST", "/memory", json={
+            "agent_id": self.agent_id, "memory": memory, "importance": importance})
+
+    async def batch(self, *commands: dict) -> List[dict]:
+        """Run several commands in one request, e.g. batch({"type": "move", "direction": "up"}, {"type": "me"}).
+        Rate-limited commands wait for local tokens first. Returns one result per command."""
+        for command in commands:
+            if command.get("type") in self.client.limiter.intervals:
+                await self.client.throttle(self.agent_id, command["type"])
+        started = time.perf_counter()
+        data = await self.client.request("POST", "/batch", json={"agent_id": self.agent_id, "commands": list(commands)})
+        for command in commands:
+            self.client.limiter.postpone(self.agent_id, command.get("type"), time.perf_counter() - started)
+        for result in data["results"]:
+            if result["ok"] and result["type"] == "move":
+                self._track(result["result"])
+        return data["results"]
+
+    async def me(self) -> dict:
+        status = await self.client.request("GET", f"/me/{self.agent_id}")
+        self.name = status["name"]
+        return self._track(status)
+
+    async def perceive(self) -> dict:
+        """Nearby agents, location, events and unread chats in one call"""
+        return await self.client.request("GET", f"/perceive/{self.agent_id}")
+
+    async def heartbeat(self) -> dict:
+        return await self.client.request("POST", f"/heartbeat/{self.agent_id}")
+
+    async def leave(self) -> dict:
+        self.client.limiter.forget(self.agent_id)
+        return await self.client.request("DELETE", f"/leave/{self.agent_id}")
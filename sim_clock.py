@@ -0,0 +1,90 @@
+"""
+Clocks for ShellTown
+Everything that reads the time or waits goes through a clock object, so the
+same code runs against the wall clock in production and against a virtual
+clock in capacity_sim.py, where a simulated day passes as fast as the CPU can
+process it.
+"""
+
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class WallClock:
+    """Real time"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time that only moves when run_until() advances it.
+    Whenever every task is waiting on the clock, time jumps straight to the next
+    sleeper's deadline, so idle stretches cost nothing."""
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = time.time() if start is None else start
+        self._seq = 0
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._sleepers, (self._now + seconds, self._seq, future))
+        await future
+
+    async def run_until(self, until: float):
+        """Advance virtual time to `until`, waking sleepers in deadline order"""
+        while True:
+            await self._settle()
+            if not self._sleepers or self._sleepers[0][0] > until:
+                break
+            when, _, future = heapq.heappop(self._sleepers)
+            self._now = max(self._now, when)
+            if not future.done():
+                future.set_result(None)
+        self._now = max(self._now, until)
+
+    async def _settle(self):
+        """Yield until no other task has work ready, i.e. all are blocked on the clock"""
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(0)
+        while getattr(loop, "_ready", None):
+            await asyncio.sleep(0)
+
+
+class CpuMeter:
+    """Process CPU time spent per subsystem"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def measure(self, subsystem: str):
+        started = time.process_time()
+        try:
+            yield
+        finally:
+            self.seconds[subsystem] += time.process_time() - started
+
+    def snapshot(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in sorted(self.seconds.items())}
@@ -0,0 +1,56 @@
+"""
+Serialized snapshots for ShellTown's hot read endpoints
+A view (/world, /agents, the viewer's first world_state frame, /leaderboard) is
+serialized to JSON bytes once per version of the state it shows, and every
+reader until the next change gets those same bytes. orjson is used when it is
+installed; the standard library encoder is the fallback.
+"""
+
+import json
+from collections import Counter
+from typing import Callable, Dict, Hashable, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class SnapshotCache:
+    """Named views cached as bytes, rebuilt when their version changes"""
+
+    def __init__(self):
+        self._views: Dict[str, Tuple[Hashable, bytes]] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def get(self, name: str, version: Hashable, build: Callable[[], object]) -> bytes:
+        """The view's bytes at version, calling build() only if they aren't cached"""
+        cached = self._views.get(name)
+        if cached is not None and cached[0] == version:
+            self.hits[name] += 1
+            return cached[1]
+        body = dumps(build())
+        self._views[name] = (version, body)
+        self.misses[name] += 1
+        return body
+
+    def clear(self):
+        self._views.clear()
+
+    def stats(self) -> Dict[str, dict]:
+        """Hits, misses and hit rate per view"""
+        return {
+            name: {
+                "hits": self.hits[name],
+                "misses": self.misses[name],
+                "hit_rate": round(self.hits[name] / (self.hits[name] + self.misses[name]), 3),
+            }
+            for name in sorted(self.hits.keys() | self.misses.keys())
+        }
@@ -0,0 +1,80 @@
+"""
+Spatial index for ShellTown - bucket grid over the tile map
+Answers "what is within N tiles of (x, y)" without scanning every entry.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_CELL_SIZE = 10  # Tiles per bucket side; ~hearing range in /chat
+
+
+class SpatialGrid:
+    """Keys (agent ids, event ids...) bucketed by position for Manhattan-radius lookups"""
+
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[int, int]]] = {}
+        self._positions: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return (x // self.cell_size, y // self.cell_size)
+
+    def position(self, key: str) -> Optional[Tuple[int, int]]:
+        return self._positions.get(key)
+
+    def insert(self, key: str, x: int, y: int):
+        """Add a key, or move it if it is already indexed"""
+        old = self._positions.get(key)
+        if old is not None:
+            old_cell = self._cell(*old)
+            new_cell = self._cell(x, y)
+            if old_cell == new_cell:
+                self._cells[new_cell][key] = (x, y)
+                self._positions[key] = (x, y)
+                return
+            self._discard(key, old_cell)
+        self._positions[key] = (x, y)
+        self._cells.setdefault(self._cell(x, y), {})[key] = (x, y)
+
+    move = insert
+
+    def remove(self, key: str):
+        old = self._positions.pop(key, None)
+        if old is not None:
+            self._discard(key, self._cell(*old))
+
+    def _discard(self, key: str, cell: Tuple[int, int]):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._positions.clear()
+
+    def query(self, x: int, y: int, radius: int) -> List[Tuple[str, int]]:
+        """Return (key, manhattan_distance) for every key within radius of (x, y)"""
+        results = []
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for key, (kx, ky) in bucket.items():
+                    dist = abs(kx - x) + abs(ky - y)
+                    if dist <= radius:
+                        results.append((key, dist))
+        return results
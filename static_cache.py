@@ -0,0 +1,83 @@
+"""
+Static responses for ShellTown
+Pages and catalogs that only change on deploy (skill.md, the viewer, the
+/locations, /actions, /achievements and /characters payloads) are rendered to
+bytes once at startup, with a content hash as their ETag, and served with
+conditional-GET support: a client that already has them gets an empty 304.
+With hot reload on, file-backed entries are re-rendered when the file changes.
+"""
+
+import hashlib
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from snapshot_cache import dumps
+
+
+def mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+class StaticEntry:
+    """One cached response body and its ETag"""
+
+    def __init__(self, media_type: str, build: Callable[[], bytes], path: Optional[Path] = None):
+        self.media_type = media_type
+        self.build = build
+        self.path = path
+        self.refresh()
+
+    def refresh(self):
+        self.mtime = mtime(self.path) if self.path else None
+        self.body = self.build()
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"'
+
+    def stale(self) -> bool:
+        return self.path is not None and mtime(self.path) != self.mtime
+
+
+class StaticCache:
+    """Named static responses, served with ETag / If-None-Match"""
+
+    def __init__(self, hot_reload: bool = False):
+        self.hot_reload = hot_reload
+        self._entries: Dict[str, StaticEntry] = {}
+
+    def add_file(self, name: str, path: Path, media_type: str,
+                 render: Callable[[str], str] = lambda text: text, fallback: str = ""):
+        """Cache render(file text), or the fallback if the file is missing"""
+        def build() -> bytes:
+            return (render(path.read_text()) if path.exists() else fallback).encode()
+        self._entries[name] = StaticEntry(media_type, build, path)
+
+    def add_json(self, name: str, build: Callable[[], object]):
+        self._entries[name] = StaticEntry("application/json", lambda: dumps(build()))
+
+    def response(self, name: str, request: Request) -> Response:
+        entry = self._entries[name]
+        if self.hot_reload and entry.stale():
+            entry.refresh()
+            print(f"[STATIC] Reloaded {entry.path.name}")
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}  # Cache, but revalidate each time
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+class PageTemplate:
+    """A str.format-style page split once into byte chunks, so rendering is a join"""
+
+    def __init__(self, text: str):
+        self._parts = [(literal.encode(), field) for literal, field, _, _ in Formatter().parse(text)]
+
+    def render(self, **values: str) -> bytes:
+        return b"".join(
+            literal + (values[field].encode() if field is not None else b"")
+            for literal, field in self._parts
+        )
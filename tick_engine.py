@@ -0,0 +1,86 @@
+"""
+Fixed-timestep simulation loop for ShellTown
+Request handlers submit intents instead of mutating the world directly. Once per
+tick the loop drains the queued intents phase by phase (e.g. all moves, then all
+actions, then all chats), so ordering is deterministic and per-request overhead
+such as broadcasting is paid once per tick instead of once per request.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from sim_clock import WallClock
+
+
+class TickEngine:
+    """Per-phase intent queues plus the loop that runs one step per tick"""
+
+    def __init__(self, interval: float, phases: Sequence[str], clock=None):
+        self.interval = interval
+        self.clock = clock or WallClock()
+        self.phases = tuple(phases)
+        self.tick = 0
+        self._queues: Dict[str, List[Tuple[Callable[..., Awaitable], tuple, asyncio.Future]]] = {
+            phase: [] for phase in self.phases
+        }
+        self.stats = {
+            "ticks": 0,
+            "intents": 0,
+            "last_tick_ms": 0.0,
+            "max_tick_ms": 0.0,
+            "overruns": 0,  # Ticks that took longer than the interval
+        }
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, phase: str, handler: Callable[..., Awaitable], *args) -> asyncio.Future:
+        """Queue handler(*args) for the next tick. The future resolves with its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queues[phase].append((handler, args, future))
+        return future
+
+    async def drain(self, phase: str) -> int:
+        """Run every intent queued for phase, in submission order"""
+        queue = self._queues[phase]
+        if not queue:
+            return 0
+        self._queues[phase] = []
+        for handler, args, future in queue:
+            if future.cancelled():
+                continue
+            try:
+                result = await handler(*args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+        self.stats["intents"] += len(queue)
+        return len(queue)
+
+    async def run(self, step: Callable[[int], Awaitable]):
+        """Call step(tick) every interval seconds (of clock time), forever"""
+        next_at = self.clock.monotonic()
+        while True:
+            started = time.perf_counter()  # Tick cost is always real time
+            try:
+                await step(self.tick)
+            except Exception as e:
+                print(f"[TICK] Tick {self.tick} failed: {e}")
+            elapsed = time.perf_counter() - started
+
+            self.tick += 1
+            self.stats["ticks"] += 1
+            self.stats["last_tick_ms"] = round(elapsed * 1000, 3)
+            self.stats["max_tick_ms"] = max(self.stats["max_tick_ms"], self.stats["last_tick_ms"])
+
+            next_at += self.interval
+            delay = next_at - self.clock.monotonic()
+            if delay < 0:
+                self.stats["overruns"] += 1
+                next_at = self.clock.monotonic()  # Don't try to catch up with a burst of ticks
+                delay = 0
+            await self.clock.sleep(delay)
@@ -0,0 +1,117 @@
+"""
+Tweet verification for ShellTown
+Checks that a public tweet contains a claim's verification code using the
+oEmbed API, without blocking the event loop: one pooled async HTTP client, a
+cap on concurrent fetches, concurrent checks of the same tweet sharing one
+fetch, and fetched tweets cached for a short TTL. The oEmbed URL is
+configurable, so tests and load runs can point it at oembed_stub.py.
+"""
+
+import asyncio
+import re
+import time
+from typing import Callable, Dict, Tuple
+
+import httpx
+
+TWEET_PATTERN = re.compile(r'https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+)')
+MAX_CACHED_TWEETS = 10000
+
+
+class TransientFetchError(LookupError):
+    """The tweet couldn't be fetched right now (timeout, network, 5xx): worth trying again"""
+
+
+class TweetVerifier:
+    """Async oEmbed lookups with pooling, a concurrency cap and a TTL cache"""
+
+    def __init__(self, oembed_url: str, max_concurrent: int = 8, cache_ttl: float = 300,
+                 timeout: float = 10, now: Callable[[], float] = time.monotonic):
+        self.oembed_url = oembed_url
+        self.cache_ttl = cache_ttl
+        self.now = now
+        self.client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(
+            max_connections=max_concurrent, max_keepalive_connections=max_concurrent))
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._cache: Dict[str, Tuple[float, str]] = {}  # tweet_url -> (fetched_at, tweet html)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"fetches": 0, "cache_hits": 0, "shared": 0, "errors": 0}
+
+    async def fetch(self, tweet_url: str) -> str:
+        """The tweet's oEmbed html. Raises LookupError if it can't be fetched
+        (TransientFetchError if the failure may clear up on its own)."""
+        cached = self._cache.get(tweet_url)
+        if cached is not None and self.now() - cached[0] < self.cache_ttl:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        inflight = self._inflight.get(tweet_url)
+        if inflight is not None:
+            self.stats["shared"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[tweet_url] = future
+        try:
+            tweet_html = await self._fetch(tweet_url)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark it retrieved, in case nobody else was waiting
+            raise
+        else:
+            future.set_result(tweet_html)
+            self._remember(tweet_url, tweet_html)
+            return tweet_html
+        finally:
+            del self._inflight[tweet_url]
+
+    async def _fetch(self, tweet_url: str) -> str:
+        async with self._slots:
+            self.stats["fetches"] += 1
+            try:
+                response = await self.client.get(self.oembed_url, params={"url": tweet_url})
+            except httpx.TimeoutException:
+                self.stats["errors"] += 1
+                raise TransientFetchError("Request timed out")
+            except httpx.HTTPError as e:
+                self.stats["errors"] += 1
+                raise TransientFetchError(f"Could not reach Twitter: {e}")
+        if response.status_code >= 500:
+            self.stats["errors"] += 1
+            raise TransientFetchError(f"Twitter returned {response.status_code}")
+        if response.status_code != 200:
+            raise LookupError("Could not fetch tweet. Make sure it's public.")
+        return response.json().get("html", "")
+
+    def _remember(self, tweet_url: str, tweet_html: str):
+        if len(self._cache) >= MAX_CACHED_TWEETS:
+            cutoff = self.now() - self.cache_ttl
+            self._cache = {url: entry for url, entry in self._cache.items() if entry[0] >= cutoff}
+            if len(self._cache) >= MAX_CACHED_TWEETS:
+                self._cache.clear()
+        self._cache[tweet_url] = (self.now(), tweet_html)
+
+    async def verify(self, tweet_url: str, verification_code: str) -> dict:
+        """
+        Check that the tweet contains the verification code.
+        Returns {"success": True/False, "twitter_handle": str or None, "error": str or None},
+        plus "retryable": True when the fetch failed transiently (timeout, network, 5xx).
+        """
+        match = TWEET_PATTERN.match(tweet_url)
+        if not match:
+            return {"success": False, "twitter_handle": None, "error": "Invalid tweet URL format"}
+        twitter_handle = match.group(1)
+
+        try:
+            tweet_html = await self.fetch(tweet_url)
+        except TransientFetchError as e:
+            return {"success": False, "twitter_handle": None, "error": str(e), "retryable": True}
+        except Exception as e:  # Private or deleted tweet (4xx), or a malformed oEmbed reply
+            return {"success": False, "twitter_handle": None, "error": str(e)}
+
+        if verification_code.lower() in tweet_html.lower():
+            return {"success": True, "twitter_handle": twitter_handle, "error": None}
+        return {"success": False, "twitter_handle": twitter_handle, "error": "Verification code not found in tweet"}
+
+    async def close(self):
+        await self.client.aclose()